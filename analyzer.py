@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from ..utils.batch_similarity import BatchSimilarityEngine
+from ..utils.metrics import Metrics
 from ..utils.text import normalize_term
-from ..utils.similarity import all_scores
-from .index import OntologyIndex, OntologyElement
+from ..utils.similarity import SimilarityThresholds, all_scores, scores_at_least
+from .index import OntologyIndex, OntologyElement, identifier_tokens
 
 
 @dataclass(frozen=True)
@@ -15,9 +19,110 @@ class MatchResult:
     metric: str  # 'exact'|'jaro'|'jaro_winkler'|'levenshtein_ratio'
 
 
+@dataclass(frozen=True)
+class MatchCacheInfo:
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+
+MATCHING_BACKENDS = ("scalar", "numpy")
+
+MATCHING_RETRIEVALS = ("scan", "tokens")
+
+
 class OntologyMatcher:
-    def __init__(self, index: OntologyIndex):
+    def __init__(
+        self,
+        index: OntologyIndex,
+        prune: bool = True,
+        backend: str = "scalar",
+        cache_size: int = 4096,
+        metrics: Optional[Metrics] = None,
+        retrieval: str = "scan",
+        shortlist: int = 200,
+    ):
+        if backend not in MATCHING_BACKENDS:
+            raise ValueError(f"Unknown matching backend '{backend}'. Supported: {', '.join(MATCHING_BACKENDS)}")
+        if retrieval not in MATCHING_RETRIEVALS:
+            raise ValueError(f"Unknown matching retrieval '{retrieval}'. Supported: {', '.join(MATCHING_RETRIEVALS)}")
         self.index = index
+        # prune=False keeps the reference brute-force scan (same results, slower)
+        self.prune = prune
+        # 'numpy' scores the query against all labels at once (same results as 'scalar')
+        self.backend = backend
+        # 'tokens' scores only the BM25 shortlist of labels sharing a split_identifier token
+        # with the term (compound names like countryName match "country name"; labels
+        # with no token in common, e.g. misspellings, are not found)
+        self.retrieval = retrieval
+        self.shortlist = shortlist
+        self._engine: Optional[BatchSimilarityEngine] = None
+        # LRU of results keyed on (normalized term, matching settings, index version)
+        self.cache_size = cache_size
+        self._results: "OrderedDict[Tuple, List[MatchResult]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # match_many may run on several threads (annotate_parameters_async)
+        self._lock = threading.Lock()
+        # match.* counters (cache hits/misses, labels scored/pruned) and scoring time
+        self.metrics = metrics
+
+    def cache_info(self) -> MatchCacheInfo:
+        return MatchCacheInfo(hits=self.cache_hits, misses=self.cache_misses, size=len(self._results), maxsize=self.cache_size)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
+
+    def match_many(
+        self,
+        terms: Iterable[str],
+        exact_match: bool = True,
+        use_similarity: bool = True,
+        jaro_threshold: float = 0.92,
+        jaro_winkler_threshold: float = 0.92,
+        levenshtein_ratio_threshold: float = 0.85,
+        top_k: int = 10,
+    ) -> List[List[MatchResult]]:
+        """match() for several terms; each distinct normalized term is scored once.
+
+        Returns one result list per input term, in input order.
+        """
+        settings = (exact_match, use_similarity, jaro_threshold, jaro_winkler_threshold, levenshtein_ratio_threshold, top_k)
+        by_norm: Dict[Any, List[MatchResult]] = {}
+        out: List[List[MatchResult]] = []
+        for term in terms:
+            term_n = normalize_term(term)
+            # with token retrieval the query also depends on the raw spelling (camelCase)
+            query = (term_n, " ".join(identifier_tokens(term))) if self.retrieval == "tokens" else term_n
+            if query not in by_norm:
+                key = (query, settings, self.index.version)
+                with self._lock:
+                    hit = self._results.get(key)
+                    if hit is not None:
+                        self._results.move_to_end(key)
+                        self.cache_hits += 1
+                    else:
+                        self.cache_misses += 1
+                if self.metrics is not None:
+                    self.metrics.incr("match.cache_hit" if hit is not None else "match.cache_miss")
+                if hit is None:
+                    if self.metrics is not None:
+                        with self.metrics.timer("match.score"):
+                            hit = self._match_query(query, settings)
+                    else:
+                        hit = self._match_query(query, settings)
+                    if self.cache_size > 0:
+                        with self._lock:
+                            self._results[key] = hit
+                            if len(self._results) > self.cache_size:
+                                self._results.popitem(last=False)
+                by_norm[query] = hit
+            out.append(list(by_norm[query]))
+        return out
 
     def match(
         self,
@@ -29,16 +134,50 @@ class OntologyMatcher:
         levenshtein_ratio_threshold: float = 0.85,
         top_k: int = 10,
     ) -> List[MatchResult]:
-        term_n = normalize_term(term)
+        return self.match_many(
+            [term],
+            exact_match=exact_match,
+            use_similarity=use_similarity,
+            jaro_threshold=jaro_threshold,
+            jaro_winkler_threshold=jaro_winkler_threshold,
+            levenshtein_ratio_threshold=levenshtein_ratio_threshold,
+            top_k=top_k,
+        )[0]
+
+    def _match_query(self, query: Any, settings: Tuple) -> List[MatchResult]:
+        if isinstance(query, tuple):
+            return self._match_normalized(query[0], *settings, tokens=query[1])
+        return self._match_normalized(query, *settings)
+
+    def _match_normalized(
+        self,
+        term_n: str,
+        exact_match: bool,
+        use_similarity: bool,
+        jaro_threshold: float,
+        jaro_winkler_threshold: float,
+        levenshtein_ratio_threshold: float,
+        top_k: int,
+        tokens: Optional[str] = None,
+    ) -> List[MatchResult]:
         results: List[MatchResult] = []
 
-        if exact_match and term_n in self.index.by_norm_label:
-            for idx in self.index.by_norm_label[term_n]:
-                el = self.index.elements[idx]
-                results.append(MatchResult(element=el, score=1.0, metric="exact"))
+        if exact_match:
+            # tokens: the space-joined identifier tokens ("countryName" -> "country name")
+            for q in dict.fromkeys([term_n, tokens] if tokens else [term_n]):
+                for idx in self.index.by_norm_label.get(q, ()):
+                    el = self.index.elements[idx]
+                    results.append(MatchResult(element=el, score=1.0, metric="exact"))
 
-        if use_similarity:
+        if use_similarity and tokens is not None:
+            results.extend(self._match_tokens(term_n, tokens, jaro_threshold, jaro_winkler_threshold, levenshtein_ratio_threshold))
+        elif use_similarity and self.backend == "numpy":
+            results.extend(self._match_batch(term_n, jaro_threshold, jaro_winkler_threshold, levenshtein_ratio_threshold))
+        elif use_similarity and self.prune:
+            results.extend(self._match_pruned(term_n, jaro_threshold, jaro_winkler_threshold, levenshtein_ratio_threshold))
+        elif use_similarity:
             # brute force over elements (OK for DBpedia ontology scale; for huge ontologies, use ANN/LSH)
+            self._count_scored(len(self.index.elements), len(self.index.elements))
             for el in self.index.elements:
                 label = el.label or el.uri.rsplit("/", 1)[-1]
                 label_n = normalize_term(label)
@@ -59,3 +198,102 @@ class OntologyMatcher:
 
         out = sorted(best.values(), key=lambda r: r.score, reverse=True)
         return out[: max(1, top_k)]
+
+    def _match_pruned(
+        self,
+        term_n: str,
+        jaro_threshold: float,
+        jaro_winkler_threshold: float,
+        levenshtein_ratio_threshold: float,
+    ) -> List[MatchResult]:
+        # score each candidate label once, then emit in element order like the brute-force scan
+        thresholds = SimilarityThresholds(jaro_threshold, jaro_winkler_threshold, levenshtein_ratio_threshold)
+        hits: List[Tuple[int, List[Tuple[float, str]]]] = []
+        scored = 0
+        for label_n in self.index.similarity_candidates(term_n, jaro_threshold, jaro_winkler_threshold, levenshtein_ratio_threshold):
+            scored += 1
+            scores = scores_at_least(term_n, label_n, thresholds)
+            passed: List[Tuple[float, str]] = []
+            if scores.jaro >= jaro_threshold:
+                passed.append((scores.jaro, "jaro"))
+            if scores.jaro_winkler >= jaro_winkler_threshold:
+                passed.append((scores.jaro_winkler, "jaro_winkler"))
+            if scores.levenshtein_ratio >= levenshtein_ratio_threshold:
+                passed.append((scores.levenshtein_ratio, "levenshtein_ratio"))
+            if passed:
+                hits.extend((idx, passed) for idx in self.index.by_norm_label[label_n])
+        self._count_scored(scored, len(self.index.by_norm_label))
+        return self._emit(hits)
+
+    def _match_tokens(
+        self,
+        term_n: str,
+        tokens: str,
+        jaro_threshold: float,
+        jaro_winkler_threshold: float,
+        levenshtein_ratio_threshold: float,
+    ) -> List[MatchResult]:
+        # score the shortlist against both spellings of the term, keeping the better score per metric
+        thresholds = SimilarityThresholds(jaro_threshold, jaro_winkler_threshold, levenshtein_ratio_threshold)
+        queries = list(dict.fromkeys(q for q in (term_n, tokens) if q))
+        shortlist = self.index.token_candidates(tokens.split(), limit=self.shortlist) if tokens else []
+        self._count_scored(len(shortlist), len(self.index.by_norm_label))
+        hits: List[Tuple[int, List[Tuple[float, str]]]] = []
+        for label_n in shortlist:
+            best = [0.0, 0.0, 0.0]
+            for q in queries:
+                scores = scores_at_least(q, label_n, thresholds)
+                best = [max(best[0], scores.jaro), max(best[1], scores.jaro_winkler), max(best[2], scores.levenshtein_ratio)]
+            passed: List[Tuple[float, str]] = []
+            if best[0] >= jaro_threshold:
+                passed.append((best[0], "jaro"))
+            if best[1] >= jaro_winkler_threshold:
+                passed.append((best[1], "jaro_winkler"))
+            if best[2] >= levenshtein_ratio_threshold:
+                passed.append((best[2], "levenshtein_ratio"))
+            if passed:
+                hits.extend((idx, passed) for idx in self.index.by_norm_label[label_n])
+        return self._emit(hits)
+
+    def _match_batch(
+        self,
+        term_n: str,
+        jaro_threshold: float,
+        jaro_winkler_threshold: float,
+        levenshtein_ratio_threshold: float,
+    ) -> List[MatchResult]:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = BatchSimilarityEngine(list(self.index.by_norm_label.keys()))
+        scores = self._engine.scores(term_n)
+        self._count_scored(len(self._engine.labels), len(self._engine.labels))
+        ok_j = scores.jaro >= jaro_threshold
+        ok_jw = scores.jaro_winkler >= jaro_winkler_threshold
+        ok_l = scores.levenshtein_ratio >= levenshtein_ratio_threshold
+
+        hits: List[Tuple[int, List[Tuple[float, str]]]] = []
+        for i in (ok_j | ok_jw | ok_l).nonzero()[0].tolist():
+            passed: List[Tuple[float, str]] = []
+            if ok_j[i]:
+                passed.append((float(scores.jaro[i]), "jaro"))
+            if ok_jw[i]:
+                passed.append((float(scores.jaro_winkler[i]), "jaro_winkler"))
+            if ok_l[i]:
+                passed.append((float(scores.levenshtein_ratio[i]), "levenshtein_ratio"))
+            hits.extend((idx, passed) for idx in self.index.by_norm_label[self._engine.labels[i]])
+        return self._emit(hits)
+
+    def _count_scored(self, scored: int, total: int) -> None:
+        if self.metrics is not None:
+            self.metrics.incr("match.labels_scored", scored)
+            self.metrics.incr("match.labels_pruned", total - scored)
+
+    def _emit(self, hits: List[Tuple[int, List[Tuple[float, str]]]]) -> List[MatchResult]:
+        # per-element results in index order, as the brute-force scan appends them
+        hits.sort(key=lambda h: h[0])
+        out: List[MatchResult] = []
+        for idx, passed in hits:
+            el = self.index.elements[idx]
+            out.extend(MatchResult(el, score, metric) for score, metric in passed)
+        return out
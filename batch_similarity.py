@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .similarity import levenshtein_distance
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, only needed for the numpy matching backend
+    np = None
+
+
+# labels are packed in length bins of this width so padding stays small
+_BIN_WIDTH = 8
+# bit-parallel Levenshtein keeps the whole query in one machine word
+_MAX_WORD_BITS = 64
+# _LOW_BITS[k] has the k lowest bits set
+_LOW_BITS = None if np is None else np.array([(1 << k) - 1 for k in range(_MAX_WORD_BITS + 1)], dtype=np.uint64)
+
+
+@dataclass(frozen=True)
+class BatchScores:
+    """One score per label, aligned with BatchSimilarityEngine.labels."""
+    jaro: Any
+    jaro_winkler: Any
+    levenshtein_ratio: Any
+
+
+@dataclass
+class _LabelBin:
+    positions: Any  # indices into BatchSimilarityEngine.labels
+    symbols: Any    # (rows, width) dense symbol ids, padded with the alphabet size
+    lengths: Any
+    occurrences: Any = None  # (rows, alphabet + 1) uint64 position bitsets, labels <= 64 chars only
+
+
+class BatchSimilarityEngine:
+    """Scores one query against every label at once.
+
+    Produces exactly the values of jaro_similarity / jaro_winkler_similarity /
+    levenshtein_ratio (query first, label second). Levenshtein uses the bit-parallel
+    Myers/Hyyro recurrence across all labels of a bin; Jaro runs the same greedy
+    matching as the scalar version, one query character at a time.
+    """
+
+    def __init__(self, labels: Sequence[str]):
+        if np is None:
+            raise ImportError("numpy is required for the numpy matching backend (pip install numpy)")
+        self.labels: List[str] = list(labels)
+        alphabet = sorted({ch for lab in self.labels for ch in lab})
+        self._symbol: Dict[str, int] = {ch: i for i, ch in enumerate(alphabet)}
+        self._pad = len(alphabet)
+
+        lengths = np.fromiter((len(lab) for lab in self.labels), dtype=np.int64, count=len(self.labels))
+        self._bins: List[_LabelBin] = []
+        keys = (lengths + _BIN_WIDTH - 1) // _BIN_WIDTH
+        for key in np.unique(keys):
+            # longest labels first, so the labels still active at a column form a prefix
+            positions = np.flatnonzero(keys == key)
+            positions = positions[np.argsort(-lengths[positions], kind="stable")]
+            width = int(key) * _BIN_WIDTH
+            symbols = np.full((len(positions), max(width, 1)), self._pad, dtype=np.int32)
+            for row, pos in enumerate(positions):
+                lab = self.labels[pos]
+                if lab:
+                    symbols[row, : len(lab)] = [self._symbol[ch] for ch in lab]
+            occurrences = None
+            if width <= _MAX_WORD_BITS:
+                occurrences = np.zeros((len(positions), self._pad + 1), dtype=np.uint64)
+                rows = np.arange(len(positions))
+                for col in range(width):
+                    occurrences[rows, symbols[:, col]] |= np.uint64(1 << col)
+            self._bins.append(_LabelBin(positions=positions, symbols=symbols, lengths=lengths[positions], occurrences=occurrences))
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def scores(self, term: str) -> BatchScores:
+        n_labels = len(self.labels)
+        jaro = np.zeros(n_labels, dtype=np.float64)
+        jaro_winkler = np.zeros(n_labels, dtype=np.float64)
+        ratio = np.zeros(n_labels, dtype=np.float64)
+        # characters unknown to the label alphabet never match (-1 differs from every symbol and the pad)
+        query = np.array([self._symbol.get(ch, -1) for ch in term], dtype=np.int32)
+
+        for b in self._bins:
+            j = self._jaro(query, b)
+            jaro[b.positions] = j
+            jaro_winkler[b.positions] = j + self._prefix(query, b) * 0.1 * (1.0 - j)
+            dist = self._levenshtein(term, query, b)
+            longest = np.maximum(b.lengths, len(term))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r = np.where(longest > 0, 1.0 - dist / np.maximum(longest, 1), 1.0)
+            ratio[b.positions] = r
+        return BatchScores(jaro=jaro, jaro_winkler=jaro_winkler, levenshtein_ratio=ratio)
+
+    def _prefix(self, query: Any, b: _LabelBin) -> Any:
+        k = min(4, len(query), b.symbols.shape[1])
+        if k == 0:
+            return np.zeros(len(b.positions), dtype=np.int64)
+        eq = b.symbols[:, :k] == query[:k]
+        return np.cumprod(eq, axis=1).sum(axis=1)
+
+    def _jaro(self, query: Any, b: _LabelBin) -> Any:
+        n = len(query)
+        lengths = b.lengths
+        if n == 0:
+            return np.where(lengths == 0, 1.0, 0.0)
+
+        match_distance = np.maximum(lengths, n) // 2 - 1
+        if b.occurrences is not None:
+            matches, transpositions = self._match_counts_bits(query, b, match_distance)
+        else:
+            matches, transpositions = self._match_counts_dense(query, b, match_distance)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            j = (matches / n + matches / lengths + (matches - transpositions) / matches) / 3.0
+        j = np.where(matches == 0, 0.0, j)
+        # identical strings score 1.0 even when the match window is empty (length 1)
+        if b.symbols.shape[1] >= n:
+            equal = (lengths == n) & (b.symbols[:, :n] == query).all(axis=1)
+            j = np.where(equal, 1.0, j)
+        return j
+
+    def _match_counts_bits(self, query: Any, b: _LabelBin, match_distance: Any) -> Tuple[Any, Any]:
+        # same first-free-match-in-window rule as the scalar loop, on per-label position bitsets
+        rows = len(b.positions)
+        one = np.uint64(1)
+        taken = np.zeros(rows, dtype=np.uint64)
+        s_matched = np.zeros((len(query), rows), dtype=bool)
+        for i, sym in enumerate(query.tolist()):
+            if sym < 0:
+                continue
+            start = np.clip(i - match_distance, 0, _MAX_WORD_BITS)
+            end = np.clip(np.minimum(i + match_distance + 1, b.lengths), 0, _MAX_WORD_BITS)
+            avail = b.occurrences[:, sym] & ~taken & _LOW_BITS[end] & ~_LOW_BITS[start]
+            taken |= avail & (~avail + one)
+            s_matched[i] = avail != 0
+
+        # walk matched label positions in order alongside matched query characters
+        row_idx = np.arange(rows)
+        transpositions = np.zeros(rows, dtype=np.int64)
+        for i, sym in enumerate(query.tolist()):
+            hit = s_matched[i]
+            if not hit.any():
+                continue
+            low = taken & (~taken + one)
+            pos = np.frexp(low.astype(np.float64))[1] - 1
+            label_sym = b.symbols[row_idx, np.maximum(pos, 0)]
+            transpositions += hit & (label_sym != sym)
+            taken = np.where(hit, taken ^ low, taken)
+        return s_matched.sum(axis=0), transpositions // 2
+
+    def _match_counts_dense(self, query: Any, b: _LabelBin, match_distance: Any) -> Tuple[Any, Any]:
+        n = len(query)
+        rows = len(b.positions)
+        symbols = b.symbols
+        lengths = b.lengths
+        cols = np.arange(symbols.shape[1])
+        t_matched = np.zeros(symbols.shape, dtype=bool)
+        s_matched = np.zeros((rows, n), dtype=bool)
+        for i in range(n):
+            start = np.maximum(0, i - match_distance)
+            end = np.minimum(i + match_distance + 1, lengths)
+            cand = (symbols == query[i]) & ~t_matched & (cols >= start[:, None]) & (cols < end[:, None])
+            hit = np.flatnonzero(cand.any(axis=1))
+            if hit.size:
+                t_matched[hit, cand[hit].argmax(axis=1)] = True
+                s_matched[hit, i] = True
+
+        matches = s_matched.sum(axis=1)
+        # k-th matched character on each side, compared in order
+        s_seq = np.full((rows, n), -1, dtype=np.int32)
+        r, i = np.nonzero(s_matched)
+        s_seq[r, (np.cumsum(s_matched, axis=1) - 1)[r, i]] = query[i]
+        t_seq = np.full((rows, n), -2, dtype=np.int32)
+        r, c = np.nonzero(t_matched)
+        t_seq[r, (np.cumsum(t_matched, axis=1) - 1)[r, c]] = symbols[r, c]
+        transpositions = ((s_seq != t_seq) & (np.arange(n) < matches[:, None])).sum(axis=1) // 2
+        return matches, transpositions
+
+    def _levenshtein(self, term: str, query: Any, b: _LabelBin) -> Any:
+        n = len(query)
+        lengths = b.lengths
+        if n == 0:
+            return lengths.copy()
+        if n > _MAX_WORD_BITS:
+            return np.array([levenshtein_distance(term, self.labels[p]) for p in b.positions], dtype=np.int64)
+
+        peq = np.zeros(self._pad + 1, dtype=np.uint64)
+        for i, sym in enumerate(query.tolist()):
+            if sym >= 0:
+                peq[sym] |= np.uint64(1 << i)
+
+        one = np.uint64(1)
+        high = np.uint64(1 << (n - 1))
+        rows = len(b.positions)
+        pv = np.full(rows, np.iinfo(np.uint64).max, dtype=np.uint64)
+        mv = np.zeros(rows, dtype=np.uint64)
+        score = np.full(rows, n, dtype=np.int64)
+        # number of labels longer than each column (lengths are sorted descending)
+        active = np.searchsorted(-lengths, -np.arange(int(lengths.max(initial=0))), side="left")
+        for col, k in enumerate(active.tolist()):
+            p = pv[:k]
+            m = mv[:k]
+            eq = peq[b.symbols[:k, col]]
+            xv = eq | m
+            xh = (((eq & p) + p) ^ p) | eq
+            ph = m | ~(xh | p)
+            mh = p & xh
+            score[:k] += (ph & high != 0).view(np.int8) - (mh & high != 0).view(np.int8)
+            ph = (ph << one) | one
+            mh = mh << one
+            pv[:k] = mh | ~(xv | ph)
+            mv[:k] = ph & xv
+        return score
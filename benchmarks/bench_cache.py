@@ -0,0 +1,73 @@
+"""SqliteCache throughput (ops/sec) for single and bulk get/set.
+
+    python benchmarks/bench_cache.py [--n 5000] [--out cache_bench.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+from geosws_annotator.utils.cache import SqliteCache
+
+
+def _sparql_like_value(i: int) -> Dict[str, Any]:
+    return {"results": {"bindings": [{"val": {"type": "uri", "value": f"http://dbpedia.org/resource/Item_{i}_{k}"}} for k in range(20)]}}
+
+
+def _rate(n: int, fn: Callable[[], None]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return n / (time.perf_counter() - t0)
+
+
+def run(n: int) -> Dict[str, float]:
+    keys = [f"sparql:http://dbpedia.org/sparql:{i:08x}" for i in range(n)]
+    values = [_sparql_like_value(i) for i in range(n)]
+    order = list(range(n))
+    random.Random(0).shuffle(order)
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SqliteCache(os.path.join(tmp, "cache.sqlite"))
+
+        def set_each() -> None:
+            for i in range(n):
+                cache.set(keys[i], values[i])
+            getattr(cache, "flush", lambda: None)()
+
+        def get_each() -> None:
+            for i in order:
+                assert cache.get(keys[i]) is not None
+
+        def get_miss() -> None:
+            for i in order:
+                cache.get("missing:" + keys[i])
+
+        results["set_ops_per_s"] = _rate(n, set_each)
+        results["get_hit_ops_per_s"] = _rate(n, get_each)
+        results["get_miss_ops_per_s"] = _rate(n, get_miss)
+        if hasattr(cache, "get_many"):
+            results["get_many_ops_per_s"] = _rate(n, lambda: cache.get_many([keys[i] for i in order]))
+            results["set_many_ops_per_s"] = _rate(n, lambda: (cache.set_many(dict(zip(keys, values))), cache.flush()))
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--n", type=int, default=5000)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+    res = run(args.n)
+    text = json.dumps(res, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
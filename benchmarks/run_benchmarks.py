@@ -0,0 +1,267 @@
+"""Benchmark suite for the hot paths, with local stand-ins for every remote service.
+
+    python benchmarks/run_benchmarks.py [--quick] [--only matcher,similarity,...]
+        [--out bench.json] [--compare previous.json]
+
+Every benchmark reports calls, throughput (ops/s) and p50/p95 latency (ms). The JSON file
+written by --out can be passed to --compare on a later run to print the ratios.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import requests
+from lxml import etree
+
+from geosws_annotator.annotate.pipeline import AnnotationPipeline
+from geosws_annotator.config import ExternalResourcesConfig, OntologyIndexConfig, PipelineConfig, SparqlEndpointConfig
+from geosws_annotator.models import Parameter
+from geosws_annotator.ontology.index import OntologyElement, OntologyIndex
+from geosws_annotator.ontology.matcher import OntologyMatcher
+from geosws_annotator.utils import similarity
+from geosws_annotator.utils.text import normalize_term
+
+import bench_cache
+from stand_ins import DatamuseStandIn, SparqlStandIn, WfsStandIn
+
+
+WORDS = [
+    "country", "name", "city", "population", "area", "river", "mountain", "code", "feature", "type",
+    "total", "elevation", "capital", "region", "postal", "state", "county", "lake", "town", "nation",
+    "place", "land", "road", "length", "width", "depth", "station", "district", "province", "border",
+    "airport", "harbour", "forest", "island", "valley", "bridge", "building", "height", "date", "owner",
+]
+
+# a realistic WFS feature type: administrative units with the usual GeoServer columns
+WFS_FIELDS = [
+    ("the_geom", "gml:MultiSurfacePropertyType"), ("fid", "xsd:long"), ("id", "xsd:string"), ("name", "xsd:string"),
+    ("name_en", "xsd:string"), ("countryName", "xsd:string"), ("country_code", "xsd:string"), ("iso_a3", "xsd:string"),
+    ("population", "xsd:long"), ("pop_est", "xsd:double"), ("area_km2", "xsd:double"), ("capital", "xsd:string"),
+    ("region", "xsd:string"), ("subregion", "xsd:string"), ("continent", "xsd:string"), ("adm1_name", "xsd:string"),
+    ("adm2_name", "xsd:string"), ("elevation", "xsd:double"), ("riverName", "xsd:string"), ("lake_area", "xsd:double"),
+    ("postal", "xsd:string"), ("timezone", "xsd:string"), ("gdp_md_est", "xsd:double"), ("economy", "xsd:string"),
+    ("income_grp", "xsd:string"), ("lat", "xsd:double"), ("lon", "xsd:double"), ("bbox", "xsd:string"),
+    ("last_update", "xsd:dateTime"), ("source", "xsd:string"), ("featureTypeCode", "xsd:string"), ("townName", "xsd:string"),
+]
+
+
+def measure(fn: Callable[[Any], Any], items: Sequence[Any], repeat: int = 1) -> Dict[str, float]:
+    """Time fn(item) for every item (repeat times); throughput plus p50/p95 per call."""
+    lat: List[float] = []
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        for it in items:
+            t0 = time.perf_counter()
+            fn(it)
+            lat.append(time.perf_counter() - t0)
+    total = time.perf_counter() - t_start
+    lat.sort()
+    return {
+        "calls": len(lat),
+        "ops_per_s": round(len(lat) / total, 2) if total > 0 else float("inf"),
+        "p50_ms": round(1000 * lat[len(lat) // 2], 4),
+        "p95_ms": round(1000 * lat[min(len(lat) - 1, int(len(lat) * 0.95))], 4),
+        "mean_ms": round(1000 * statistics.fmean(lat), 4),
+    }
+
+
+def synthetic_elements(n: int, seed: int = 0) -> List[OntologyElement]:
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        label = " ".join(rnd.sample(WORDS, rnd.randint(1, 3)))
+        if i % 5 == 0:
+            label += f" {rnd.choice(WORDS)}{i % 97}"
+        out.append(OntologyElement(uri=f"http://example.org/ontology/E{i}", label=label, type=i % 2))
+    return out
+
+
+def queries(n: int, seed: int = 1) -> List[str]:
+    # exact labels, typos and misses in equal parts
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        words = rnd.sample(WORDS, rnd.randint(1, 2))
+        q = "_".join(words)
+        if i % 3 == 1 and len(q) > 4:
+            k = rnd.randrange(len(q) - 1)
+            q = q[:k] + q[k + 1] + q[k] + q[k + 2:]
+        elif i % 3 == 2:
+            q = "".join(rnd.choice("bcdfghjklmnpqrstvwxz") for _ in range(rnd.randint(4, 10)))
+        out.append(q)
+    return out
+
+
+def bench_matcher(quick: bool) -> Dict[str, Any]:
+    res: Dict[str, Any] = {}
+    for n in ([1000, 10000] if quick else [1000, 10000, 100000]):
+        index = OntologyIndex(synthetic_elements(n))
+        matcher = OntologyMatcher(index, cache_size=0)
+        qs = queries(30 if n >= 100000 else 100)
+        matcher.match(qs[0])  # build pruning structures outside the timing
+        res[f"match_{n}"] = measure(matcher.match, qs)
+    return res
+
+
+def bench_similarity(quick: bool) -> Dict[str, Any]:
+    rnd = random.Random(2)
+    pairs = [(" ".join(rnd.sample(WORDS, 2)), " ".join(rnd.sample(WORDS, 2))) for _ in range(500 if quick else 2000)]
+    th = similarity.SimilarityThresholds()
+    metrics = {
+        "levenshtein_distance": similarity.levenshtein_distance,
+        "levenshtein_ratio": similarity.levenshtein_ratio,
+        "jaro": similarity.jaro_similarity,
+        "jaro_winkler": similarity.jaro_winkler_similarity,
+        "all_scores": similarity.all_scores,
+        "scores_at_least": lambda a, b: similarity.scores_at_least(a, b, th),
+    }
+    return {name: measure(lambda p, f=fn: f(*p), pairs) for name, fn in metrics.items()}
+
+
+def bench_normalize(quick: bool) -> Dict[str, Any]:
+    terms = [f for f, _ in WFS_FIELDS] + queries(200) + ["Población_Total", "  Höhe über NN ", "river-name/EN"]
+    return {"normalize_term": measure(normalize_term, terms, repeat=5 if quick else 20)}
+
+
+def bench_index_io(quick: bool) -> Dict[str, Any]:
+    n = 10000 if quick else 100000
+    index = OntologyIndex(synthetic_elements(n))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.json")
+        res = {f"to_json_{n}": measure(lambda _: index.to_json(path), [None] * 3)}
+        res[f"from_json_{n}"] = measure(lambda _: OntologyIndex.from_json(path), [None] * 3)
+    return res
+
+
+def bench_cache_ops(quick: bool) -> Dict[str, Any]:
+    n = 2000 if quick else 5000
+    return {"cache": {k: round(v, 2) for k, v in bench_cache.run(n).items()}}
+
+
+def describe_feature_type(url: str) -> List[Tuple[str, str]]:
+    """(name, type) of the properties in a DescribeFeatureType schema."""
+    resp = requests.get(url, timeout=10)
+    resp.raise_for_status()
+    root = etree.fromstring(resp.content)
+    ns = {"xsd": "http://www.w3.org/2001/XMLSchema"}
+    return [(el.get("name"), el.get("type")) for el in root.iterfind(".//xsd:complexType//xsd:element", ns)]
+
+
+def bench_end_to_end(quick: bool, latency_ms: float = 5.0) -> Dict[str, Any]:
+    lat = latency_ms / 1000.0
+    with tempfile.TemporaryDirectory() as tmp, SparqlStandIn(lat) as sparql, DatamuseStandIn(WORDS, lat) as dm, WfsStandIn("admin_units", WFS_FIELDS, lat) as wfs:
+        index_path = os.path.join(tmp, "index.json")
+        OntologyIndex(synthetic_elements(10000)).to_json(index_path)
+        res: Dict[str, Any] = {}
+        # "warm" reruns on the cache (and run memo) the cold pass filled
+        for label, warm in (("cold", False), ("warm", True)):
+            cfg = PipelineConfig(
+                sparql_endpoints=[SparqlEndpointConfig("stand-in", sparql.url)],
+                ontology_index=OntologyIndexConfig(index_path=index_path),
+                external_resources=ExternalResourcesConfig(provider_settings={"datamuse": {"base_url": dm.url}}),
+                cache_sqlite_path=os.path.join(tmp, "cache.sqlite"),
+                instances_limit=10,
+                wfs_validation="hits",
+            )
+            pipeline = AnnotationPipeline(cfg)
+            getfeature = f"{wfs.url}?service=WFS&version=1.1.0&request=GetFeature&typeName=admin_units"
+            before = (sparql.requests, dm.requests, wfs.requests)
+
+            fields = describe_feature_type(f"{wfs.url}?service=WFS&version=1.1.0&request=DescribeFeatureType&typeName=admin_units")
+
+            def annotate(_: Any) -> None:
+                params = [Parameter(name, "out", datatype=t) for name, t in fields]
+                pipeline.annotate_parameters(params)
+                for p in params:
+                    values = [i.value for c in p.ontology_candidates[:2] for i in c.instances[:5]]
+                    if values:
+                        pipeline.validate_wfs_by_getfeature(getfeature, p.name, values)
+
+            stats = measure(annotate, [None] * (1 if quick or not warm else 3))
+            stats["requests"] = {
+                "sparql": sparql.requests - before[0],
+                "datamuse": dm.requests - before[1],
+                "wfs": wfs.requests - before[2],
+            }
+            stats["parameters_per_s"] = round(stats["ops_per_s"] * len(WFS_FIELDS), 2)
+            res[f"annotate_wfs_{label}"] = stats
+            pipeline.cache.close()
+    return res
+
+
+SUITES: Dict[str, Callable[[bool], Dict[str, Any]]] = {
+    "matcher": bench_matcher,
+    "similarity": bench_similarity,
+    "normalize": bench_normalize,
+    "index_io": bench_index_io,
+    "cache": bench_cache_ops,
+    "end_to_end": bench_end_to_end,
+}
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+    lines = []
+    for suite, results in current["results"].items():
+        for name, stats in results.items():
+            old = previous.get("results", {}).get(suite, {}).get(name)
+            if not isinstance(stats, dict) or not isinstance(old, dict) or "ops_per_s" not in stats or "ops_per_s" not in old:
+                continue
+            ratio = stats["ops_per_s"] / old["ops_per_s"] if old["ops_per_s"] else float("inf")
+            lines.append(f"{suite}/{name}: {old['ops_per_s']:.1f} -> {stats['ops_per_s']:.1f} ops/s (x{ratio:.2f}), p95 {old['p95_ms']:.3f} -> {stats['p95_ms']:.3f} ms")
+    return lines
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--only", default=None, help=f"comma-separated subset of: {', '.join(SUITES)}")
+    ap.add_argument("--quick", action="store_true", help="smaller inputs (skips the 100k index)")
+    ap.add_argument("--latency-ms", type=float, default=5.0, help="latency of each stand-in service request")
+    ap.add_argument("--out", default=None, help="write results as JSON")
+    ap.add_argument("--compare", default=None, help="JSON from an earlier run to compare against")
+    args = ap.parse_args()
+
+    names = args.only.split(",") if args.only else list(SUITES)
+    unknown = [n for n in names if n not in SUITES]
+    if unknown:
+        raise SystemExit(f"Unknown suite(s): {', '.join(unknown)}. Supported: {', '.join(SUITES)}")
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": args.quick,
+            "latency_ms": args.latency_ms,
+        },
+        "results": {},
+    }
+    for name in names:
+        t0 = time.perf_counter()
+        if name == "end_to_end":
+            report["results"][name] = bench_end_to_end(args.quick, args.latency_ms)
+        else:
+            report["results"][name] = SUITES[name](args.quick)
+        print(f"{name}: done in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            for line in compare(report, json.load(f)):
+                print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""In-process stand-ins for the remote services the pipeline talks to.
+
+Each one is a ThreadingHTTPServer on 127.0.0.1 with a random port and an optional fixed
+latency per request. Answers are deterministic (derived from a hash of the request), so
+benchmark runs are comparable.
+
+    with SparqlStandIn(latency_s=0.005) as sparql, DatamuseStandIn() as dm:
+        ... sparql.url, dm.url ...
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+def _h(text: str) -> int:
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16)
+
+
+class _StandIn:
+    path = "/"
+
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "stand-in not started"
+        return f"http://127.0.0.1:{self._server.server_port}{self.path}"
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, str, bytes]:
+        raise NotImplementedError
+
+    def __enter__(self) -> "_StandIn":
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                with owner._lock:
+                    owner.requests += 1
+                if owner.latency_s:
+                    time.sleep(owner.latency_s)
+                u = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(u.query).items()}
+                status, ctype, body = owner.handle(u.path, params)
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+_INSTANCE_SUBSELECT = re.compile(r"SELECT DISTINCT \?val WHERE \{ (.*?) \} LIMIT (\d+) \} BIND\((\d+) AS \?i\)")
+_SINGLE = re.compile(r"SELECT DISTINCT \?val WHERE \{ (.*?) \} LIMIT (\d+)")
+
+
+class SparqlStandIn(_StandIn):
+    """Answers instance queries (single and batched forms); 0-7 instances per URI."""
+
+    path = "/sparql"
+
+    def _instances(self, pattern: str, limit: int) -> List[str]:
+        uri = re.search(r"<([^>]+)>", pattern)
+        key = uri.group(1) if uri else pattern
+        n = min(limit, _h(key) % 8)
+        return [f"http://example.org/instance/{_h(key) % 997}/{k}" for k in range(n)]
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, str, bytes]:
+        q = params.get("query", "")
+        rows: List[Dict[str, Any]] = []
+        batched = _INSTANCE_SUBSELECT.findall(q)
+        if batched:
+            for pattern, limit, i in batched:
+                rows += [{"i": {"type": "literal", "value": i}, "val": {"type": "uri", "value": v}} for v in self._instances(pattern, int(limit))]
+        else:
+            m = _SINGLE.search(q)
+            if m:
+                rows = [{"val": {"type": "uri", "value": v}} for v in self._instances(m.group(1), int(m.group(2)))]
+        body = json.dumps({"head": {"vars": ["val"]}, "results": {"bindings": rows}}).encode("utf-8")
+        return 200, "application/sparql-results+json", body
+
+
+class DatamuseStandIn(_StandIn):
+    """/sug and /words?rel_syn= over a small vocabulary."""
+
+    path = ""
+
+    def __init__(self, vocabulary: List[str], latency_s: float = 0.0):
+        super().__init__(latency_s)
+        self.vocabulary = vocabulary
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, str, bytes]:
+        term = params.get("s") or params.get("rel_syn") or ""
+        n = min(int(params.get("max", 10)), 3 if path.endswith("/sug") else 4)
+        h = _h(path + term)
+        words = [self.vocabulary[(h >> (8 * k)) % len(self.vocabulary)] for k in range(n)]
+        return 200, "application/json", json.dumps([{"word": w, "score": 100 - k} for k, w in enumerate(words)]).encode("utf-8")
+
+
+class WfsStandIn(_StandIn):
+    """DescribeFeatureType for a fixed schema and GetFeature with resultType=hits support."""
+
+    path = "/wfs"
+
+    def __init__(self, type_name: str, fields: List[Tuple[str, str]], latency_s: float = 0.0):
+        super().__init__(latency_s)
+        self.type_name = type_name
+        self.fields = fields
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, str, bytes]:
+        request = params.get("request", params.get("REQUEST", "")).lower()
+        if request == "describefeaturetype":
+            elements = "".join(f'<xsd:element name="{n}" type="{t}" minOccurs="0"/>' for n, t in self.fields)
+            body = (
+                '<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:gml="http://www.opengis.net/gml">'
+                f'<xsd:complexType name="{self.type_name}Type"><xsd:complexContent><xsd:extension base="gml:AbstractFeatureType">'
+                f"<xsd:sequence>{elements}</xsd:sequence></xsd:extension></xsd:complexContent></xsd:complexType>"
+                f'<xsd:element name="{self.type_name}" type="{self.type_name}Type"/></xsd:schema>'
+            )
+            return 200, "text/xml", body.encode("utf-8")
+        literals = re.findall(r"<Literal>(.*?)</Literal>", params.get("FILTER", ""))
+        matched = sum(1 for v in literals if _h(v) % 3 == 0)
+        body = (
+            '<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs" xmlns:gml="http://www.opengis.net/gml" '
+            f'numberOfFeatures="{matched}"/>'
+        )
+        return 200, "text/xml", body.encode("utf-8")
@@ -10,17 +10,31 @@ class SparqlEndpointConfig:
     url: str
     timeout_s: float = 20.0
     user_agent: str = "geosws-annotator/0.1.0"
+    max_retries: int = 3
+    backoff_s: float = 1.0
+    rate_limit_per_s: Optional[float] = None  # None = unthrottled
+    burst: Optional[float] = None
+    pool_size: int = 10
 
 
 @dataclass
 class OntologyIndexConfig:
-    # If provided, the matcher will use this local JSON index instead of querying SPARQL.
+    # If provided, the matcher will use this local index (JSON or binary) instead of querying SPARQL.
     index_path: Optional[str] = None
 
     # If building the index, these control what we fetch.
     languages: List[str] = field(default_factory=lambda: ["en"])
     limit_per_type: Optional[int] = None  # None = no LIMIT (can be slow)
 
+    # Rows per LIMIT/OFFSET page when building (None = one unpaged query per language)
+    page_size: Optional[int] = 10000
+    # Languages fetched concurrently by build-ontology-index
+    build_workers: int = 4
+
+    # Keep a JSON or SPARQL-built index in packed columns (interned URI namespaces, array
+    # columns, CSR postings): several times less memory, slightly slower element access
+    compact: bool = False
+
 
 @dataclass
 class ExternalResourcesConfig:
@@ -34,6 +48,9 @@ class ExternalResourcesConfig:
     # Provider-specific settings (API keys, base URLs, etc.)
     provider_settings: Dict[str, Any] = field(default_factory=dict)
 
+    # Provider lookups in flight at once per enrichment
+    max_workers: int = 8
+
 
 @dataclass
 class MatchingConfig:
@@ -48,6 +65,21 @@ class MatchingConfig:
     # When multiple candidates exist, keep top-k per term
     top_k: int = 10
 
+    # Skip labels that provably cannot reach any threshold (same results as the full scan)
+    prune_candidates: bool = True
+
+    # Similarity backend: 'scalar' (pure Python) or 'numpy' (one-vs-all vectorized, needs numpy)
+    backend: str = "scalar"
+
+    # Memoized match results (per normalized term); 0 disables the cache
+    cache_size: int = 4096
+
+    # Candidate retrieval: 'scan' scores every label that can reach a threshold; 'tokens'
+    # scores only the token_shortlist best BM25 matches on camelCase/snake_case tokens
+    # (finds compound names such as countryName, misses labels sharing no token)
+    retrieval: str = "scan"
+    token_shortlist: int = 200
+
 
 @dataclass
 class PipelineConfig:
@@ -57,13 +89,45 @@ class PipelineConfig:
     matching: MatchingConfig = field(default_factory=MatchingConfig)
 
     cache_sqlite_path: str = "data/cache.sqlite"
+    # Per-namespace expiry in seconds, e.g. {"sparql:": 604800, "enrich:": 2592000}
+    cache_ttl_s: Dict[str, float] = field(default_factory=dict)
+    # Keep at most this many entries (least recently used are evicted); None = unbounded
+    cache_max_entries: Optional[int] = None
+    # zlib-compress large cached values
+    cache_compress: bool = False
 
     # Sample sizes for instance retrieval and validation
     instances_limit: int = 50
     validation_trials: int = 20
+    # Validation probes in flight per host, and how long probe outcomes stay cached
+    probe_per_host: int = 4
+    probe_ttl_s: float = 86400.0
+    # WFS GetFeature validation: "per_value" sends one full request per value and accepts
+    # any FeatureCollection answer; "hits" ORs wfs_validation_batch values per request and
+    # only counts matching features
+    wfs_validation: str = "per_value"
+    wfs_validation_batch: int = 20
+    # Candidate URIs per batched instance query; 0 sends one query per URI
+    instances_batch_size: int = 25
 
     # Network
     http_timeout_s: float = 25.0
+    # "sequential" asks the SPARQL endpoints one after another in config order, "fanout"
+    # starts the best-ranked one and hedges to the next after hedge_delay_s
+    # (None = derived from the observed latency of the endpoint being waited on)
+    endpoint_policy: str = "sequential"
+    hedge_delay_s: Optional[float] = None
+    # Blocking calls in flight at once while annotating parameters
+    max_concurrency: int = 8
+    # Annotate each normalized parameter name once per run (memo_persist: keep the
+    # outcomes in the SQLite cache under "memo:" so later runs reuse them)
+    memo_parameters: bool = True
+    memo_persist: bool = False
+    # Outcomes kept in memory (oldest dropped first); None = unbounded
+    memo_max_entries: Optional[int] = 2048
+    # Instance lists shared by all candidates of a concept (see models.InstanceStore);
+    # None = unbounded
+    instance_store_max_entries: Optional[int] = 8192
 
 
 @dataclass
@@ -2,19 +2,152 @@ from __future__ import annotations
 
 import hashlib
 import json
-from typing import Dict, Any, List, Optional
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from ..utils.cache import SqliteCache
+from ..utils.metrics import Metrics
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# one bucket per (endpoint URL, rate, burst), shared by every client of that endpoint
+# configured with the same limit; a client with a different limit gets its own bucket
+_BUCKETS: Dict[Tuple[str, float, Optional[float]], TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def _bucket_for(endpoint_url: str, rate: float, burst: Optional[float]) -> TokenBucket:
+    key = (endpoint_url, float(rate), None if burst is None else float(burst))
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None:
+            bucket = _BUCKETS[key] = TokenBucket(rate, burst)
+        return bucket
+
+
+def _retry_after_s(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class EndpointStats:
+    """Smoothed latency (with its mean deviation) and success rate of one endpoint."""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.samples = 0
+        self.latency_s = 0.0
+        self.deviation_s = 0.0
+        self.success_rate = 1.0
+        self._lock = threading.Lock()
+
+    def record(self, latency_s: float, ok: bool) -> None:
+        with self._lock:
+            if self.samples == 0:
+                self.latency_s = latency_s
+                self.deviation_s = latency_s / 2
+            else:
+                self.deviation_s += self.alpha * (abs(latency_s - self.latency_s) - self.deviation_s)
+                self.latency_s += self.alpha * (latency_s - self.latency_s)
+            self.success_rate += self.alpha * ((1.0 if ok else 0.0) - self.success_rate)
+            self.samples += 1
+
+    def hedge_delay(self, default: float) -> float:
+        """How long to wait on this endpoint before asking the next one (TCP RTO style)."""
+        with self._lock:
+            if self.samples == 0:
+                return default
+            return self.latency_s + 4 * self.deviation_s
+
+    def rank(self) -> float:
+        """Expected cost of a request; lower is better, unmeasured endpoints come first."""
+        with self._lock:
+            if self.samples == 0:
+                return 0.0
+            return self.latency_s / max(self.success_rate, 0.05)
 
 
 class SparqlClient:
-    def __init__(self, endpoint_url: str, cache: SqliteCache | None = None, timeout_s: float = 20.0, user_agent: str = "geosws-annotator/0.1.0"):
+    # throttling / transient server errors worth retrying
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        cache: SqliteCache | None = None,
+        timeout_s: float = 20.0,
+        user_agent: str = "geosws-annotator/0.1.0",
+        max_retries: int = 3,
+        backoff_s: float = 1.0,
+        max_backoff_s: float = 60.0,
+        rate_limit_per_s: Optional[float] = None,
+        burst: Optional[float] = None,
+        pool_size: int = 10,
+        session: Optional[requests.Session] = None,
+        metrics: Optional[Metrics] = None,
+    ):
         self.endpoint_url = endpoint_url
         self.cache = cache
         self.timeout_s = timeout_s
         self.user_agent = user_agent
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.bucket = _bucket_for(endpoint_url, rate_limit_per_s, burst) if rate_limit_per_s else None
+        self.stats = EndpointStats()
+        # sparql.* counters (cache hits/misses, requests, retries) and HTTP latency
+        self.metrics = metrics
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.pool_size = pool_size
+
+        # identical queries in flight share one request
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
 
     def _cache_key(self, query: str) -> str:
         h = hashlib.sha256(query.encode("utf-8")).hexdigest()
@@ -24,19 +157,98 @@ class SparqlClient:
         key = self._cache_key(sparql)
         if self.cache:
             hit = self.cache.get(key)
+            if self.metrics is not None:
+                self.metrics.incr("sparql.cache_hit" if hit is not None else "sparql.cache_miss")
             if hit is not None:
                 return hit.value
+        return self._query_shared(key, sparql)
+
+    def query_many(self, queries: List[str], max_concurrency: int = 4, return_exceptions: bool = False) -> List[Any]:
+        """Run several queries concurrently (cache first, duplicates sent once).
+
+        Results come back in input order. With return_exceptions=True a failed query
+        yields its exception instead of raising.
+        """
+        keys = [self._cache_key(q) for q in queries]
+        results: Dict[str, Any] = {}
+        if self.cache:
+            results.update({k: hit.value for k, hit in self.cache.get_many(keys).items()})
+        todo = {k: q for k, q in zip(keys, queries) if k not in results}
+        if self.cache and self.metrics is not None:
+            self.metrics.incr("sparql.cache_hit", len(keys) - len(todo))
+            self.metrics.incr("sparql.cache_miss", len(todo))
+        if todo:
+            workers = max(1, min(max_concurrency, len(todo)))
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                futures = {k: ex.submit(self._query_shared, k, q) for k, q in todo.items()}
+            for k, fut in futures.items():
+                err = fut.exception()
+                if err is not None and not return_exceptions:
+                    raise err
+                results[k] = err if err is not None else fut.result()
+        return [results[k] for k in keys]
+
+    def _query_shared(self, key: str, sparql: str) -> Dict[str, Any]:
+        with self._inflight_lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+        if not owner:
+            return fut.result()
+        try:
+            data = self._fetch(sparql)
+            if self.cache:
+                self.cache.set(key, data)
+            fut.set_result(data)
+            return data
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _fetch(self, sparql: str) -> Dict[str, Any]:
         headers = {
             "Accept": "application/sparql-results+json",
             "User-Agent": self.user_agent,
         }
-        # DBpedia supports GET with ?query=
-        resp = requests.get(self.endpoint_url, params={"query": sparql, "format": "json"}, headers=headers, timeout=self.timeout_s)
-        resp.raise_for_status()
-        data = resp.json()
-        if self.cache:
-            self.cache.set(key, data)
-        return data
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            retry_after: Optional[float] = None
+            started = time.monotonic()
+            try:
+                # DBpedia supports GET with ?query=
+                resp = self.session.get(self.endpoint_url, params={"query": sparql, "format": "json"}, headers=headers, timeout=self.timeout_s)
+                self.stats.record(time.monotonic() - started, resp.status_code not in self.RETRY_STATUS)
+                self._record(started, resp.status_code >= 400)
+                if resp.status_code not in self.RETRY_STATUS or attempt >= self.max_retries:
+                    resp.raise_for_status()
+                    return resp.json()
+                retry_after = _retry_after_s(resp.headers.get("Retry-After"))
+                resp.close()
+            except (requests.ConnectionError, requests.Timeout):
+                self.stats.record(time.monotonic() - started, False)
+                self._record(started, True)
+                if attempt >= self.max_retries:
+                    raise
+            delay = min(self.max_backoff_s, self.backoff_s * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            if retry_after is not None:
+                delay = min(self.max_backoff_s, max(delay, retry_after))
+            if self.metrics is not None:
+                self.metrics.incr("sparql.retries")
+            time.sleep(delay)
+            attempt += 1
+
+    def _record(self, started: float, failed: bool) -> None:
+        if self.metrics is not None:
+            self.metrics.observe("sparql.http", time.monotonic() - started)
+            self.metrics.incr("sparql.requests")
+            if failed:
+                self.metrics.incr("sparql.errors")
 
     @staticmethod
     def bindings_to_values(data: Dict[str, Any], var: str) -> List[str]:
@@ -57,12 +269,52 @@ def sparql_instances_of_property(prop_uri: str, limit: int = 50) -> str:
     return f"SELECT DISTINCT ?val WHERE {{ ?val <{prop_uri}> ?b }} LIMIT {int(limit)}"
 
 
+def sparql_instances_batch(items: List[Tuple[str, int]], limit: int = 50) -> str:
+    # Listings 5.7/5.8 for many candidates in one request. Each URI gets its own LIMITed
+    # subselect (a LIMIT next to a VALUES block would cap the whole result, not each URI);
+    # ?i tags the rows with the position of the candidate so they can be split back.
+    parts = []
+    for i, (uri, typ) in enumerate(items):
+        pattern = f"?val a <{uri}>" if typ == 0 else f"?val <{uri}> ?b"
+        parts.append(f"  {{ {{ SELECT DISTINCT ?val WHERE {{ {pattern} }} LIMIT {int(limit)} }} BIND({i} AS ?i) }}")
+    return "SELECT ?i ?val WHERE {\n" + "\n  UNION\n".join(parts) + "\n}"
+
+
+def split_instances_batch(data: Dict[str, Any], n: int) -> List[List[str]]:
+    """Split the bindings of a sparql_instances_batch result back into one value list per item."""
+    out: List[List[str]] = [[] for _ in range(n)]
+    for row in data.get("results", {}).get("bindings", []):
+        if "i" in row and "val" in row:
+            i = int(row["i"]["value"])
+            if 0 <= i < n:
+                out[i].append(row["val"]["value"])
+    return out
+
+
 def sparql_all_classes_and_properties(lang: str = "en", limit: Optional[int] = None) -> str:
     # Fetch ontology elements and labels for a local index.
     # Note: endpoints differ; for DBpedia ontology this works reasonably well.
     lim = f"LIMIT {int(limit)}" if limit is not None else ""
     return f"""
-SELECT DISTINCT ?uri ?label ?type WHERE {{
+SELECT DISTINCT ?uri ?label ?type WHERE {{{_classes_and_properties_pattern(lang)}}} {lim}
+"""
+
+
+def sparql_all_classes_and_properties_page(lang: str = "en", limit: int = 10000, offset: int = 0) -> str:
+    # Same rows in a stable order, one LIMIT/OFFSET page at a time. The ordered DISTINCT
+    # runs in a subquery so Virtuoso (DBpedia) can page past its sorted-TOP row cap.
+    return f"""
+SELECT ?uri ?label ?type WHERE {{
+  {{
+    SELECT DISTINCT ?uri ?label ?type WHERE {{{_classes_and_properties_pattern(lang)}}}
+    ORDER BY ?uri ?type ?label
+  }}
+}} LIMIT {int(limit)} OFFSET {int(offset)}
+"""
+
+
+def _classes_and_properties_pattern(lang: str) -> str:
+    return f"""
   {{
     ?uri a owl:Class .
     OPTIONAL {{ ?uri rdfs:label ?label . FILTER(langMatches(lang(?label), '{lang}')) }}
@@ -74,5 +326,4 @@ SELECT DISTINCT ?uri ?label ?type WHERE {{
     OPTIONAL {{ ?uri rdfs:label ?label . FILTER(langMatches(lang(?label), '{lang}')) }}
     BIND('property' AS ?type)
   }}
-}} {lim}
 """
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import math
 from dataclasses import dataclass
 from typing import Tuple
 
 
+# slack for float rounding in score bounds
+_BOUND_EPS = 1e-9
+
+
 def levenshtein_distance(a: str, b: str) -> int:
     """Classic Levenshtein distance (O(len(a)*len(b)))."""
     if a == b:
@@ -29,6 +34,48 @@ def levenshtein_distance(a: str, b: str) -> int:
     return previous[-1]
 
 
+def levenshtein_distance_bounded(a: str, b: str, max_dist: int) -> int:
+    """Levenshtein distance if it is <= max_dist, otherwise max_dist + 1.
+
+    Only the diagonal band |i - j| <= max_dist is filled (Ukkonen) and the scan stops
+    as soon as a whole row exceeds the bound.
+    """
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+    n = len(a)
+    m = len(b)
+    big = max_dist + 1
+    if m - n > max_dist:
+        return big
+    if not a:
+        return m
+
+    previous = [j if j <= max_dist else big for j in range(n + 1)]
+    for i in range(1, m + 1):
+        bc = b[i - 1]
+        current = [big] * (n + 1)
+        if i <= max_dist:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - max_dist), min(n, i + max_dist) + 1):
+            v = previous[j - 1] + (0 if a[j - 1] == bc else 1)
+            if current[j - 1] + 1 < v:
+                v = current[j - 1] + 1
+            if previous[j] + 1 < v:
+                v = previous[j] + 1
+            if v > big:
+                v = big
+            current[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > max_dist:
+            return big
+        previous = current
+    return previous[n]
+
+
 def levenshtein_ratio(a: str, b: str) -> float:
     if not a and not b:
         return 1.0
@@ -84,6 +131,82 @@ def jaro_similarity(s: str, t: str) -> float:
     return (matches / s_len + matches / t_len + (matches - transpositions) / matches) / 3.0
 
 
+def _jaro_bounded(s: str, t: str, min_score: float) -> float:
+    """Same value as jaro_similarity, or -1.0 once the score provably stays below min_score."""
+    if s == t:
+        return 1.0
+    s_len = len(s)
+    t_len = len(t)
+    if s_len == 0 or t_len == 0:
+        return 0.0
+
+    # (c/s_len + c/t_len + 1) / 3 bounds the score for c common characters
+    min_matches = math.ceil((3.0 * min_score - 1.0) / (1.0 / s_len + 1.0 / t_len) - _BOUND_EPS)
+    if min_matches > min(s_len, t_len):
+        return -1.0
+
+    match_distance = max(s_len, t_len) // 2 - 1
+    s_matches = [False] * s_len
+    t_matches = [False] * t_len
+
+    matches = 0
+    transpositions = 0
+
+    for i in range(s_len):
+        if matches + (s_len - i) < min_matches:
+            return -1.0
+        start = max(0, i - match_distance)
+        end = min(i + match_distance + 1, t_len)
+        for j in range(start, end):
+            if t_matches[j]:
+                continue
+            if s[i] != t[j]:
+                continue
+            s_matches[i] = True
+            t_matches[j] = True
+            matches += 1
+            break
+
+    if matches == 0:
+        return 0.0
+    if matches < min_matches:
+        return -1.0
+
+    k = 0
+    for i in range(s_len):
+        if not s_matches[i]:
+            continue
+        while not t_matches[k]:
+            k += 1
+        if s[i] != t[k]:
+            transpositions += 1
+        k += 1
+
+    transpositions //= 2
+    return (matches / s_len + matches / t_len + (matches - transpositions) / matches) / 3.0
+
+
+def _common_prefix(s: str, t: str, max_prefix: int = 4) -> int:
+    prefix = 0
+    for sc, tc in zip(s, t):
+        if sc != tc:
+            break
+        prefix += 1
+        if prefix >= max_prefix:
+            break
+    return prefix
+
+
+def _max_edits(longest: int, ratio_threshold: float) -> int:
+    """Largest edit distance d with 1 - d/longest >= ratio_threshold (-1 if none)."""
+    k = min(max(int((1.0 - ratio_threshold) * longest), -1), longest)
+    while k < longest and 1.0 - (k + 1) / longest >= ratio_threshold:
+        k += 1
+    while k >= 0 and 1.0 - k / longest < ratio_threshold:
+        k -= 1
+    return k
+
+
 def jaro_winkler_similarity(s: str, t: str, prefix_scale: float = 0.1, max_prefix: int = 4) -> float:
     j = jaro_similarity(s, t)
     # common prefix up to max_prefix
@@ -111,3 +234,43 @@ def all_scores(a: str, b: str) -> SimilarityScores:
         jaro_winkler=jaro_winkler_similarity(a, b),
         levenshtein_ratio=levenshtein_ratio(a, b),
     )
+
+
+@dataclass(frozen=True)
+class SimilarityThresholds:
+    jaro: float = 0.92
+    jaro_winkler: float = 0.92
+    levenshtein_ratio: float = 0.85
+
+
+def scores_at_least(a: str, b: str, thresholds: SimilarityThresholds) -> SimilarityScores:
+    """Like all_scores, but only pays for the metrics that can still reach their threshold.
+
+    A metric that reaches its threshold carries exactly the value all_scores returns;
+    one that cannot is reported as 0.0.
+    """
+    if a == b:
+        return SimilarityScores(jaro=1.0, jaro_winkler=1.0, levenshtein_ratio=1.0)
+
+    jaro = 0.0
+    jaro_winkler = 0.0
+    prefix = _common_prefix(a, b)
+    # Jaro score needed for the Winkler boost to reach its threshold
+    jw_needed = (thresholds.jaro_winkler - prefix * 0.1) / (1.0 - prefix * 0.1)
+    j = _jaro_bounded(a, b, min(thresholds.jaro, jw_needed) - _BOUND_EPS)
+    if j >= 0.0:
+        if j >= thresholds.jaro:
+            jaro = j
+        jw = j + prefix * 0.1 * (1.0 - j)
+        if jw >= thresholds.jaro_winkler:
+            jaro_winkler = jw
+
+    ratio = 0.0
+    longest = max(len(a), len(b))
+    max_dist = _max_edits(longest, thresholds.levenshtein_ratio)
+    if max_dist >= 0:
+        dist = levenshtein_distance_bounded(a, b, max_dist)
+        if dist <= max_dist:
+            ratio = 1.0 - dist / longest
+
+    return SimilarityScores(jaro=jaro, jaro_winkler=jaro_winkler, levenshtein_ratio=ratio)
@@ -0,0 +1,514 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import mmap
+import os
+import pickle
+import shutil
+import sys
+from array import array
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from ..utils.text import normalize_term
+from .index import LengthBuckets, OntologyElement, TokenPostings, identifier_tokens
+
+
+# Binary ontology index layout:
+#   MAGIC | u32 header length | JSON header | sections (8-byte aligned)
+# The header lists every section as [offset, nbytes, typecode]. Columns are native-endian
+# arrays read in place through memoryview, so opening the file costs the same for any size.
+# compact_index() keeps the same columns in memory (arrays and bytes) instead of a file.
+# The pruning and token table sections (len_*, token_*) are matched in place too; they are
+# optional, so files written without them still open and build the tables on first match.
+MAGIC = b"GSWSIDX1"
+FORMAT_VERSION = 1
+_ALIGN = 8
+
+
+def is_binary_index(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def split_uri(uri: str) -> Tuple[str, str]:
+    """Split a URI into namespace prefix (including the last '/' or '#') and local name."""
+    cut = max(uri.rfind("/"), uri.rfind("#")) + 1
+    return uri[:cut], uri[cut:]
+
+
+class _StringColumn:
+    """Strings stored back to back in a UTF-8 blob plus an offsets array (n + 1 entries)."""
+
+    def __init__(self, blob: bytes | memoryview, offsets: Sequence[int]):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def raw(self, i: int) -> bytes:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+
+def _pack_strings(values: Sequence[str]) -> Tuple[bytes, array]:
+    blob = bytearray()
+    offsets = array("I", [0])
+    for v in values:
+        blob += v.encode("utf-8")
+        offsets.append(len(blob))
+    return bytes(blob), offsets
+
+
+class MappedElements(Sequence[OntologyElement]):
+    """Element table over packed columns (mapped file or memory); OntologyElement objects are built on access."""
+
+    def __init__(self, prefixes: _StringColumn, prefix_ids: Sequence[int], locals_: _StringColumn, labels: _StringColumn, types: Sequence[int]):
+        self._prefixes = prefixes
+        self._prefix_ids = prefix_ids
+        self._locals = locals_
+        self._labels = labels
+        self._types = types
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("element index out of range")
+        uri = self._prefixes[self._prefix_ids[i]] + self._locals[i]
+        return OntologyElement(uri=uri, label=self._labels[i], type=self._types[i])
+
+
+class MappedPostings(Mapping[str, List[int]]):
+    """Normalized label -> element indexes, over sorted labels and a flat postings array."""
+
+    def __init__(self, labels: _StringColumn, offsets: Sequence[int], postings: Sequence[int]):
+        self._labels = labels
+        self._offsets = offsets
+        self._postings = postings
+
+    def _find(self, key: str) -> int:
+        # UTF-8 bytes sort like the code points the labels were sorted by
+        kb = key.encode("utf-8")
+        lo, hi = 0, len(self._labels)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._labels.raw(mid) < kb:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._labels) and self._labels.raw(lo) == kb:
+            return lo
+        return -1
+
+    def __getitem__(self, key: str) -> List[int]:
+        i = self._find(key) if isinstance(key, str) else -1
+        if i < 0:
+            raise KeyError(key)
+        return list(self._postings[self._offsets[i]:self._offsets[i + 1]])
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self._labels)):
+            yield self._labels[i]
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+
+def _columns(elements: Sequence[OntologyElement], by_norm_label: Mapping[str, List[int]]) -> List[Tuple[str, Any]]:
+    # URIs are split into an interned namespace (prefix id) and a local name; the
+    # normalized-label postings become CSR arrays (offsets into one flat postings array)
+    prefix_ids: Dict[str, int] = {}
+    el_prefix = array("I")
+    local_blob, local_offsets = bytearray(), array("I", [0])
+    label_blob, label_offsets = bytearray(), array("I", [0])
+    el_type = array("B")
+    for el in elements:
+        prefix, local = split_uri(el.uri)
+        el_prefix.append(prefix_ids.setdefault(prefix, len(prefix_ids)))
+        local_blob += local.encode("utf-8")
+        local_offsets.append(len(local_blob))
+        label_blob += el.label.encode("utf-8")
+        label_offsets.append(len(label_blob))
+        el_type.append(el.type)
+
+    norm_labels = sorted(by_norm_label)
+    post_offsets = array("I", [0])
+    postings = array("I")
+    for k in norm_labels:
+        postings.extend(by_norm_label[k])
+        post_offsets.append(len(postings))
+
+    prefix_blob, prefix_offsets = _pack_strings(list(prefix_ids))
+    norm_blob, norm_offsets = _pack_strings(norm_labels)
+
+    return [
+        ("prefix_blob", prefix_blob), ("prefix_offsets", prefix_offsets),
+        ("el_prefix", el_prefix),
+        ("local_blob", bytes(local_blob)), ("local_offsets", local_offsets),
+        ("label_blob", bytes(label_blob)), ("label_offsets", label_offsets),
+        ("el_type", el_type),
+        ("norm_blob", norm_blob), ("norm_offsets", norm_offsets),
+        ("post_offsets", post_offsets), ("postings", postings),
+    ]
+
+
+def _csr(groups: Iterator[Sequence[int]]) -> Tuple[array, array]:
+    offsets, flat = array("I", [0]), array("I")
+    for g in groups:
+        flat.extend(g)
+        offsets.append(len(flat))
+    return offsets, flat
+
+
+def _sorted_labels(by_norm_label: Mapping[str, List[int]]) -> Sequence[str]:
+    # packed postings keep their labels sorted already
+    return by_norm_label._labels if isinstance(by_norm_label, MappedPostings) else sorted(by_norm_label)
+
+
+def _bucket_columns(labels: Sequence[str]) -> List[Tuple[str, Any]]:
+    # label ids are positions in `labels` (sorted, as in norm_blob), grouped by label length
+    by_length: Dict[int, array] = {}
+    for i in range(len(labels)):
+        by_length.setdefault(len(labels[i]), array("I")).append(i)
+    keys = array("I", sorted(by_length))
+    offsets, ids = _csr(by_length[m] for m in keys)
+    return [("len_keys", keys), ("len_offsets", offsets), ("len_ids", ids)]
+
+
+def _token_columns(elements: Sequence[OntologyElement], by_norm_label: Mapping[str, List[int]], labels: Sequence[str]) -> List[Tuple[str, Any]]:
+    # tokens come from the raw labels (camelCase is gone once normalized); labels without
+    # one fall back to the URI's local name, as in by_norm_label
+    token_ids: Dict[str, array] = {}
+    doc_len = array("I")
+    for i in range(len(labels)):
+        tokens: Dict[str, None] = {}
+        for idx in by_norm_label[labels[i]]:
+            el = elements[idx]
+            tokens.update(dict.fromkeys(identifier_tokens(el.label or el.uri.rsplit("/", 1)[-1])))
+        for tok in tokens:
+            token_ids.setdefault(tok, array("I")).append(i)
+        doc_len.append(len(tokens))
+    token_list = sorted(token_ids)
+    post_offsets, postings = _csr(token_ids[t] for t in token_list)
+    blob, offsets = _pack_strings(token_list)
+    return [
+        ("token_blob", blob), ("token_offsets", offsets),
+        ("token_post_offsets", post_offsets), ("token_postings", postings),
+        ("token_doc_len", doc_len),
+    ]
+
+
+def _bucket_table(section: Callable[[str], Any], labels: Sequence[str]) -> LengthBuckets:
+    return LengthBuckets(labels, section("len_keys"), section("len_offsets"), section("len_ids"))
+
+
+def _token_table(section: Callable[[str], Any], labels: Sequence[str]) -> TokenPostings:
+    tokens = _StringColumn(section("token_blob"), section("token_offsets"))
+    return TokenPostings(labels, MappedPostings(tokens, section("token_post_offsets"), section("token_postings")), section("token_doc_len"))
+
+
+def build_length_buckets(by_norm_label: Mapping[str, List[int]]) -> LengthBuckets:
+    """Similarity pruning buckets over flat arrays, built in memory."""
+    labels = _sorted_labels(by_norm_label)
+    return _bucket_table(dict(_bucket_columns(labels)).__getitem__, labels)
+
+
+def build_token_postings(elements: Sequence[OntologyElement], by_norm_label: Mapping[str, List[int]]) -> TokenPostings:
+    """Token shortlist postings over flat arrays, built in memory."""
+    labels = _sorted_labels(by_norm_label)
+    return _token_table(dict(_token_columns(elements, by_norm_label, labels)).__getitem__, labels)
+
+
+def _tables(section: Callable[[str], Any]) -> Tuple[MappedElements, MappedPostings]:
+    elements = MappedElements(
+        prefixes=_StringColumn(section("prefix_blob"), section("prefix_offsets")),
+        prefix_ids=section("el_prefix"),
+        locals_=_StringColumn(section("local_blob"), section("local_offsets")),
+        labels=_StringColumn(section("label_blob"), section("label_offsets")),
+        types=section("el_type"),
+    )
+    postings = MappedPostings(_StringColumn(section("norm_blob"), section("norm_offsets")), section("post_offsets"), section("postings"))
+    return elements, postings
+
+
+def compact_index(elements: Sequence[OntologyElement], by_norm_label: Mapping[str, List[int]]) -> Tuple[MappedElements, MappedPostings]:
+    """The binary index tables built in memory: several times smaller than element objects and dicts."""
+    columns = dict(_columns(elements, by_norm_label))
+    return _tables(columns.__getitem__)
+
+
+def write_binary_index(path: str, elements: Sequence[OntologyElement], by_norm_label: Mapping[str, List[int]]) -> None:
+    labels = sorted(by_norm_label)
+    sections = _columns(elements, by_norm_label) + _bucket_columns(labels) + _token_columns(elements, by_norm_label, labels)
+    _write_sections(path, len(elements), [_memory_section(name, data) for name, data in sections])
+
+
+# (name, nbytes, typecode, write the payload to the open index file)
+_Section = Tuple[str, int, str, Callable[[BinaryIO], Any]]
+
+
+def _memory_section(name: str, data: Any) -> _Section:
+    raw = data.tobytes() if isinstance(data, array) else data
+    return name, len(raw), data.typecode if isinstance(data, array) else "B", lambda f: f.write(raw)
+
+
+def _write_sections(path: str, n_elements: int, sections: List[_Section]) -> None:
+    # header size depends on the offsets it contains; fix it with a generous fixed width
+    header: Dict[str, Any] = {
+        "format_version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "n_elements": n_elements,
+        "sections": {},
+    }
+    reserve = len(json.dumps({**header, "sections": {n: [10**15, 10**15, t] for n, _, t, _ in sections}}).encode("utf-8"))
+    pos = _aligned(len(MAGIC) + 4 + reserve)
+    for name, nbytes, typecode, _ in sections:
+        header["sections"][name] = [pos, nbytes, typecode]
+        pos = _aligned(pos + nbytes)
+    header_bytes = json.dumps(header).encode("utf-8").ljust(reserve)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(4, "little"))
+        f.write(header_bytes)
+        for name, _, _, write in sections:
+            f.seek(header["sections"][name][0])
+            write(f)
+        f.truncate(max(pos, f.tell()))
+
+
+class ExternalSorter:
+    """Sorts items with bounded memory: every `chunk` items are sorted and spilled to a run
+    file in work_dir, and iterating merges the runs."""
+
+    def __init__(self, work_dir: str, name: str, chunk: int = 200_000):
+        self._work_dir = work_dir
+        self._name = name
+        self._chunk = max(1, chunk)
+        self._items: List[Any] = []
+        self._runs: List[str] = []
+
+    def add(self, item: Any) -> None:
+        self._items.append(item)
+        if len(self._items) >= self._chunk:
+            self._spill()
+
+    def _spill(self) -> None:
+        self._items.sort()
+        path = os.path.join(self._work_dir, f"{self._name}.{len(self._runs)}.run")
+        with open(path, "wb") as f:
+            for i in range(0, len(self._items), 4096):
+                pickle.dump(self._items[i:i + 4096], f, pickle.HIGHEST_PROTOCOL)
+        self._runs.append(path)
+        self._items = []
+
+    def __iter__(self) -> Iterator[Any]:
+        if not self._runs:
+            self._items.sort()
+            return iter(self._items)
+        if self._items:
+            self._spill()
+        return heapq.merge(*(self._read(path) for path in self._runs))
+
+    @staticmethod
+    def _read(path: str) -> Iterator[Any]:
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                yield from batch
+
+    def cleanup(self) -> None:
+        for path in self._runs:
+            os.remove(path)
+        self._runs = []
+
+
+class _Spool:
+    """One section written to a scratch file as it is produced (raw bytes, or array items)."""
+
+    def __init__(self, path: str, typecode: str = "B"):
+        self.typecode = typecode
+        self.nbytes = 0
+        self._path = path
+        self._f = open(path, "w+b")
+        self._buf = array(typecode)
+
+    def __len__(self) -> int:
+        return self.nbytes // self._buf.itemsize + len(self._buf)
+
+    def append(self, value: int) -> None:
+        self._buf.append(value)
+        if len(self._buf) >= 65536:
+            self._flush()
+
+    def write(self, raw: bytes) -> None:
+        self._flush()
+        self._f.write(raw)
+        self.nbytes += len(raw)
+
+    def _flush(self) -> None:
+        if self._buf:
+            raw = self._buf.tobytes()
+            self._f.write(raw)
+            self.nbytes += len(raw)
+            self._buf = array(self.typecode)
+
+    def section(self, name: str) -> _Section:
+        self._flush()
+
+        def write(out: BinaryIO) -> None:
+            self._f.seek(0)
+            shutil.copyfileobj(self._f, out)
+
+        return name, self.nbytes, self.typecode, write
+
+    def close(self) -> None:
+        self._f.close()
+        os.remove(self._path)
+
+
+class BinaryIndexWriter:
+    """Writes a binary index from a stream of elements with bounded memory.
+
+    Element columns go to scratch files in work_dir as elements are added. The normalized
+    label postings, length buckets and token postings are grouped with ExternalSorter, and
+    close() copies every section into the index file one at a time. The file is the same
+    as write_binary_index() writes for those elements.
+    """
+
+    def __init__(self, path: str, work_dir: str, sort_chunk: int = 200_000):
+        self.path = path
+        self.n_elements = 0
+        self._work_dir = work_dir
+        self._sort_chunk = sort_chunk
+        self._prefix_ids: Dict[str, int] = {}
+        self._spools: Dict[str, _Spool] = {}
+        for name, typecode in (
+            ("el_prefix", "I"), ("local_blob", "B"), ("local_offsets", "I"), ("label_blob", "B"), ("label_offsets", "I"), ("el_type", "B"),
+            ("norm_blob", "B"), ("norm_offsets", "I"), ("post_offsets", "I"), ("postings", "I"), ("len_ids", "I"),
+            ("token_blob", "B"), ("token_offsets", "I"), ("token_post_offsets", "I"), ("token_postings", "I"), ("token_doc_len", "I"),
+        ):
+            self._spools[name] = _Spool(os.path.join(work_dir, f"{name}.col"), typecode)
+        for name in ("local_offsets", "label_offsets", "norm_offsets", "post_offsets", "token_offsets", "token_post_offsets"):
+            self._spools[name].append(0)
+        # (normalized label, element index) and (normalized label, token) pairs
+        self._by_label = self._sorter("by_label")
+        self._label_tokens = self._sorter("label_tokens")
+
+    def _sorter(self, name: str) -> ExternalSorter:
+        return ExternalSorter(self._work_dir, name, self._sort_chunk)
+
+    def add(self, uri: str, label: str, type: int) -> None:
+        sp = self._spools
+        prefix, local = split_uri(uri)
+        sp["el_prefix"].append(self._prefix_ids.setdefault(prefix, len(self._prefix_ids)))
+        sp["local_blob"].write(local.encode("utf-8"))
+        sp["local_offsets"].append(sp["local_blob"].nbytes)
+        sp["label_blob"].write(label.encode("utf-8"))
+        sp["label_offsets"].append(sp["label_blob"].nbytes)
+        sp["el_type"].append(type)
+        # same keys and tokens as OntologyIndex and _token_columns
+        name = label or uri.rsplit("/", 1)[-1]
+        key = normalize_term(name)
+        self._by_label.add((key, self.n_elements))
+        for tok in dict.fromkeys(identifier_tokens(name)):
+            self._label_tokens.add((key, tok))
+        self.n_elements += 1
+
+    def close(self) -> int:
+        """Write the index file, remove the scratch files and return the element count."""
+        sp = self._spools
+        lengths = self._sorter("lengths")
+        token_labels = self._sorter("token_labels")
+        pending = iter(self._label_tokens)
+        nxt = next(pending, None)
+        for label_id, (key, group) in enumerate(itertools.groupby(self._by_label, key=lambda kv: kv[0])):
+            sp["norm_blob"].write(key.encode("utf-8"))
+            sp["norm_offsets"].append(sp["norm_blob"].nbytes)
+            for _, idx in group:
+                sp["postings"].append(idx)
+            sp["post_offsets"].append(len(sp["postings"]))
+            lengths.add((len(key), label_id))
+            # both streams are sorted on the normalized label, and every label in the token
+            # stream also has postings
+            tokens: Dict[str, None] = {}
+            while nxt is not None and nxt[0] == key:
+                tokens[nxt[1]] = None
+                nxt = next(pending, None)
+            for tok in tokens:
+                token_labels.add((tok, label_id))
+            sp["token_doc_len"].append(len(tokens))
+
+        len_keys, len_offsets = array("I"), array("I", [0])
+        for m, group in itertools.groupby(lengths, key=lambda kv: kv[0]):
+            len_keys.append(m)
+            for _, label_id in group:
+                sp["len_ids"].append(label_id)
+            len_offsets.append(len(sp["len_ids"]))
+
+        for tok, group in itertools.groupby(token_labels, key=lambda kv: kv[0]):
+            sp["token_blob"].write(tok.encode("utf-8"))
+            sp["token_offsets"].append(sp["token_blob"].nbytes)
+            for _, label_id in group:
+                sp["token_postings"].append(label_id)
+            sp["token_post_offsets"].append(len(sp["token_postings"]))
+
+        prefix_blob, prefix_offsets = _pack_strings(list(self._prefix_ids))
+        sections = [_memory_section("prefix_blob", prefix_blob), _memory_section("prefix_offsets", prefix_offsets)]
+        for name in ("el_prefix", "local_blob", "local_offsets", "label_blob", "label_offsets", "el_type", "norm_blob", "norm_offsets", "post_offsets", "postings"):
+            sections.append(sp[name].section(name))
+        sections += [_memory_section("len_keys", len_keys), _memory_section("len_offsets", len_offsets), sp["len_ids"].section("len_ids")]
+        for name in ("token_blob", "token_offsets", "token_post_offsets", "token_postings", "token_doc_len"):
+            sections.append(sp[name].section(name))
+        _write_sections(self.path, self.n_elements, sections)
+
+        for sorter in (self._by_label, self._label_tokens, lengths, token_labels):
+            sorter.cleanup()
+        for spool in sp.values():
+            spool.close()
+        return self.n_elements
+
+
+def open_binary_index(path: str) -> Tuple[MappedElements, MappedPostings, Optional[LengthBuckets], Optional[TokenPostings]]:
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a binary ontology index")
+    header_len = int.from_bytes(view[len(MAGIC):len(MAGIC) + 4], "little")
+    start = len(MAGIC) + 4
+    header = json.loads(bytes(view[start:start + header_len]))
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported binary index version {header.get('format_version')} in {path}")
+    if header.get("byteorder") != sys.byteorder:
+        raise ValueError(f"{path} was written on a {header.get('byteorder')}-endian machine; rebuild it or use the JSON index")
+
+    def section(name: str) -> memoryview:
+        off, nbytes, typecode = header["sections"][name]
+        return view[off:off + nbytes].cast(typecode)
+
+    elements, postings = _tables(section)
+    sections = header["sections"]
+    buckets = _bucket_table(section, postings._labels) if "len_ids" in sections else None
+    tokens = _token_table(section, postings._labels) if "token_postings" in sections else None
+    return elements, postings, buckets, tokens
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
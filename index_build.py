@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..sparql.client import SparqlClient
+from .index import iter_ontology_rows
+from .index_binary import BinaryIndexWriter, ExternalSorter
+
+
+class OntologyIndexBuilder:
+    """Paginated, resumable ontology index build.
+
+    Every page of (uri, label, type) rows is appended to a per-language staging file in
+    work_dir, and checkpoint.json records how many rows and bytes of each file are
+    complete. An interrupted build restarts at the next page instead of from scratch.
+    Languages are fetched concurrently.
+
+    Once every language is staged, the rows are deduplicated with sorted runs on disk and
+    streamed into the index file (BinaryIndexWriter for binary, one element at a time for
+    JSON), so memory stays bounded whatever the ontology size.
+    """
+
+    CHECKPOINT = "checkpoint.json"
+
+    def __init__(
+        self,
+        client: SparqlClient,
+        work_dir: str,
+        languages: List[str] | None = None,
+        limit: Optional[int] = None,
+        page_size: int = 10000,
+        max_workers: int = 4,
+        sort_chunk: int = 200_000,
+    ):
+        self.client = client
+        self.work_dir = work_dir
+        self.languages = languages or ["en"]
+        self.limit = limit
+        self.page_size = page_size
+        self.max_workers = max(1, max_workers)
+        # rows held in memory per sorted run (dedupe and binary index grouping)
+        self.sort_chunk = sort_chunk
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = {}
+
+    def build(self, path: str, fmt: str = "auto", fresh: bool = False) -> int:
+        """Fetch every language (resuming from the checkpoint) and write the index to path
+        as 'json' or 'binary' ('auto' picks binary for *.bin paths). Returns the element count."""
+        if fmt == "auto":
+            fmt = "binary" if path.endswith(".bin") else "json"
+        if fmt not in ("json", "binary"):
+            raise ValueError(f"Unknown index format '{fmt}'. Supported: auto, json, binary")
+        os.makedirs(self.work_dir, exist_ok=True)
+        self._state = self._load_checkpoint(fresh)
+        workers = min(self.max_workers, len(self.languages))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = [ex.submit(self._fetch_language, lang) for lang in self.languages]
+        # re-raise the first failure once every language got as far as it could
+        for fut in futures:
+            fut.result()
+        if fmt == "binary":
+            writer = BinaryIndexWriter(path, self.work_dir, sort_chunk=self.sort_chunk)
+            for uri, label, t in self._unique_rows():
+                writer.add(uri, label, t)
+            return writer.close()
+        return _write_json_index(path, self._unique_rows())
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _rows_path(self, lang: str) -> str:
+        return os.path.join(self.work_dir, f"rows_{lang}.jsonl")
+
+    def _settings(self) -> Dict[str, Any]:
+        return {"endpoint": self.client.endpoint_url, "limit": self.limit, "page_size": self.page_size}
+
+    def _load_checkpoint(self, fresh: bool) -> Dict[str, Any]:
+        path = os.path.join(self.work_dir, self.CHECKPOINT)
+        state: Dict[str, Any] = {}
+        if not fresh and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        # offsets from a build with other settings would not line up with our pages
+        if state.get("settings") != self._settings():
+            state = {"settings": self._settings(), "languages": {}}
+        return state
+
+    def _save_checkpoint(self) -> None:
+        path = os.path.join(self.work_dir, self.CHECKPOINT)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(tmp, path)
+
+    def _fetch_language(self, lang: str) -> None:
+        with self._lock:
+            st = self._state["languages"].setdefault(lang, {"offset": 0, "bytes": 0, "done": False})
+            if st["done"]:
+                return
+        with open(self._rows_path(lang), "a+b") as f:
+            # drop rows of a page that was written but never checkpointed
+            f.truncate(st["bytes"])
+            for rows in iter_ontology_rows(self.client, lang, limit=self.limit, page_size=self.page_size, offset=st["offset"]):
+                f.write(b"".join(json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n" for r in rows))
+                f.flush()
+                with self._lock:
+                    st["offset"] += len(rows)
+                    st["bytes"] = f.tell()
+                    self._save_checkpoint()
+        with self._lock:
+            st["done"] = True
+            self._save_checkpoint()
+
+    def _staged_rows(self) -> Iterator[Tuple[str, str, int]]:
+        for lang in self.languages:
+            with open(self._rows_path(lang), "r", encoding="utf-8") as f:
+                for line in f:
+                    uri, label, t = json.loads(line)
+                    yield uri, label, t
+
+    def _unique_rows(self) -> Iterator[Tuple[str, str, int]]:
+        """Staged rows in fetch order, keeping the first of each (uri, label, type)."""
+        # sort (row, position) in runs to find the first position of every row, then sort
+        # those positions and stream the staging files once more, yielding only them
+        by_row = ExternalSorter(self.work_dir, "rows", self.sort_chunk)
+        for pos, row in enumerate(self._staged_rows()):
+            by_row.add((*row, pos))
+        first = ExternalSorter(self.work_dir, "first", self.sort_chunk)
+        last = None
+        for uri, label, t, pos in by_row:
+            if (uri, label, t) != last:
+                first.add(pos)
+                last = (uri, label, t)
+        by_row.cleanup()
+        keep = iter(first)
+        nxt = next(keep, None)
+        for pos, row in enumerate(self._staged_rows()):
+            if pos == nxt:
+                yield row
+                nxt = next(keep, None)
+        first.cleanup()
+
+
+def _write_json_index(path: str, rows: Iterable[Tuple[str, str, int]]) -> int:
+    # the layout of OntologyIndex.to_json (json.dump with indent=2), written one element at a time
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{\n  "elements": [')
+        for uri, label, t in rows:
+            item = json.dumps({"uri": uri, "label": label, "type": t}, ensure_ascii=False, indent=2)
+            f.write(("," if n else "") + "\n    " + item.replace("\n", "\n    "))
+            n += 1
+        f.write("\n  ]\n}" if n else "]\n}")
+    return n
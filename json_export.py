@@ -1,8 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Any, List, Protocol, Optional
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterable, List, Protocol, Optional, Tuple
 import requests
+from requests.adapters import HTTPAdapter
+
+from ..utils.similarity import levenshtein_distance_bounded
+from ..utils.text import normalize_term, split_identifier
 
 
 class SuggestionProvider(Protocol):
@@ -21,16 +31,220 @@ class DatamuseProvider:
     """
     base_url: str = "https://api.datamuse.com"
     timeout_s: float = 15.0
+    pool_size: int = 10
+    # keep-alive connections shared by concurrent lookups
+    session: requests.Session = field(default=None, repr=False, compare=False)  # type: ignore[assignment]
 
-    def suggestions(self, term: str, max_results: int = 10) -> List[str]:
-        resp = requests.get(f"{self.base_url}/sug", params={"s": term, "max": max_results}, timeout=self.timeout_s)
+    def __post_init__(self) -> None:
+        if self.session is None:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+
+    @property
+    def cache_id(self) -> str:
+        # cache keys of lookups (see Enricher): one namespace per API
+        return f"datamuse({self.base_url})"
+
+    def _words(self, path: str, params: Dict[str, Any]) -> List[str]:
+        resp = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout_s)
         resp.raise_for_status()
         return [x["word"] for x in resp.json() if "word" in x]
 
+    def suggestions(self, term: str, max_results: int = 10) -> List[str]:
+        return self._words("/sug", {"s": term, "max": max_results})
+
     def synonyms(self, term: str, max_results: int = 10) -> List[str]:
-        resp = requests.get(f"{self.base_url}/words", params={"rel_syn": term, "max": max_results}, timeout=self.timeout_s)
-        resp.raise_for_status()
-        return [x["word"] for x in resp.json() if "word" in x]
+        return self._words("/words", {"rel_syn": term, "max": max_results})
+
+
+# WordNet prolog export: s(synset_id, w_num, 'word', ss_type, sense_number, tag_count).
+_WN_S_RE = re.compile(r"^s\((\d+),\d+,'((?:[^']|'')*)',")
+
+
+def _lexicon_key(term: str) -> str:
+    return normalize_term(" ".join(split_identifier(term)))
+
+
+class LexiconProvider:
+    """Offline suggestions/synonyms from a local lexicon file.
+
+    Supported files:
+    - WordNet prolog synsets (wn_s.pl): words sharing a synset id are synonyms
+    - TSV (anything else): one synset per line, words separated by tabs; '#' starts a comment
+
+    Words earlier in the file rank higher. Suggestions are prefix matches over a sorted array
+    of normalized words, then words within a small edit distance (shortlisted through a
+    bigram index), then the same for each token of a multi-word term. Synonyms come from
+    the synsets a word belongs to.
+    """
+
+    # lookups are in-memory; the Enricher skips its cache for them
+    cacheable = False
+
+    def __init__(self, path: str, fuzzy: bool = True):
+        self.path = path
+        self.fuzzy = fuzzy
+        self.cache_id = f"lexicon({path},fuzzy={fuzzy})"
+
+        # word ids are assigned in file order, so the id doubles as the rank
+        words: List[str] = []
+        keys: List[str] = []
+        ids: Dict[str, int] = {}
+        synsets: List[array] = []
+        word_synsets: List[List[int]] = []
+        for members in self._read_synsets(path):
+            row: List[int] = []
+            for w in members:
+                key = _lexicon_key(w)
+                if not key:
+                    continue
+                i = ids.get(key)
+                if i is None:
+                    i = ids[key] = len(words)
+                    words.append(w)
+                    keys.append(key)
+                    word_synsets.append([])
+                if i not in row:
+                    row.append(i)
+                    word_synsets[i].append(len(synsets))
+            if row:
+                synsets.append(array("I", row))
+        self._words = words
+        self._synsets = synsets
+        self._word_synsets = [array("I", x) for x in word_synsets]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._keys = [keys[i] for i in order]
+        self._key_ids = array("I", order)
+        self._grams: Optional[Dict[str, array]] = None
+        self._lengths: Optional[Dict[int, array]] = None
+        self._grams_lock = threading.Lock()
+
+    @staticmethod
+    def _read_synsets(path: str) -> List[List[str]]:
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".pl"):
+                by_id: Dict[str, List[str]] = {}
+                for line in f:
+                    m = _WN_S_RE.match(line)
+                    if m:
+                        by_id.setdefault(m.group(1), []).append(m.group(2).replace("''", "'").replace("_", " "))
+                return list(by_id.values())
+            out = []
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    out.append([w.strip() for w in line.split("\t") if w.strip()])
+            return out
+
+    def _lookup(self, key: str) -> int:
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._key_ids[i]
+        return -1
+
+    def suggestions(self, term: str, max_results: int = 10) -> List[str]:
+        key = _lexicon_key(term)
+        if not key:
+            return []
+        ids = self._prefix(key, max_results)
+        if not ids and self.fuzzy:
+            ids = self._fuzzy(key, max_results)
+        if not ids and " " in key:
+            for tok in key.split(" "):
+                ids.extend(i for i in self._prefix(tok, max_results) or (self._fuzzy(tok, max_results) if self.fuzzy else []) if i not in ids)
+            ids = ids[:max_results]
+        return [self._words[i] for i in ids]
+
+    def _prefix(self, key: str, max_results: int) -> List[int]:
+        lo = bisect_left(self._keys, key)
+        hi = bisect_left(self._keys, key + "\uffff", lo)
+        # exact word first, then the higher ranked completions
+        best = heapq.nsmallest(max_results, range(lo, hi), key=lambda j: (self._keys[j] != key, self._key_ids[j]))
+        return [self._key_ids[j] for j in best]
+
+    def _fuzzy(self, key: str, max_results: int) -> List[int]:
+        # about one edit per three characters
+        max_dist = max(1, round(len(key) * 0.3))
+        hits: List[Tuple[int, int]] = []
+        for j in self._fuzzy_candidates(key, max_dist):
+            cand = self._keys[j]
+            if abs(len(cand) - len(key)) > max_dist:
+                continue
+            d = levenshtein_distance_bounded(key, cand, max_dist)
+            if d <= max_dist:
+                hits.append((d, self._key_ids[j]))
+        return [i for _, i in heapq.nsmallest(max_results, hits)]
+
+    def _fuzzy_candidates(self, key: str, max_dist: int) -> Iterable[int]:
+        # q-gram lemma: each edit breaks at most two padded bigrams of the query
+        grams = set(_padded_bigrams(key))
+        need = len(grams) - 2 * max_dist
+        if need <= 0:
+            # the lemma rules nothing out (short keys, repeated bigrams): every key of a
+            # length within max_dist is a candidate
+            by_length = self._length_index()
+            return sorted(j for n in range(len(key) - max_dist, len(key) + max_dist + 1) for j in by_length.get(n, ()))
+        postings = self._gram_index()
+        counts: Counter = Counter()
+        for g in grams:
+            counts.update(postings.get(g, ()))
+        return sorted(j for j, c in counts.items() if c >= need)
+
+    def _gram_index(self) -> Dict[str, array]:
+        if self._grams is None:
+            with self._grams_lock:
+                if self._grams is None:
+                    grams: Dict[str, array] = {}
+                    for j, key in enumerate(self._keys):
+                        for g in set(_padded_bigrams(key)):
+                            grams.setdefault(g, array("I")).append(j)
+                    self._grams = grams
+        return self._grams
+
+    def _length_index(self) -> Dict[int, array]:
+        if self._lengths is None:
+            with self._grams_lock:
+                if self._lengths is None:
+                    lengths: Dict[int, array] = {}
+                    for j, key in enumerate(self._keys):
+                        lengths.setdefault(len(key), array("I")).append(j)
+                    self._lengths = lengths
+        return self._lengths
+
+    def synonyms(self, term: str, max_results: int = 10) -> List[str]:
+        i = self._lookup(_lexicon_key(term))
+        if i < 0:
+            return []
+        out: List[str] = []
+        seen = {i}
+        for s in self._word_synsets[i]:
+            for j in self._synsets[s]:
+                if j not in seen:
+                    seen.add(j)
+                    out.append(self._words[j])
+                    if len(out) >= max_results:
+                        return out
+        return out
+
+
+def _padded_bigrams(key: str) -> List[str]:
+    padded = f"^{key}$"
+    return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+
+# suggestion and synonym providers on the same file share one loaded lexicon
+_LEXICONS: Dict[Tuple[str, bool], LexiconProvider] = {}
+_LEXICONS_LOCK = threading.Lock()
+
+
+def _load_lexicon(path: str, fuzzy: bool) -> LexiconProvider:
+    with _LEXICONS_LOCK:
+        lex = _LEXICONS.get((path, fuzzy))
+        if lex is None:
+            lex = _LEXICONS[(path, fuzzy)] = LexiconProvider(path, fuzzy=fuzzy)
+        return lex
 
 
 def build_provider(name: str, settings: Dict[str, Any]) -> Any:
@@ -39,5 +253,10 @@ def build_provider(name: str, settings: Dict[str, Any]) -> Any:
         return DatamuseProvider(
             base_url=settings.get("base_url", "https://api.datamuse.com"),
             timeout_s=float(settings.get("timeout_s", 15.0)),
+            pool_size=int(settings.get("pool_size", 10)),
         )
-    raise ValueError(f"Unknown provider '{name}'. Supported: datamuse")
+    if name == "lexicon":
+        if not settings.get("path"):
+            raise ValueError("The lexicon provider needs a 'path' setting")
+        return _load_lexicon(settings["path"], bool(settings.get("fuzzy", True)))
+    raise ValueError(f"Unknown provider '{name}'. Supported: datamuse, lexicon")
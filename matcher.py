@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import atexit
+import gzip
+import hashlib
 import json
 import sqlite3
+import threading
 import time
+import weakref
+import zlib
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
 
 @dataclass
@@ -14,50 +20,344 @@ class CacheItem:
     created_at: float
 
 
+# SQLite caps the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+_SNAPSHOT_FORMAT = "geosws-cache-snapshot"
+
+
 class SqliteCache:
     """Very small utility cache for:
     - ontology index chunks
     - SPARQL query results
     - external resources results (suggestions/synonyms)
+
+    Each thread keeps one connection open (WAL journal) until it exits. Writes are buffered and
+    committed in batches, reads see buffered writes. Entries can expire per key
+    namespace (ttls={"sparql:": 86400, ...}, longest prefix wins), the table can be
+    capped to max_entries (least recently used rows go first), and large values can be
+    stored zlib-compressed.
     """
 
-    def __init__(self, path: str):
+    def __init__(
+        self,
+        path: str,
+        ttls: Optional[Mapping[str, float]] = None,
+        max_entries: Optional[int] = None,
+        compress: bool = False,
+        compress_min_bytes: int = 512,
+        batch_size: int = 200,
+        flush_interval_s: float = 2.0,
+    ):
         self.path = path
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.RLock()
+        self._pending: Dict[str, Tuple[Any, float]] = {}  # key -> (stored value, created_at)
+        self._touched: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
         self._init_db()
+        atexit.register(_close_at_exit, weakref.ref(self))
+
+    def _connect(self) -> sqlite3.Connection:
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            con = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA temp_store=MEMORY")
+            con.execute("PRAGMA cache_size=-16000")
+            holder = self._local.holder = _ConnectionHolder(con)
+            with self._lock:
+                self._connections.append(con)
+            # short-lived threads (asyncio.to_thread, per-call pools) would otherwise leave
+            # their connection open until close(): drop it with the thread's local data
+            weakref.finalize(holder, _release_connection, weakref.ref(self), con)
+        return holder.con
 
     def _init_db(self) -> None:
-        con = sqlite3.connect(self.path)
-        try:
-            con.execute(
-                """
-                CREATE TABLE IF NOT EXISTS kv_cache (
-                    key TEXT PRIMARY KEY,
-                    value_json TEXT NOT NULL,
-                    created_at REAL NOT NULL
-                )
-                """
+        con = self._connect()
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS kv_cache (
+                key TEXT PRIMARY KEY,
+                value_json TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL
             )
-            con.commit()
-        finally:
-            con.close()
+            """
+        )
+        cols = {row[1] for row in con.execute("PRAGMA table_info(kv_cache)")}
+        if "accessed_at" not in cols:
+            # older cache files: add the LRU column, existing rows count as accessed when created
+            con.execute("ALTER TABLE kv_cache ADD COLUMN accessed_at REAL")
+            con.execute("UPDATE kv_cache SET accessed_at = created_at")
+        con.execute("CREATE INDEX IF NOT EXISTS kv_cache_accessed ON kv_cache(accessed_at)")
+        con.commit()
+
+    # -- encoding --
+
+    def _encode(self, value: Any) -> Any:
+        raw = json.dumps(value, ensure_ascii=False)
+        if self.compress and len(raw) >= self.compress_min_bytes:
+            return zlib.compress(raw.encode("utf-8"))
+        return raw
+
+    @staticmethod
+    def _decode(stored: Any) -> Any:
+        if isinstance(stored, bytes):
+            stored = zlib.decompress(stored).decode("utf-8")
+        return json.loads(stored)
+
+    def _ttl_for(self, key: str) -> Optional[float]:
+        best = None
+        best_len = -1
+        for prefix, ttl in self.ttls.items():
+            if key.startswith(prefix) and len(prefix) > best_len:
+                best, best_len = ttl, len(prefix)
+        return best
+
+    def _expired(self, key: str, created_at: float, now: float) -> bool:
+        ttl = self._ttl_for(key)
+        return ttl is not None and now - created_at > ttl
+
+    # -- reads --
 
     def get(self, key: str) -> Optional[CacheItem]:
-        con = sqlite3.connect(self.path)
-        try:
-            row = con.execute("SELECT key, value_json, created_at FROM kv_cache WHERE key=?", (key,)).fetchone()
-            if not row:
-                return None
-            return CacheItem(key=row[0], value=json.loads(row[1]), created_at=row[2])
-        finally:
-            con.close()
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, CacheItem]:
+        """Fetch several keys at once; missing and expired keys are left out."""
+        now = time.time()
+        out: Dict[str, CacheItem] = {}
+        todo: List[str] = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                pending = self._pending.get(key)
+                if pending is not None:
+                    if not self._expired(key, pending[1], now):
+                        out[key] = CacheItem(key=key, value=self._decode(pending[0]), created_at=pending[1])
+                else:
+                    todo.append(key)
+
+        con = self._connect()
+        for i in range(0, len(todo), _SQL_CHUNK):
+            chunk = todo[i:i + _SQL_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = con.execute(f"SELECT key, value_json, created_at FROM kv_cache WHERE key IN ({marks})", chunk).fetchall()
+            for key, stored, created_at in rows:
+                if self._expired(key, created_at, now):
+                    continue
+                out[key] = CacheItem(key=key, value=self._decode(stored), created_at=created_at)
+
+        if out and self.max_entries is not None:
+            # access times only matter for LRU eviction; without a cap reads stay read-only
+            with self._lock:
+                for key in out:
+                    self._touched[key] = now
+            self._maybe_flush()
+        return out
+
+    # -- writes --
 
     def set(self, key: str, value: Any) -> None:
-        con = sqlite3.connect(self.path)
-        try:
+        self.set_many({key: value})
+
+    def set_many(self, items: Mapping[str, Any], created_at: Optional[float] = None) -> None:
+        """Buffer several writes; they are committed together on the next flush."""
+        now = time.time()
+        ts = now if created_at is None else created_at
+        with self._lock:
+            for key, value in items.items():
+                self._pending[key] = (self._encode(value), ts)
+                self._touched.pop(key, None)
+        self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if len(self._pending) + len(self._touched) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit buffered writes and access times, then enforce max_entries."""
+        with self._lock:
+            pending = self._pending
+            touched = self._touched
+            self._pending = {}
+            self._touched = {}
+            self._last_flush = time.monotonic()
+            if not pending and not touched:
+                return
+            now = time.time()
+            con = self._connect()
+            with con:
+                con.executemany(
+                    "INSERT OR REPLACE INTO kv_cache(key, value_json, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    [(k, stored, ts, now) for k, (stored, ts) in pending.items()],
+                )
+                con.executemany("UPDATE kv_cache SET accessed_at=? WHERE key=?", [(ts, k) for k, ts in touched.items()])
+                if self.max_entries is not None and pending:
+                    self._evict(con)
+
+    def _evict(self, con: sqlite3.Connection) -> None:
+        (count,) = con.execute("SELECT COUNT(*) FROM kv_cache").fetchone()
+        excess = count - int(self.max_entries or 0)
+        if excess > 0:
             con.execute(
-                "INSERT OR REPLACE INTO kv_cache(key, value_json, created_at) VALUES (?, ?, ?)",
-                (key, json.dumps(value, ensure_ascii=False), time.time()),
+                "DELETE FROM kv_cache WHERE key IN (SELECT key FROM kv_cache ORDER BY accessed_at LIMIT ?)",
+                (excess,),
             )
-            con.commit()
-        finally:
-            con.close()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows of every namespace that has a TTL; returns how many were removed."""
+        self.flush()
+        now = time.time()
+        removed = 0
+        con = self._connect()
+        with con:
+            for prefix, ttl in self.ttls.items():
+                # a longer prefix with its own TTL takes precedence over this one
+                longer = [p for p in self.ttls if p != prefix and p.startswith(prefix)]
+                sql = "DELETE FROM kv_cache WHERE substr(key, 1, ?) = ? AND created_at < ?"
+                args: List[Any] = [len(prefix), prefix, now - ttl]
+                for p in longer:
+                    sql += " AND substr(key, 1, ?) != ?"
+                    args += [len(p), p]
+                removed += con.execute(sql, args).rowcount
+        return removed
+
+    # -- snapshots --
+
+    def export_snapshot(self, path: str, prefixes: Optional[Iterable[str]] = None) -> Tuple[int, int]:
+        """Write live entries (optionally only keys under prefixes) to a gzip JSONL snapshot.
+
+        Values are stored once however many keys share them (empty answers, shared
+        instance lists) and uncompressed, so the snapshot loads into a cache with any
+        compress setting. Returns (entries, distinct values).
+        """
+        self.flush()
+        prefixes = list(prefixes or [])
+        sql = "SELECT key, value_json, created_at FROM kv_cache"
+        if prefixes:
+            sql += " WHERE " + " OR ".join("substr(key, 1, ?) = ?" for _ in prefixes)
+        args = [x for p in prefixes for x in (len(p), p)]
+        now = time.time()
+        value_ids: Dict[bytes, int] = {}
+        entries = 0
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"format": _SNAPSHOT_FORMAT, "version": 1, "created_at": now}) + "\n")
+            for key, stored, created_at in self._connect().execute(sql + " ORDER BY key", args):
+                if self._expired(key, created_at, now):
+                    continue
+                raw = zlib.decompress(stored).decode("utf-8") if isinstance(stored, bytes) else stored
+                digest = hashlib.sha1(raw.encode("utf-8")).digest()
+                ref = value_ids.get(digest)
+                if ref is None:
+                    ref = value_ids[digest] = len(value_ids)
+                    f.write(json.dumps({"ref": ref, "value": json.loads(raw)}, ensure_ascii=False) + "\n")
+                f.write(json.dumps({"key": key, "ref": ref, "created_at": created_at}, ensure_ascii=False) + "\n")
+                entries += 1
+        return entries, len(value_ids)
+
+    def import_snapshot(self, path: str, overwrite: bool = False) -> Tuple[int, int]:
+        """Load an export_snapshot() file; returns (imported, skipped).
+
+        Entries keep their original created_at, so TTLs run from when they were fetched;
+        entries already expired under this cache's TTLs are skipped. Unless overwrite is
+        set, an existing entry at least as recent as the snapshot's is kept.
+        """
+        now = time.time()
+        values: Dict[int, Any] = {}
+        batch: List[Tuple[str, int, float]] = []
+        counts = [0, 0]
+
+        def load(batch: List[Tuple[str, int, float]]) -> None:
+            existing: Dict[str, float] = {}
+            if not overwrite:
+                con = self._connect()
+                keys = [k for k, _, _ in batch]
+                for i in range(0, len(keys), _SQL_CHUNK):
+                    chunk = keys[i:i + _SQL_CHUNK]
+                    marks = ",".join("?" * len(chunk))
+                    existing.update(con.execute(f"SELECT key, created_at FROM kv_cache WHERE key IN ({marks})", chunk).fetchall())
+            with self._lock:
+                for key, ref, created_at in batch:
+                    mine = self._pending[key][1] if key in self._pending else existing.get(key)
+                    if self._expired(key, created_at, now) or (mine is not None and mine >= created_at):
+                        counts[1] += 1
+                        continue
+                    self._pending[key] = (self._encode(values[ref]), created_at)
+                    self._touched.pop(key, None)
+                    counts[0] += 1
+            self._maybe_flush()
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            head = json.loads(f.readline() or "null")
+            if not isinstance(head, dict) or head.get("format") != _SNAPSHOT_FORMAT:
+                raise ValueError(f"{path} is not a cache snapshot")
+            if head.get("version") != 1:
+                raise ValueError(f"Unknown cache snapshot version '{head.get('version')}'. Supported: 1")
+            for line in f:
+                row = json.loads(line)
+                if "key" in row:
+                    batch.append((row["key"], row["ref"], float(row["created_at"])))
+                    if len(batch) >= _SQL_CHUNK:
+                        load(batch)
+                        batch = []
+                else:
+                    values[row["ref"]] = row["value"]
+        if batch:
+            load(batch)
+        self.flush()
+        return counts[0], counts[1]
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            for con in self._connections:
+                try:
+                    con.close()
+                except sqlite3.ProgrammingError:
+                    pass
+            self._connections = []
+        self._local = threading.local()
+
+    def __enter__(self) -> "SqliteCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class _ConnectionHolder:
+    __slots__ = ("con", "__weakref__")
+
+    def __init__(self, con: sqlite3.Connection):
+        self.con = con
+
+
+def _release_connection(ref: "weakref.ReferenceType[SqliteCache]", con: sqlite3.Connection) -> None:
+    cache = ref()
+    if cache is not None:
+        with cache._lock:
+            if con in cache._connections:
+                cache._connections.remove(con)
+    try:
+        con.close()
+    except sqlite3.Error:
+        pass
+
+
+def _close_at_exit(ref: "weakref.ReferenceType[SqliteCache]") -> None:
+    cache = ref()
+    if cache is not None:
+        try:
+            cache.close()
+        except sqlite3.Error:
+            pass
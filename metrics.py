@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# upper bounds (seconds) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Latency histogram over LATENCY_BUCKETS_S; percentiles are bucket upper bounds."""
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(LATENCY_BUCKETS_S) + 1)
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS_S, seconds)] += 1
+        self.count += 1
+        self.total_s += seconds
+        if seconds > self.max_s:
+            self.max_s = seconds
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return LATENCY_BUCKETS_S[i] if i < len(LATENCY_BUCKETS_S) else self.max_s
+        return self.max_s
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = {}
+        for i, n in enumerate(self.counts):
+            if n:
+                le = f"<={LATENCY_BUCKETS_S[i] * 1000:g}ms" if i < len(LATENCY_BUCKETS_S) else f">{LATENCY_BUCKETS_S[-1] * 1000:g}ms"
+                buckets[le] = n
+        return {
+            "count": self.count,
+            "total_s": round(self.total_s, 6),
+            "mean_ms": round(self.total_s / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(min(self.percentile(0.5), self.max_s) * 1000, 3),
+            "p95_ms": round(min(self.percentile(0.95), self.max_s) * 1000, 3),
+            "max_ms": round(self.max_s * 1000, 3),
+            "buckets": buckets,
+        }
+
+
+class Metrics:
+    """Thread-safe run metrics: named counters and latency histograms.
+
+    Components take an optional Metrics and record into it when given one, e.g.
+    metrics.incr("sparql.cache_hit") or `with metrics.timer("pipeline.step6_match"): ...`.
+    report() returns everything as a JSON-ready dict.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self._counters: Dict[str, int] = {}
+        self._timers: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            hist = self._timers.get(name)
+            if hist is None:
+                hist = self._timers[name] = Histogram()
+            hist.record(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "wall_s": round(time.monotonic() - self.started, 3),
+                "counters": dict(sorted(self._counters.items())),
+                "timers": {name: h.to_dict() for name, h in sorted(self._timers.items())},
+            }
+
+    def write_json(self, path: str, extra: Optional[Dict[str, Any]] = None) -> None:
+        data = self.report()
+        if extra:
+            data.update(extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+_profiling = threading.local()
+
+
+@contextmanager
+def profiled(path: str) -> Iterator[cProfile.Profile]:
+    """cProfile the calling thread and dump the stats to path (pstats format).
+
+    While it is active, is_profiling() is true on this thread, so the pipeline runs its
+    blocking steps inline instead of on worker threads the profiler would not see.
+    """
+    prof = cProfile.Profile()
+    _profiling.active = True
+    prof.enable()
+    try:
+        yield prof
+    finally:
+        prof.disable()
+        _profiling.active = False
+        prof.dump_stats(path)
+
+
+def is_profiling() -> bool:
+    return getattr(_profiling, "active", False)
@@ -1,11 +1,47 @@
 from __future__ import annotations
 
+import heapq
+import itertools
 import json
+import math
+import threading
+from collections import Counter
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
 
-from ..sparql.client import SparqlClient, sparql_all_classes_and_properties
-from ..utils.text import normalize_term
+from ..sparql.client import SparqlClient, sparql_all_classes_and_properties, sparql_all_classes_and_properties_page
+from ..utils.text import normalize_term, split_identifier
+
+
+# each index instance gets its own version, so memoized matches never leak across indexes
+_INDEX_VERSIONS = itertools.count(1)
+
+# slack for float rounding: pruning must never drop a label that scoring would accept
+_PRUNE_EPS = 1e-9
+
+# BM25 parameters of the token shortlist
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def _bigrams(s: str) -> List[str]:
+    return [s[i:i + 2] for i in range(len(s) - 1)]
+
+
+def identifier_tokens(text: str) -> List[str]:
+    """Normalized tokens of a label or parameter name ("featureTypeCode" -> feature, type, code)."""
+    return [t for tok in split_identifier(text) for t in normalize_term(tok).split()]
+
+
+def _bounds_pass(n: int, m: int, common: int, prefix: int, thr_j: float, thr_jw: float, thr_l: float) -> bool:
+    """Upper bounds of Jaro, Jaro-Winkler and Levenshtein ratio for strings of length n and m
+    sharing at most `common` characters and exactly `prefix` leading characters."""
+    ub_j = (common / n + common / m + 1.0) / 3.0
+    if ub_j >= thr_j:
+        return True
+    if ub_j + prefix * 0.1 * (1.0 - ub_j) >= thr_jw:
+        return True
+    return common / max(n, m) >= thr_l
 
 
 @dataclass
@@ -15,21 +51,199 @@ class OntologyElement:
     type: int  # 0 class, 1 property
 
 
+class LengthBuckets:
+    """Normalized label ids grouped by label length, over flat (CSR) arrays.
+
+    Label ids are positions in the sorted normalized labels, so the arrays can be read in
+    place from a binary index file.
+    """
+
+    def __init__(self, labels: Sequence[str], keys: Sequence[int], offsets: Sequence[int], ids: Sequence[int]):
+        self.labels = labels
+        self._keys = keys
+        self._offsets = offsets
+        self._ids = ids
+
+    def __iter__(self) -> Iterator[Tuple[int, Sequence[int]]]:
+        """(label length, label ids) pairs, shortest labels first."""
+        for j, m in enumerate(self._keys):
+            yield m, self._ids[self._offsets[j]:self._offsets[j + 1]]
+
+
+class TokenPostings:
+    """Token -> ids of the normalized labels containing it, and the token count of each label.
+
+    Label ids are positions in the sorted normalized labels, as in LengthBuckets.
+    """
+
+    def __init__(self, labels: Sequence[str], postings: Mapping[str, Sequence[int]], doc_len: Sequence[int]):
+        self.labels = labels
+        self.postings = postings
+        self.doc_len = doc_len
+        self.avg_doc_len = sum(doc_len) / len(doc_len) if len(doc_len) else 0.0
+
+
 class OntologyIndex:
-    def __init__(self, elements: List[OntologyElement]):
+    def __init__(
+        self,
+        elements: Sequence[OntologyElement],
+        by_norm_label: Optional[Mapping[str, List[int]]] = None,
+        buckets: Optional[LengthBuckets] = None,
+        tokens: Optional[TokenPostings] = None,
+    ):
         self.elements = elements
+        self.version = next(_INDEX_VERSIONS)
         # inverted index: normalized label -> list of idx
-        self.by_norm_label: Dict[str, List[int]] = {}
-        for i, el in enumerate(elements):
-            k = normalize_term(el.label) if el.label else normalize_term(el.uri.rsplit('/', 1)[-1])
-            self.by_norm_label.setdefault(k, []).append(i)
+        if by_norm_label is None:
+            built: Dict[str, List[int]] = {}
+            for i, el in enumerate(elements):
+                k = normalize_term(el.label) if el.label else normalize_term(el.uri.rsplit('/', 1)[-1])
+                built.setdefault(k, []).append(i)
+            by_norm_label = built
+        self.by_norm_label: Mapping[str, List[int]] = by_norm_label
+        # similarity pruning buckets and token shortlist postings: read from a binary index
+        # file when it has them, otherwise built (as arrays) on first use
+        self._buckets = buckets
+        self._tokens = tokens
+        self._tables_lock = threading.Lock()
+
+    def _length_buckets(self) -> LengthBuckets:
+        if self._buckets is None:
+            with self._tables_lock:
+                if self._buckets is None:
+                    from .index_binary import build_length_buckets
+
+                    self._buckets = build_length_buckets(self.by_norm_label)
+        return self._buckets
+
+    def _token_postings(self) -> TokenPostings:
+        if self._tokens is None:
+            with self._tables_lock:
+                if self._tokens is None:
+                    from .index_binary import build_token_postings
+
+                    self._tokens = build_token_postings(self.elements, self.by_norm_label)
+        return self._tokens
+
+    def token_candidates(self, tokens: Sequence[str], limit: int = 200) -> List[str]:
+        """Normalized labels sharing a token with the query, best BM25 score first.
+
+        Labels are treated as token sets, so a query token counts once per label. Only
+        labels in the posting lists of the query tokens are looked at.
+        """
+        table = self._token_postings()
+        doc_len = table.doc_len
+        n_docs = len(doc_len)
+        if not n_docs:
+            return []
+        avg_len = table.avg_doc_len
+        scores: Dict[int, float] = {}
+        for tok in dict.fromkeys(tokens):
+            ids = table.postings.get(tok)
+            if not ids:
+                continue
+            idf = math.log(1.0 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            for i in ids:
+                norm = _BM25_K1 * (1.0 - _BM25_B + _BM25_B * doc_len[i] / avg_len)
+                scores[i] = scores.get(i, 0.0) + idf * (_BM25_K1 + 1.0) / (1.0 + norm)
+        labels = table.labels
+        best = heapq.nlargest(max(1, limit), scores.items(), key=lambda kv: (kv[1], -kv[0]))
+        return [labels[i] for i, _ in best]
+
+    def similarity_candidates(
+        self,
+        term_n: str,
+        jaro_threshold: float = 0.92,
+        jaro_winkler_threshold: float = 0.92,
+        levenshtein_ratio_threshold: float = 0.85,
+    ) -> List[str]:
+        """Normalized labels that could reach at least one similarity threshold against term_n.
+
+        Uses upper bounds only (length buckets, shared characters, Jaro-Winkler prefix and
+        the bigram count filter for Levenshtein), so every label that scoring would accept
+        is returned. Callers still have to compute the actual scores.
+        """
+        buckets = self._length_buckets()
+        labels = buckets.labels
+        if min(jaro_threshold, jaro_winkler_threshold, levenshtein_ratio_threshold) <= 0.0:
+            return [labels[i] for i in range(len(labels))]
+
+        thr_j = jaro_threshold - _PRUNE_EPS
+        thr_jw = jaro_winkler_threshold - _PRUNE_EPS
+        thr_l = levenshtein_ratio_threshold - _PRUNE_EPS
+        n = len(term_n)
+        t_chars = Counter(term_n).items()
+        t_bigrams: Optional[Counter] = None
+        out: List[str] = []
+
+        for m, ids in buckets:
+            if n == 0 or m == 0:
+                # only the empty label can score against the empty term (and vice versa)
+                if n == m:
+                    out.extend(labels[i] for i in ids)
+                continue
+            longest = max(n, m)
+            shortest = min(n, m)
+            if not _bounds_pass(n, m, shortest, min(4, shortest), thr_j, thr_jw, thr_l):
+                continue
+            # largest edit distance the Levenshtein ratio threshold still accepts
+            max_edits = int((1.0 - levenshtein_ratio_threshold) * longest + _PRUNE_EPS)
+            min_bigrams = longest - 1 - 2 * max_edits
+            for i in ids:
+                # character and bigram counts come from the label itself, so the tables
+                # hold no per-label dicts
+                lab = labels[i]
+                common = 0
+                for ch, cnt in t_chars:
+                    lc = lab.count(ch)
+                    if lc:
+                        common += cnt if cnt < lc else lc
+                if common == 0:
+                    continue
+                prefix = 0
+                for a, b in zip(term_n, lab):
+                    if a != b or prefix == 4:
+                        break
+                    prefix += 1
+                jaro_ok = _bounds_pass(n, m, common, prefix, thr_j, thr_jw, 2.0)
+                if jaro_ok:
+                    out.append(lab)
+                    continue
+                if common / longest < thr_l:
+                    continue
+                if min_bigrams > 0:
+                    if t_bigrams is None:
+                        t_bigrams = Counter(_bigrams(term_n))
+                    lab_bigrams = Counter(_bigrams(lab))
+                    shared = 0
+                    for g, cnt in t_bigrams.items():
+                        lc = lab_bigrams.get(g)
+                        if lc:
+                            shared += cnt if cnt < lc else lc
+                    if shared < min_bigrams:
+                        continue
+                out.append(lab)
+        return out
+
+    def compact(self) -> "OntologyIndex":
+        """The same index over packed columns (as in the binary format, but in memory).
+
+        URIs are stored as an interned namespace id plus local name, labels and types in
+        array columns and by_norm_label as CSR postings, which takes several times less
+        memory than element objects and dicts of lists. elements[i] and by_norm_label[k]
+        behave the same; elements are rebuilt on each access, so lookups cost a little more.
+        """
+        from .index_binary import compact_index
+
+        elements, by_norm_label = compact_index(self.elements, self.by_norm_label)
+        return OntologyIndex(elements, by_norm_label=by_norm_label)
 
     @classmethod
-    def from_json(cls, path: str) -> "OntologyIndex":
+    def from_json(cls, path: str, compact: bool = False) -> "OntologyIndex":
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
-        elements = [OntologyElement(uri=e["uri"], label=e.get("label",""), type=e["type"]) for e in data["elements"]]
-        return cls(elements)
+        elements = [OntologyElement(uri=e["uri"], label=e.get("label",""), type=e["type"]) for e in data.pop("elements")]
+        return cls(elements).compact() if compact else cls(elements)
 
     def to_json(self, path: str) -> None:
         data = {"elements": [{"uri": e.uri, "label": e.label, "type": e.type} for e in self.elements]}
@@ -37,25 +251,104 @@ class OntologyIndex:
             json.dump(data, f, ensure_ascii=False, indent=2)
 
     @classmethod
-    def build_from_sparql(cls, client: SparqlClient, languages: List[str] | None = None, limit: Optional[int] = None) -> "OntologyIndex":
+    def from_binary(cls, path: str) -> "OntologyIndex":
+        """Open a binary index via mmap; elements are materialized on access.
+
+        Files written with the pruning and token tables use them in place; older ones build
+        them in memory on first use.
+        """
+        from .index_binary import open_binary_index
+
+        elements, by_norm_label, buckets, tokens = open_binary_index(path)
+        return cls(elements, by_norm_label=by_norm_label, buckets=buckets, tokens=tokens)
+
+    def to_binary(self, path: str) -> None:
+        from .index_binary import write_binary_index
+
+        write_binary_index(path, self.elements, self.by_norm_label)
+
+    @classmethod
+    def load(cls, path: str, compact: bool = False) -> "OntologyIndex":
+        """Open an index file in either format (binary is detected by its magic bytes).
+
+        compact=True packs a JSON index in memory (see compact()); binary ones already are.
+        """
+        from .index_binary import is_binary_index
+
+        return cls.from_binary(path) if is_binary_index(path) else cls.from_json(path, compact=compact)
+
+    def save(self, path: str, fmt: str = "auto") -> None:
+        """Write the index as 'json' or 'binary'; 'auto' picks binary for *.bin paths."""
+        if fmt == "auto":
+            fmt = "binary" if path.endswith(".bin") else "json"
+        if fmt == "binary":
+            self.to_binary(path)
+        elif fmt == "json":
+            self.to_json(path)
+        else:
+            raise ValueError(f"Unknown index format '{fmt}'. Supported: auto, json, binary")
+
+    @classmethod
+    def build_from_sparql(
+        cls,
+        client: SparqlClient,
+        languages: List[str] | None = None,
+        limit: Optional[int] = None,
+        page_size: Optional[int] = None,
+    ) -> "OntologyIndex":
         languages = languages or ["en"]
         elements: List[OntologyElement] = []
         seen = set()
         for lang in languages:
-            q = sparql_all_classes_and_properties(lang=lang, limit=limit)
-            data = client.query("""
+            for rows in iter_ontology_rows(client, lang, limit=limit, page_size=page_size):
+                for uri, label, t in rows:
+                    key = (uri, label, t)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    elements.append(OntologyElement(uri=uri, label=label, type=t))
+        return cls(elements)
+
+
+ONTOLOGY_QUERY_PREFIXES = """
             PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
             PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
             PREFIX owl: <http://www.w3.org/2002/07/owl#>
-            """ + q)
-            for row in data.get("results", {}).get("bindings", []):
-                uri = row["uri"]["value"]
-                label = row.get("label", {}).get("value", "")
-                typ = row.get("type", {}).get("value", "class")
-                t = 0 if typ == "class" else 1
-                key = (uri, label, t)
-                if key in seen:
-                    continue
-                seen.add(key)
-                elements.append(OntologyElement(uri=uri, label=label, type=t))
-        return cls(elements)
+            """
+
+
+def iter_ontology_rows(
+    client: SparqlClient,
+    lang: str,
+    limit: Optional[int] = None,
+    page_size: Optional[int] = None,
+    offset: int = 0,
+) -> Iterator[List[Tuple[str, str, int]]]:
+    """Yield (uri, label, type) rows of one language, one list per SPARQL response.
+
+    Without page_size a single (unordered) query is sent. With page_size, results are
+    read in stable order with LIMIT/OFFSET pages starting at `offset`, and `limit`
+    caps the total number of rows.
+    """
+    if not page_size:
+        data = client.query(ONTOLOGY_QUERY_PREFIXES + sparql_all_classes_and_properties(lang=lang, limit=limit))
+        yield _ontology_rows(data)
+        return
+    while limit is None or offset < limit:
+        size = page_size if limit is None else min(page_size, limit - offset)
+        data = client.query(ONTOLOGY_QUERY_PREFIXES + sparql_all_classes_and_properties_page(lang=lang, limit=size, offset=offset))
+        rows = _ontology_rows(data)
+        yield rows
+        offset += len(rows)
+        if len(rows) < size:
+            break
+
+
+def _ontology_rows(data: Dict) -> List[Tuple[str, str, int]]:
+    rows: List[Tuple[str, str, int]] = []
+    for row in data.get("results", {}).get("bindings", []):
+        uri = row["uri"]["value"]
+        label = row.get("label", {}).get("value", "")
+        typ = row.get("type", {}).get("value", "class")
+        rows.append((uri, label, 0 if typ == "class" else 1))
+    return rows
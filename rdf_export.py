@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from ..utils.cache import SqliteCache
+from ..utils.metrics import Metrics
 from ..utils.text import delete_special_characters
 from .providers import SuggestionProvider, SynonymProvider
 
@@ -18,61 +21,146 @@ class Enricher:
     """Implements a practical version of the thesis' suggestions/synonyms enrichment.
 
     Roughly matches the pseudo-code shown as genericAlgorithmSuggSyn / algorithmSuggSyn.
+    Every provider call is cached on its own (empty answers included), so a suggestion
+    shared by many terms is looked up once; lookups that miss the cache run concurrently.
+    All cache keys live under "enrich:" and name the providers (their cache_id, e.g. the
+    API base URL, or else the class name), so differently configured providers never
+    share entries.
     """
 
-    def __init__(self, sugg: Optional[SuggestionProvider], syn: Optional[SynonymProvider], cache: SqliteCache | None = None):
+    def __init__(
+        self,
+        sugg: Optional[SuggestionProvider],
+        syn: Optional[SynonymProvider],
+        cache: SqliteCache | None = None,
+        max_workers: int = 8,
+        metrics: Optional[Metrics] = None,
+    ):
         self.sugg = sugg
         self.syn = syn
         self.cache = cache
+        self.max_workers = max(1, max_workers)
+        # enrich.* counters (cache hits/misses, provider calls) and latencies
+        self.metrics = metrics
+        self._providers_id = f"{_provider_id(sugg)}:{_provider_id(syn)}"
 
     def enrich(self, term: str, max_suggestions: int = 10, max_synonyms: int = 10) -> EnrichmentResult:
-        cache_key = f"enrich:{term}:{max_suggestions}:{max_synonyms}"
+        if self.metrics is None:
+            return self.enrich_many([term], max_suggestions=max_suggestions, max_synonyms=max_synonyms)[0]
+        with self.metrics.timer("enrich.enrich"):
+            return self.enrich_many([term], max_suggestions=max_suggestions, max_synonyms=max_synonyms)[0]
+
+    def enrich_many(self, terms: List[str], max_suggestions: int = 10, max_synonyms: int = 10) -> List[EnrichmentResult]:
+        """enrich() for several terms; provider calls are shared across terms. Results follow input order."""
+        unique = list(dict.fromkeys(terms))
+        results: Dict[str, EnrichmentResult] = {}
         if self.cache:
-            hit = self.cache.get(cache_key)
-            if hit is not None:
-                return EnrichmentResult(suggestions=hit.value.get("suggestions", []), synonyms=hit.value.get("synonyms", []))
-
-        suggestions: List[str] = []
-        synonyms: List[str] = []
-
-        # suggestions(term)
-        if self.sugg is not None:
-            suggestions = self.sugg.suggestions(term, max_results=max_suggestions) or []
-
-        # if no suggestions, delete special characters and try again
-        if not suggestions and self.sugg is not None:
-            cleaned = delete_special_characters(term)
-            if cleaned and cleaned != term:
-                suggestions = self.sugg.suggestions(cleaned, max_results=max_suggestions) or []
-
-        # synonyms for each suggestion
-        if self.syn is not None:
-            for s in suggestions:
-                try:
-                    syns = self.syn.synonyms(s, max_results=max_synonyms) or []
-                except Exception:
-                    syns = []
-                synonyms.extend(syns)
-
-            # also synonyms(term) itself
-            try:
-                synonyms.extend(self.syn.synonyms(term, max_results=max_synonyms) or [])
-            except Exception:
-                pass
-
-        # de-dup & keep order
-        def dedup(xs: List[str]) -> List[str]:
-            seen = set()
-            out = []
-            for x in xs:
-                k = x.strip().lower()
-                if not k or k in seen:
-                    continue
-                seen.add(k)
-                out.append(x.strip())
+            keys = {t: self._result_key(t, max_suggestions, max_synonyms) for t in unique}
+            hits = self.cache.get_many(keys.values())
+            for t, k in keys.items():
+                if k in hits:
+                    results[t] = EnrichmentResult(suggestions=hits[k].value.get("suggestions", []), synonyms=hits[k].value.get("synonyms", []))
+        todo = [t for t in unique if t not in results]
+        if self.cache and self.metrics is not None:
+            self.metrics.incr("enrich.cache_hit", len(unique) - len(todo))
+            self.metrics.incr("enrich.cache_miss", len(todo))
+
+        suggestions: Dict[str, List[str]] = {t: [] for t in todo}
+        if self.sugg is not None and todo:
+            # suggestions(term)
+            found = self._lookup("sugg", self.sugg.suggestions, todo, max_suggestions, swallow_errors=False)
+            suggestions = {t: found[t] or [] for t in todo}
+
+            # if no suggestions, delete special characters and try again
+            cleaned = {t: delete_special_characters(t) for t in todo if not suggestions[t]}
+            cleaned = {t: c for t, c in cleaned.items() if c and c != t}
+            if cleaned:
+                found = self._lookup("sugg", self.sugg.suggestions, list(dict.fromkeys(cleaned.values())), max_suggestions, swallow_errors=False)
+                for t, c in cleaned.items():
+                    suggestions[t] = found[c] or []
+
+        synonyms: Dict[str, List[str]] = {t: [] for t in todo}
+        if self.syn is not None and todo:
+            # synonyms for each suggestion, and synonyms(term) itself
+            words = list(dict.fromkeys(w for t in todo for w in suggestions[t] + [t]))
+            found = self._lookup("syn", self.syn.synonyms, words, max_synonyms, swallow_errors=True)
+            for t in todo:
+                for w in suggestions[t] + [t]:
+                    synonyms[t].extend(found[w] or [])
+
+        fresh: Dict[str, Any] = {}
+        for t in todo:
+            res = EnrichmentResult(suggestions=_dedup(suggestions[t]), synonyms=_dedup(synonyms[t]))
+            results[t] = res
+            fresh[self._result_key(t, max_suggestions, max_synonyms)] = {"suggestions": res.suggestions, "synonyms": res.synonyms}
+        if self.cache and fresh:
+            self.cache.set_many(fresh)
+        return [EnrichmentResult(suggestions=list(results[t].suggestions), synonyms=list(results[t].synonyms)) for t in terms]
+
+    def _result_key(self, term: str, max_suggestions: int, max_synonyms: int) -> str:
+        return f"enrich:result:{self._providers_id}:{term}:{max_suggestions}:{max_synonyms}"
+
+    def _lookup(self, kind: str, fn: Callable[..., List[str]], words: List[str], max_results: int, swallow_errors: bool) -> Dict[str, Optional[List[str]]]:
+        """Call fn(word, max_results=...) for every word, through the cache and concurrently.
+
+        A failed call yields None (and is not cached) when swallow_errors is set, otherwise
+        the first error is raised.
+        """
+        owner = getattr(fn, "__self__", fn)
+        # local providers (cacheable = False) answer faster than the cache or a thread pool
+        remote = getattr(owner, "cacheable", True)
+        use_cache = self.cache is not None and remote
+        keys = {w: f"enrich:{kind}:{_provider_id(owner)}:{w}:{max_results}" for w in words}
+        out: Dict[str, Optional[List[str]]] = {}
+        if use_cache:
+            hits = self.cache.get_many(keys.values())
+            out.update({w: hits[k].value for w, k in keys.items() if k in hits})
+        todo = [w for w in words if w not in out]
+        if use_cache and self.metrics is not None:
+            self.metrics.incr(f"enrich.{kind}_cache_hit", len(words) - len(todo))
+            self.metrics.incr(f"enrich.{kind}_cache_miss", len(todo))
+        if not todo:
             return out
 
-        res = EnrichmentResult(suggestions=dedup(suggestions), synonyms=dedup(synonyms))
-        if self.cache:
-            self.cache.set(cache_key, {"suggestions": res.suggestions, "synonyms": res.synonyms})
-        return res
+        def call(w: str) -> Optional[List[str]]:
+            started = time.perf_counter()
+            try:
+                return list(fn(w, max_results=max_results) or [])
+            except Exception:
+                if self.metrics is not None:
+                    self.metrics.incr(f"enrich.{kind}_errors")
+                if swallow_errors:
+                    return None
+                raise
+            finally:
+                if self.metrics is not None:
+                    self.metrics.observe(f"enrich.{kind}_call", time.perf_counter() - started)
+
+        if len(todo) == 1 or not remote:
+            fetched = [call(w) for w in todo]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(todo))) as ex:
+                fetched = list(ex.map(call, todo))
+        out.update(zip(todo, fetched))
+        if use_cache:
+            self.cache.set_many({keys[w]: vals for w, vals in zip(todo, fetched) if vals is not None})
+        return out
+
+
+def _provider_id(provider: Any) -> str:
+    if provider is None:
+        return "-"
+    return getattr(provider, "cache_id", None) or type(provider).__name__
+
+
+# de-dup & keep order
+def _dedup(xs: List[str]) -> List[str]:
+    seen = set()
+    out = []
+    for x in xs:
+        k = x.strip().lower()
+        if not k or k in seen:
+            continue
+        seen.add(k)
+        out.append(x.strip())
+    return out
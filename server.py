@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import os
+import socketserver
+import threading
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .annotate.pipeline import AnnotationPipeline
+from .annotate.targets import annotate_rest_target, annotate_wfs_target, parameters_from
+
+
+class HttpError(Exception):
+    """A request the server refuses (bad body, unknown route...), answered with status.
+
+    Only these become 4xx answers; any other exception is a 500.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AnnotationService:
+    """The request handlers of `serve`, over one pipeline that stays loaded.
+
+    The ontology index, matcher LRU, pooled HTTP clients, SQLite cache and run memo are
+    shared by all requests. At most max_inflight annotations run at once; other requests
+    wait for a slot.
+    """
+
+    def __init__(self, pipeline: AnnotationPipeline, max_inflight: int = 16):
+        self.pipeline = pipeline
+        self._slots = threading.BoundedSemaphore(max(1, max_inflight))
+        self.routes: Dict[Tuple[str, str], Callable[[Any], Any]] = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/annotate/parameters"): self.annotate_parameters,
+            ("POST", "/annotate/rest"): self.annotate_rest,
+            ("POST", "/annotate/wfs"): self.annotate_wfs,
+        }
+
+    def close(self) -> None:
+        """Release the pipeline's worker threads and cache once the server has stopped."""
+        self.pipeline.close()
+
+    def health(self, _: Any) -> Dict[str, Any]:
+        return {"status": "ok", "elements": len(self.pipeline.ontology_index.elements)}
+
+    def metrics(self, _: Any) -> Dict[str, Any]:
+        return self.pipeline.metrics.report()
+
+    def annotate_parameters(self, body: Any) -> Dict[str, Any]:
+        """{"parameters": [name | {name, io?, datatype?}, ...]} -> the annotated parameters."""
+        try:
+            params = parameters_from(body.get("parameters") if isinstance(body, dict) else body)
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        with self._slots:
+            self.pipeline.annotate_parameters(params)
+        return {"parameters": [asdict(p) for p in params]}
+
+    def annotate_rest(self, body: Any) -> Dict[str, Any]:
+        """A rest_targets entry ({url, method?}) -> the annotated service."""
+        if not isinstance(body, dict) or not isinstance(body.get("url"), str):
+            raise HttpError(400, "expected {\"url\": ..., \"method\"?: ...}")
+        with self._slots:
+            return {"service": asdict(annotate_rest_target(self.pipeline, body))}
+
+    def annotate_wfs(self, body: Any) -> Dict[str, Any]:
+        """A wfs_targets entry ({base_url, version?}) -> the annotated service."""
+        if not isinstance(body, dict) or not isinstance(body.get("base_url"), str):
+            raise HttpError(400, "expected {\"base_url\": ..., \"version\"?: ...}")
+        with self._slots:
+            return {"service": asdict(annotate_wfs_target(self.pipeline, body))}
+
+
+class AnnotationRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "geosws-annotator"
+    max_body_bytes = 10 * 1024 * 1024
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        service: AnnotationService = self.server.service  # type: ignore[attr-defined]
+        self._body_read = method != "POST"
+        try:
+            path = self.path.split("?", 1)[0].rstrip("/") or "/"
+            handler = service.routes.get((method, path))
+            if handler is None:
+                allowed = sorted(m for m, p in service.routes if p == path)
+                raise HttpError(405 if allowed else 404, f"{method} {path} not supported")
+            status, payload = 200, handler(self._read_json() if method == "POST" else None)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        if not self._body_read:
+            self._discard_body()
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _content_length(self) -> int:
+        if self.headers.get("Transfer-Encoding"):
+            self.close_connection = True
+            raise HttpError(411, "chunked request bodies are not supported; send Content-Length")
+        raw = (self.headers.get("Content-Length") or "0").strip()
+        if not (raw.isascii() and raw.isdigit()):
+            self.close_connection = True
+            raise HttpError(400, f"invalid Content-Length: {raw!r}")
+        return int(raw)
+
+    def _read_json(self) -> Any:
+        length = self._content_length()
+        if length > self.max_body_bytes:
+            self.close_connection = True
+            raise HttpError(413, f"request body larger than {self.max_body_bytes} bytes")
+        data = self.rfile.read(length)
+        self._body_read = True
+        try:
+            return json.loads(data or b"null")
+        except ValueError as e:
+            raise HttpError(400, f"invalid JSON: {e}")
+
+    def _discard_body(self) -> None:
+        # an unread body would be parsed as the next request on a keep-alive connection
+        try:
+            length = self._content_length()
+        except HttpError:
+            return  # the connection is closed instead
+        if length > self.max_body_bytes:
+            self.close_connection = True
+        else:
+            self.rfile.read(length)
+        self._body_read = True
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: AnnotationService, host: str = "127.0.0.1", port: int = 8080, unix_socket: Optional[str] = None) -> socketserver.BaseServer:
+    """A threaded HTTP server for service, on host:port or on a Unix socket path."""
+    server: socketserver.BaseServer
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)  # stale socket of a previous run
+        server = UnixHTTPServer(unix_socket, AnnotationRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), AnnotationRequestHandler)
+        server.daemon_threads = True
+    server.service = service  # type: ignore[attr-defined]
+    return server
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import json
 import os
-from typing import Any, Dict, List
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO
 
 from .config import PipelineConfig, SparqlEndpointConfig, OntologyIndexConfig, ExternalResourcesConfig, MatchingConfig
+from .models import Parameter
 from .ontology.index import OntologyIndex
+from .ontology.index_build import OntologyIndexBuilder
 from .sparql.client import SparqlClient
 from .utils.cache import SqliteCache
+from .utils.metrics import Metrics, profiled
 from .annotate.pipeline import AnnotationPipeline
-from .rest.analyzer import analyze_rest_endpoint
-from .wfs.analyzer import analyze_wfs
+from .annotate.targets import annotate_record, annotate_rest_target, annotate_wfs_target, parameter_names
+from .server import AnnotationService, make_server
 from .export.json_export import export_service_json
 from .export.rdf_export import export_service_turtle
 
@@ -31,9 +39,24 @@ def _pipeline_config_from_json(cfg: Dict[str, Any]) -> PipelineConfig:
         external_resources=external_resources,
         matching=matching,
         cache_sqlite_path=cfg.get("cache_sqlite_path", "data/cache.sqlite"),
+        cache_ttl_s={k: float(v) for k, v in cfg.get("cache_ttl_s", {}).items()},
+        cache_max_entries=cfg.get("cache_max_entries"),
+        cache_compress=bool(cfg.get("cache_compress", False)),
         instances_limit=int(cfg.get("instances_limit", 50)),
+        instances_batch_size=int(cfg.get("instances_batch_size", 25)),
         validation_trials=int(cfg.get("validation_trials", 20)),
+        probe_per_host=int(cfg.get("probe_per_host", 4)),
+        probe_ttl_s=float(cfg.get("probe_ttl_s", 86400.0)),
+        wfs_validation=cfg.get("wfs_validation", "per_value"),
+        wfs_validation_batch=int(cfg.get("wfs_validation_batch", 20)),
         http_timeout_s=float(cfg.get("http_timeout_s", 25.0)),
+        endpoint_policy=cfg.get("endpoint_policy", "sequential"),
+        hedge_delay_s=cfg.get("hedge_delay_s"),
+        max_concurrency=int(cfg.get("max_concurrency", 8)),
+        memo_parameters=bool(cfg.get("memo_parameters", True)),
+        memo_persist=bool(cfg.get("memo_persist", False)),
+        memo_max_entries=cfg.get("memo_max_entries", 2048),
+        instance_store_max_entries=cfg.get("instance_store_max_entries", 8192),
     )
 
 
@@ -41,16 +64,155 @@ def cmd_build_ontology_index(args: argparse.Namespace) -> int:
     with open(args.config, "r", encoding="utf-8") as f:
         cfg = json.load(f)
     p = _pipeline_config_from_json(cfg)
-    os.makedirs(os.path.dirname(p.cache_sqlite_path) or ".", exist_ok=True)
-    cache = SqliteCache(p.cache_sqlite_path)
-    client = SparqlClient(p.sparql_endpoints[0].url, cache=cache, timeout_s=p.sparql_endpoints[0].timeout_s, user_agent=p.sparql_endpoints[0].user_agent)
-    idx = OntologyIndex.build_from_sparql(client=client, languages=p.ontology_index.languages, limit=p.ontology_index.limit_per_type)
+    cache = _cache_from(p)
+    e = p.sparql_endpoints[0]
+    metrics = Metrics()
+    client = SparqlClient(
+        e.url,
+        cache=cache,
+        timeout_s=e.timeout_s,
+        user_agent=e.user_agent,
+        max_retries=e.max_retries,
+        backoff_s=e.backoff_s,
+        rate_limit_per_s=e.rate_limit_per_s,
+        burst=e.burst,
+        pool_size=e.pool_size,
+        metrics=metrics,
+    )
+    page_size = args.page_size if args.page_size is not None else p.ontology_index.page_size
+    if page_size:
+        builder = OntologyIndexBuilder(
+            client,
+            work_dir=args.work_dir or args.out + ".build",
+            languages=p.ontology_index.languages,
+            limit=p.ontology_index.limit_per_type,
+            page_size=page_size,
+            max_workers=args.workers or p.ontology_index.build_workers,
+        )
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        # pages are staged on disk and streamed into the index file
+        n_elements = builder.build(args.out, fmt=args.format, fresh=args.fresh)
+        builder.cleanup()
+    else:
+        idx = OntologyIndex.build_from_sparql(client=client, languages=p.ontology_index.languages, limit=p.ontology_index.limit_per_type)
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        idx.save(args.out, fmt=args.format)
+        n_elements = len(idx.elements)
+    print(f"Ontology index written to: {args.out} (elements={n_elements})")
+    _write_metrics(args, metrics)
+    return 0
+
+
+def cmd_convert_ontology_index(args: argparse.Namespace) -> int:
+    idx = OntologyIndex.load(args.input)
     os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
-    idx.to_json(args.out)
+    idx.save(args.out, fmt=args.format)
     print(f"Ontology index written to: {args.out} (elements={len(idx.elements)})")
     return 0
 
 
+def _run_targets(
+    kind: str,
+    targets: List[Dict[str, Any]],
+    annotate_one: Callable[[Dict[str, Any], str, threading.Event], None],
+    out_root: str,
+    workers: int = 1,
+    timeout_s: Optional[float] = None,
+    profile: Optional[str] = None,
+) -> int:
+    """Annotate targets on a thread pool; all threads share the caller's pipeline (index, cache).
+
+    A failing target is recorded and the others go on. A target still running after
+    timeout_s is reported as timed out and its cancel event is set, so it does not write
+    output (a thread cannot be killed; it ends once its pending HTTP calls return). Its
+    worker slot goes to the next queued target right away, so hung targets do not stall
+    the run.
+    Per-target status and wall time go to <out_root>/summary.json. Returns 1 if any
+    target did not succeed. The target named by profile (e.g. "wfs_2") runs under
+    cProfile, with stats written to <out_root>/<name>.prof.
+    """
+    label = kind.upper()
+    jobs = []
+    for i, t in enumerate(targets, start=1):
+        jobs.append({"name": f"{kind}_{i}", "target": t, "out_dir": os.path.join(out_root, f"{kind}_{i}"), "cancel": threading.Event(), "started": None, "submitted": None})
+    if profile is not None and profile not in {job["name"] for job in jobs}:
+        raise ValueError(f"Unknown target '{profile}'. Supported: {', '.join(job['name'] for job in jobs)}")
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    done_count = 0
+
+    def run(job: Dict[str, Any]) -> None:
+        job["started"] = time.monotonic()
+        if job["name"] == profile:
+            with profiled(os.path.join(out_root, f"{profile}.prof")):
+                annotate_one(job["target"], job["out_dir"], job["cancel"])
+        else:
+            annotate_one(job["target"], job["out_dir"], job["cancel"])
+
+    def report(k: int, status: str, error: Optional[str] = None) -> None:
+        nonlocal done_count
+        job = jobs[k]
+        wall = time.monotonic() - job["started"] if job["started"] is not None else 0.0
+        results[k] = {"name": job["name"], "target": job["target"], "status": status, "wall_s": round(wall, 3), "error": error}
+        done_count += 1
+        prefix = f"[{done_count}/{len(jobs)}]"
+        if status == "ok":
+            print(f"{prefix} Annotated {label} service saved in: {job['out_dir']} ({wall:.1f}s)")
+        else:
+            print(f"{prefix} {job['name']} {status}: {error}", file=sys.stderr)
+
+    # at most `workers` targets run at a time, but a timed-out target hands its slot to the
+    # next queued one (its thread keeps running until its calls return), so hung targets
+    # cannot hold back the queue and every target ends within timeout_s of its start
+    slots = max(1, workers)
+    ex = ThreadPoolExecutor(max_workers=max(1, len(jobs)))
+    queued = list(range(len(jobs)))
+    running: Dict[Any, int] = {}
+
+    def start_queued() -> None:
+        while queued and len(running) < slots:
+            k = queued.pop(0)
+            jobs[k]["submitted"] = time.monotonic()
+            running[ex.submit(run, jobs[k])] = k
+
+    def deadline(k: int) -> float:
+        job = jobs[k]
+        return (job["started"] if job["started"] is not None else job["submitted"]) + timeout_s
+
+    try:
+        start_queued()
+        while running:
+            wait_s = None
+            if timeout_s is not None:
+                wait_s = max(0.0, min(deadline(k) for k in running.values()) - time.monotonic())
+            done, _ = wait(running, timeout=wait_s, return_when=FIRST_COMPLETED)
+            for fut in done:
+                k = running.pop(fut)
+                err = fut.exception()
+                report(k, "ok" if err is None else "error", None if err is None else f"{type(err).__name__}: {err}")
+            if timeout_s is not None:
+                now = time.monotonic()
+                for fut, k in list(running.items()):
+                    if now >= deadline(k):
+                        jobs[k]["cancel"].set()
+                        del running[fut]
+                        report(k, "timeout", f"still running after {timeout_s:g}s")
+            start_queued()
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+    summary = {
+        "kind": kind,
+        "workers": workers,
+        "target_timeout_s": timeout_s,
+        "ok": sum(1 for r in results if r and r["status"] == "ok"),
+        "failed": sum(1 for r in results if r and r["status"] != "ok"),
+        "targets": results,
+    }
+    with open(os.path.join(out_root, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return 0 if summary["failed"] == 0 else 1
+
+
 def cmd_annotate_rest(args: argparse.Namespace) -> int:
     with open(args.config, "r", encoding="utf-8") as f:
         cfg = json.load(f)
@@ -63,18 +225,19 @@ def cmd_annotate_rest(args: argparse.Namespace) -> int:
 
     os.makedirs(args.out, exist_ok=True)
 
-    for i, t in enumerate(targets, start=1):
-        svc = analyze_rest_endpoint(t["url"], method=t.get("method", "GET"), timeout_s=p.http_timeout_s)
-        # annotate parameters of first operation (heuristic)
-        op = svc.operations[0]
-        pipeline.annotate_parameters(op.inputs + op.outputs)
-        pipeline.validate_rest_inputs(op.url, op.inputs)
-
-        out_dir = os.path.join(args.out, f"rest_{i}")
+    def annotate_one(t: Dict[str, Any], out_dir: str, cancel: threading.Event) -> None:
+        svc = annotate_rest_target(pipeline, t, cancel)
+        if cancel.is_set():
+            return
         export_service_json(svc, out_dir, name="service.json")
         export_service_turtle(svc, out_dir, name="service.ttl")
-        print(f"Annotated REST service saved in: {out_dir}")
-    return 0
+
+    try:
+        rc = _run_targets("rest", targets, annotate_one, args.out, workers=args.workers, timeout_s=args.target_timeout, profile=args.profile)
+    finally:
+        pipeline.close()
+    _write_metrics(args, pipeline.metrics)
+    return rc
 
 
 def cmd_annotate_wfs(args: argparse.Namespace) -> int:
@@ -89,38 +252,298 @@ def cmd_annotate_wfs(args: argparse.Namespace) -> int:
 
     os.makedirs(args.out, exist_ok=True)
 
-    for i, t in enumerate(targets, start=1):
-        svc = analyze_wfs(t["base_url"], version=t.get("version", "1.1.0"), timeout_s=p.http_timeout_s)
-        # annotate all DescribeFeatureType output parameters
-        for op in svc.operations:
-            if op.name.startswith("DescribeFeatureType:"):
-                pipeline.annotate_parameters(op.outputs)
-        out_dir = os.path.join(args.out, f"wfs_{i}")
+    def annotate_one(t: Dict[str, Any], out_dir: str, cancel: threading.Event) -> None:
+        svc = annotate_wfs_target(pipeline, t, cancel)
+        if cancel.is_set():
+            return
         export_service_json(svc, out_dir, name="service.json")
         export_service_turtle(svc, out_dir, name="service.ttl")
-        print(f"Annotated WFS service saved in: {out_dir}")
+
+    try:
+        rc = _run_targets("wfs", targets, annotate_one, args.out, workers=args.workers, timeout_s=args.target_timeout, profile=args.profile)
+    finally:
+        pipeline.close()
+    _write_metrics(args, pipeline.metrics)
+    return rc
+
+
+def _stream_records(pipeline: AnnotationPipeline, lines: Iterable[str], out: TextIO, window: int = 16) -> Dict[str, int]:
+    """Annotate JSONL records with at most `window` in flight, writing each result when done.
+
+    Input is consumed only as fast as results come out, so memory stays bounded by the
+    window whatever the input size. Output lines follow completion order and carry the
+    input line number (and the record's "id", if any); a failing record yields a
+    {"status": "error"} line and the stream goes on.
+    """
+    counts = {"ok": 0, "error": 0}
+
+    def run(lineno: int, line: str) -> Dict[str, Any]:
+        head: Dict[str, Any] = {"line": lineno}
+        try:
+            record = json.loads(line)
+            if isinstance(record, dict) and "id" in record:
+                head["id"] = record["id"]
+            return {**head, "status": "ok", **annotate_record(pipeline, record)}
+        except Exception as e:
+            return {**head, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+    def emit(done: Iterable[Any]) -> None:
+        for fut in done:
+            result = fut.result()
+            counts[result["status"]] += 1
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+    window = max(1, window)
+    with ThreadPoolExecutor(max_workers=window) as ex:
+        pending: set = set()
+        for lineno, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                emit(done)
+            pending.add(ex.submit(run, lineno, line))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            emit(done)
+    return counts
+
+
+def cmd_annotate_stream(args: argparse.Namespace) -> int:
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    pipeline = AnnotationPipeline(_pipeline_config_from_json(cfg))
+
+    src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    if args.out == "-":
+        dst = sys.stdout
+    else:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        dst = open(args.out, "w", encoding="utf-8")
+    try:
+        counts = _stream_records(pipeline, src, dst, window=args.window)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+        pipeline.close()
+    print(f"Annotated {counts['ok']} records ({counts['error']} failed)", file=sys.stderr)
+    _write_metrics(args, pipeline.metrics, log=sys.stderr)
+    return 0 if counts["error"] == 0 else 1
+
+
+def _vocabulary(paths: List[str]) -> List[str]:
+    """Distinct parameter names from vocabulary files or a previous run's outputs.
+
+    A path may be a directory (its *.json, *.jsonl and *.txt files are read), a JSON
+    document (exported service.json, a parameter list) or a line-based file where each
+    line is either a JSON record (annotate-stream input/output) or a bare name. Lines
+    that look like JSON but do not parse are reported on stderr and skipped.
+    """
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in sorted(names) if n.endswith((".json", ".jsonl", ".txt")))
+        else:
+            files.append(path)
+    names: List[str] = []
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        try:
+            names.extend(parameter_names(json.loads(text)))
+            continue
+        except ValueError:
+            pass
+        for lineno, line in enumerate(text.splitlines(), start=1):
+            line = line.strip()
+            if line.startswith(("{", "[")):
+                try:
+                    names.extend(parameter_names(json.loads(line)))
+                except json.JSONDecodeError as e:
+                    print(f"{path}:{lineno}: skipped, invalid JSON ({e})", file=sys.stderr)
+            elif line and not line.startswith("#"):
+                names.append(line)
+    return list(dict.fromkeys(n for n in names if n.strip()))
+
+
+def _warm(pipeline: AnnotationPipeline, names: List[str], concurrency: int, chunk_size: int = 256) -> List[str]:
+    """Annotate names chunk by chunk so their SPARQL, enrichment (and persisted memo) entries land in the cache.
+
+    The cache is flushed after each chunk, so an interrupted warm-up keeps its progress and
+    a rerun only fetches what is still missing. Names of a chunk that fails are retried
+    one by one; returns the names that still failed.
+    """
+    failed: List[str] = []
+    chunk_size = max(1, chunk_size)
+    for i in range(0, len(names), chunk_size):
+        chunk = names[i:i + chunk_size]
+        try:
+            asyncio.run(pipeline.annotate_parameters_async([Parameter(n, "in") for n in chunk], max_concurrency=concurrency))
+        except Exception:
+            for n in chunk:
+                try:
+                    pipeline.annotate_parameters([Parameter(n, "in")])
+                except Exception as e:
+                    failed.append(n)
+                    print(f"  {n}: {type(e).__name__}: {e}", file=sys.stderr)
+        pipeline.cache.flush()
+        print(f"Warmed {min(i + chunk_size, len(names))}/{len(names)} names ({len(failed)} failed)", flush=True)
+    return failed
+
+
+def cmd_warm_cache(args: argparse.Namespace) -> int:
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    p = _pipeline_config_from_json(cfg)
+    if args.concurrency:
+        p.max_concurrency = args.concurrency  # also sizes the pipeline's worker threads
+    pipeline = AnnotationPipeline(p)
+    names = _vocabulary(args.input)
+    try:
+        failed = _warm(pipeline, names, concurrency=p.max_concurrency, chunk_size=args.chunk_size)
+    finally:
+        pipeline.close()
+    print(f"Cache warmed: {pipeline.cfg.cache_sqlite_path} ({len(names) - len(failed)}/{len(names)} names)")
+    _write_metrics(args, pipeline.metrics)
+    return 0 if not failed else 1
+
+
+def _cache_from(p: PipelineConfig) -> SqliteCache:
+    os.makedirs(os.path.dirname(p.cache_sqlite_path) or ".", exist_ok=True)
+    return SqliteCache(p.cache_sqlite_path, ttls=p.cache_ttl_s, max_entries=p.cache_max_entries, compress=p.cache_compress)
+
+
+def cmd_export_cache(args: argparse.Namespace) -> int:
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    cache = _cache_from(_pipeline_config_from_json(cfg))
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    entries, values = cache.export_snapshot(args.out, prefixes=args.prefix)
+    cache.close()
+    print(f"Cache snapshot written to: {args.out} (entries={entries}, distinct values={values})")
     return 0
 
 
+def cmd_import_cache(args: argparse.Namespace) -> int:
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    cache = _cache_from(_pipeline_config_from_json(cfg))
+    imported, skipped = cache.import_snapshot(args.input, overwrite=args.overwrite)
+    cache.close()
+    print(f"Cache snapshot imported into: {cache.path} (imported={imported}, skipped={skipped})")
+    return 0
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    service = AnnotationService(AnnotationPipeline(_pipeline_config_from_json(cfg)), max_inflight=args.max_inflight)
+    server = make_server(service, host=args.host, port=args.port, unix_socket=args.unix_socket)
+    where = args.unix_socket or f"http://{args.host}:{server.server_address[1]}"
+    print(f"Serving annotations on {where} (elements={len(service.pipeline.ontology_index.elements)})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+    return 0
+
+
+def _write_metrics(args: argparse.Namespace, metrics: Metrics, log: Optional[TextIO] = None) -> None:
+    if args.metrics_out:
+        os.makedirs(os.path.dirname(args.metrics_out) or ".", exist_ok=True)
+        metrics.write_json(args.metrics_out, extra={"command": args.cmd})
+        print(f"Metrics written to: {args.metrics_out}", file=log)
+
+
+def _add_metrics_arg(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--metrics-out", default=None, help="write step timers, call counts, latency histograms and cache hit/miss counts as JSON")
+
+
+def _add_target_run_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--workers", type=int, default=1, help="targets annotated concurrently (threads sharing one index and cache)")
+    p.add_argument("--target-timeout", type=float, default=None, help="seconds before a target is given up and reported as timed out")
+    p.add_argument("--profile", default=None, metavar="TARGET", help="cProfile one target (e.g. rest_1); stats go to <out>/<TARGET>.prof")
+    _add_metrics_arg(p)
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(prog="geosws-annotator", description="Semantic annotation pipeline for RESTful and WFS services.")
     sub = p.add_subparsers(dest="cmd", required=True)
 
-    p_idx = sub.add_parser("build-ontology-index", help="Build local JSON ontology index from SPARQL endpoint.")
+    p_idx = sub.add_parser("build-ontology-index", help="Build local ontology index (JSON or binary) from SPARQL endpoint.")
     p_idx.add_argument("--config", required=True)
     p_idx.add_argument("--out", required=True)
+    p_idx.add_argument("--format", choices=["auto", "json", "binary"], default="auto", help="auto = binary for *.bin, JSON otherwise")
+    p_idx.add_argument("--page-size", type=int, default=None, help="rows per SPARQL page (0 = single unpaged query); default from config")
+    p_idx.add_argument("--workers", type=int, default=None, help="languages fetched concurrently; default from config")
+    p_idx.add_argument("--work-dir", default=None, help="staging/checkpoint directory (default: <out>.build)")
+    p_idx.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint and start over")
+    _add_metrics_arg(p_idx)
     p_idx.set_defaults(func=cmd_build_ontology_index)
 
+    p_conv = sub.add_parser("convert-ontology-index", help="Convert an ontology index between JSON and binary formats.")
+    p_conv.add_argument("--in", dest="input", required=True)
+    p_conv.add_argument("--out", required=True)
+    p_conv.add_argument("--format", choices=["auto", "json", "binary"], default="auto", help="auto = binary for *.bin, JSON otherwise")
+    p_conv.set_defaults(func=cmd_convert_ontology_index)
+
     p_rest = sub.add_parser("annotate-rest", help="Annotate REST endpoints.")
     p_rest.add_argument("--config", required=True)
     p_rest.add_argument("--out", required=True)
+    _add_target_run_args(p_rest)
     p_rest.set_defaults(func=cmd_annotate_rest)
 
     p_wfs = sub.add_parser("annotate-wfs", help="Annotate WFS services.")
     p_wfs.add_argument("--config", required=True)
     p_wfs.add_argument("--out", required=True)
+    _add_target_run_args(p_wfs)
     p_wfs.set_defaults(func=cmd_annotate_wfs)
 
+    p_stream = sub.add_parser("annotate-stream", help="Annotate JSONL records (parameter lists, REST or WFS targets) as a stream.")
+    p_stream.add_argument("--config", required=True)
+    p_stream.add_argument("--in", dest="input", default="-", help="JSONL input (default: stdin)")
+    p_stream.add_argument("--out", default="-", help="JSONL output (default: stdout)")
+    p_stream.add_argument("--window", type=int, default=16, help="records annotated at once; bounds memory use")
+    _add_metrics_arg(p_stream)
+    p_stream.set_defaults(func=cmd_annotate_stream)
+
+    p_srv = sub.add_parser("serve", help="Serve annotations over HTTP with the index and caches kept loaded.")
+    p_srv.add_argument("--config", required=True)
+    p_srv.add_argument("--host", default="127.0.0.1")
+    p_srv.add_argument("--port", type=int, default=8080)
+    p_srv.add_argument("--unix-socket", default=None, help="listen on this Unix socket path instead of host:port")
+    p_srv.add_argument("--max-inflight", type=int, default=16, help="annotations running at once; further requests wait")
+    p_srv.set_defaults(func=cmd_serve)
+
+    p_warm = sub.add_parser("warm-cache", help="Prefetch SPARQL instances and enrichment results for a vocabulary into the cache.")
+    p_warm.add_argument("--config", required=True)
+    p_warm.add_argument("--in", dest="input", nargs="+", required=True, help="name lists, annotate-stream JSONL or previous outputs (files or directories)")
+    p_warm.add_argument("--concurrency", type=int, default=32, help="names annotated at once (0 = max_concurrency from config)")
+    p_warm.add_argument("--chunk-size", type=int, default=256, help="names per batch; the cache is committed after each one")
+    _add_metrics_arg(p_warm)
+    p_warm.set_defaults(func=cmd_warm_cache)
+
+    p_exp = sub.add_parser("export-cache", help="Write the cache as a compact, deduplicated snapshot (gzip JSONL).")
+    p_exp.add_argument("--config", required=True)
+    p_exp.add_argument("--out", required=True)
+    p_exp.add_argument("--prefix", action="append", default=None, help="only keys in this namespace (e.g. inst:, enrich:); repeatable")
+    p_exp.set_defaults(func=cmd_export_cache)
+
+    p_imp = sub.add_parser("import-cache", help="Load a cache snapshot written by export-cache.")
+    p_imp.add_argument("--config", required=True)
+    p_imp.add_argument("--in", dest="input", required=True)
+    p_imp.add_argument("--overwrite", action="store_true", help="replace entries even when the local copy is newer")
+    p_imp.set_defaults(func=cmd_import_cache)
+
     return p
 
 
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from ..models import Parameter, Service
+from ..rest.analyzer import analyze_rest_endpoint
+from ..wfs.analyzer import analyze_wfs
+from .pipeline import AnnotationPipeline
+
+
+def annotate_rest_target(pipeline: AnnotationPipeline, target: Dict[str, Any], cancel: Optional[threading.Event] = None) -> Service:
+    """Analyze a rest_targets entry ({url, method?}) and annotate it (steps 5-9)."""
+    svc = analyze_rest_endpoint(target["url"], method=target.get("method", "GET"), timeout_s=pipeline.cfg.http_timeout_s)
+    # annotate parameters of first operation (heuristic)
+    op = svc.operations[0]
+    pipeline.annotate_parameters(op.inputs + op.outputs)
+    if cancel is None or not cancel.is_set():
+        pipeline.validate_rest_inputs(op.url, op.inputs)
+    return svc
+
+
+def annotate_wfs_target(pipeline: AnnotationPipeline, target: Dict[str, Any], cancel: Optional[threading.Event] = None) -> Service:
+    """Analyze a wfs_targets entry ({base_url, version?}) and annotate its feature type properties.
+
+    Stops between feature types once cancel is set (the service is then partly annotated).
+    """
+    svc = analyze_wfs(target["base_url"], version=target.get("version", "1.1.0"), timeout_s=pipeline.cfg.http_timeout_s)
+    # annotate all DescribeFeatureType output parameters
+    for op in svc.operations:
+        if op.name.startswith("DescribeFeatureType:"):
+            if cancel is not None and cancel.is_set():
+                break
+            pipeline.annotate_parameters(op.outputs)
+    return svc
+
+
+def parameters_from(items: Any) -> List[Parameter]:
+    """Parameters from a list of names or {name, io?, datatype?} objects (io defaults to 'in')."""
+    if not isinstance(items, list):
+        raise ValueError("parameters must be a list")
+    params = []
+    for x in items:
+        if isinstance(x, str):
+            params.append(Parameter(x, "in"))
+        elif isinstance(x, dict) and isinstance(x.get("name"), str):
+            params.append(Parameter(x["name"], x.get("io", "in"), datatype=x.get("datatype")))
+        else:
+            raise ValueError("each parameter must be a name or {name, io?, datatype?}")
+    return params
+
+
+def annotate_record(pipeline: AnnotationPipeline, record: Any) -> Dict[str, Any]:
+    """Annotate one annotate-stream record and return it as a JSON-ready dict.
+
+    A record is a parameter list (bare, or as {"parameters": [...]}), a rest_targets
+    entry ({url, method?}) or a wfs_targets entry ({base_url, version?}); "kind" may
+    name the type explicitly.
+    """
+    if isinstance(record, list):
+        record = {"parameters": record}
+    if not isinstance(record, dict):
+        raise ValueError("record must be a JSON object or a parameter list")
+    kind = record.get("kind") or ("parameters" if "parameters" in record else "wfs" if "base_url" in record else "rest" if "url" in record else None)
+    if kind == "parameters":
+        params = parameters_from(record.get("parameters"))
+        pipeline.annotate_parameters(params)
+        return {"kind": kind, "parameters": [asdict(p) for p in params]}
+    if kind == "rest":
+        return {"kind": kind, "service": asdict(annotate_rest_target(pipeline, record))}
+    if kind == "wfs":
+        return {"kind": kind, "service": asdict(annotate_wfs_target(pipeline, record))}
+    raise ValueError(f"Unknown record kind '{kind}'. Supported: parameters, rest, wfs")
+
+
+def parameter_names(obj: Any) -> List[str]:
+    """Parameter names found in a vocabulary entry or a previous run's output.
+
+    Accepts a name, a list of names or {name, io, ...} objects, annotate-stream
+    records/results ({"parameters": [...]} or {"service": {...}}) and exported
+    services ({"operations": [{"inputs": [...], "outputs": [...]}]}); anything else
+    yields no names.
+    """
+    if isinstance(obj, str):
+        return [obj]
+    if isinstance(obj, list):
+        return [n for x in obj for n in parameter_names(x)]
+    if not isinstance(obj, dict):
+        return []
+    if isinstance(obj.get("name"), str) and "io" in obj:
+        return [obj["name"]]
+    return [n for k in ("parameters", "service", "operations", "inputs", "outputs") if k in obj for n in parameter_names(obj[k])]
@@ -0,0 +1,93 @@
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class StubRequest:
+    method: str
+    path: str
+    params: Dict[str, str]
+    headers: Dict[str, str]
+    body: bytes
+
+
+class StubServer:
+    """Local HTTP server (127.0.0.1, random port) answering every request with
+    handler(request) -> (status, headers, body).
+
+    Counts requests and the largest number of requests handled at the same time.
+    """
+
+    def __init__(self, handler: Callable[[StubRequest], Tuple[int, Dict[str, str], bytes]]):
+        self.handler = handler
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "stub server not started"
+        return f"http://127.0.0.1:{self._server.server_port}/"
+
+    def __enter__(self) -> "StubServer":
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _handle(self) -> None:
+                with owner._lock:
+                    owner.requests += 1
+                    owner.active += 1
+                    owner.max_active = max(owner.max_active, owner.active)
+                try:
+                    u = urlparse(self.path)
+                    length = int(self.headers.get("Content-Length") or 0)
+                    req = StubRequest(
+                        method=self.command,
+                        path=u.path,
+                        params={k: v[0] for k, v in parse_qs(u.query).items()},
+                        headers=dict(self.headers),
+                        body=self.rfile.read(length) if length else b"",
+                    )
+                    status, headers, body = owner.handler(req)
+                finally:
+                    with owner._lock:
+                        owner.active -= 1
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _handle
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def sleep_then(delay_s: float, answer: Tuple[int, Dict[str, str], bytes]) -> Callable[[StubRequest], Tuple[int, Dict[str, str], bytes]]:
+    """A handler that holds each request for delay_s before answering."""
+
+    def handler(req: StubRequest) -> Tuple[int, Dict[str, str], bytes]:
+        time.sleep(delay_s)
+        return answer
+
+    return handler
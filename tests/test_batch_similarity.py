@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from geosws_annotator.ontology.index import OntologyElement, OntologyIndex
+from geosws_annotator.ontology.matcher import OntologyMatcher
+from geosws_annotator.utils.batch_similarity import BatchSimilarityEngine
+from geosws_annotator.utils.similarity import all_scores
+
+pytest.importorskip("numpy")
+
+
+LABEL_ALPHABET = "abcdefgé -"
+# query-only characters: never in a label, so they must not match anything
+QUERY_ALPHABET = LABEL_ALPHABET + "xyzß"
+THRESHOLDS = [0.0, 0.5, 0.7, 0.85, 0.92, 1.0]
+
+
+def _text(rnd: random.Random, alphabet: str) -> str:
+    # mostly short strings, some around and past the 64-character word of the
+    # bit-parallel Levenshtein
+    hi = rnd.choice([12, 12, 12, 40, 90])
+    return "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, hi)))
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_batch_scores_equal_scalar_scores(seed):
+    rnd = random.Random(seed)
+    labels = [_text(rnd, LABEL_ALPHABET) for _ in range(60)] + ["", "a" * 64, "b" * 65]
+    engine = BatchSimilarityEngine(labels)
+    for _ in range(25):
+        term = _text(rnd, QUERY_ALPHABET)
+        got = engine.scores(term)
+        for i, label in enumerate(labels):
+            expected = all_scores(term, label)
+            assert float(got.jaro[i]) == expected.jaro, (term, label)
+            assert float(got.jaro_winkler[i]) == expected.jaro_winkler, (term, label)
+            assert float(got.levenshtein_ratio[i]) == expected.levenshtein_ratio, (term, label)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_numpy_matcher_equals_brute_force(seed):
+    rnd = random.Random(seed)
+    elements = []
+    for i in range(50):
+        label = _text(rnd, LABEL_ALPHABET).strip()
+        elements.append(OntologyElement(uri=f"http://example.org/ontology/E{i}", label=label, type=i % 2))
+    index = OntologyIndex(elements)
+    batch = OntologyMatcher(index, backend="numpy", cache_size=0)
+    brute = OntologyMatcher(index, prune=False, cache_size=0)
+    for _ in range(20):
+        label = rnd.choice(elements).label
+        term = _text(rnd, QUERY_ALPHABET) if rnd.random() < 0.5 else label[: rnd.randint(0, len(label))] + rnd.choice("xyz")
+        settings = dict(
+            jaro_threshold=rnd.choice(THRESHOLDS),
+            jaro_winkler_threshold=rnd.choice(THRESHOLDS),
+            levenshtein_ratio_threshold=rnd.choice(THRESHOLDS),
+            top_k=len(elements),
+        )
+        expected = [(r.element.uri, r.score, r.metric) for r in brute.match(term, **settings)]
+        got = [(r.element.uri, r.score, r.metric) for r in batch.match(term, **settings)]
+        assert got == expected, (term, settings)
@@ -0,0 +1,109 @@
+import gzip
+import json
+import time
+
+import pytest
+
+from geosws_annotator.utils.cache import SqliteCache
+
+
+def _cache(path, **kwargs) -> SqliteCache:
+    kwargs.setdefault("flush_interval_s", 3600)
+    return SqliteCache(str(path), **kwargs)
+
+
+def _values(cache: SqliteCache, keys):
+    return {k: (item.value, item.created_at) for k, item in cache.get_many(keys).items()}
+
+
+def test_plain_cache_round_trips_into_a_compressed_one(tmp_path):
+    big = [f"http://example.org/resource/{i}" for i in range(50)]
+    created = time.time() - 30
+    src = _cache(tmp_path / "plain.sqlite")
+    src.set_many({"inst:a": big, "inst:b": big, "inst:c": [], "ext:x": {"synonyms": ["river"]}}, created_at=created)
+    entries, distinct = src.export_snapshot(str(tmp_path / "snap.jsonl.gz"))
+    src.close()
+    assert (entries, distinct) == (4, 3)  # inst:a and inst:b share one value
+
+    dst = _cache(tmp_path / "zip.sqlite", compress=True, compress_min_bytes=64)
+    assert dst.import_snapshot(str(tmp_path / "snap.jsonl.gz")) == (4, 0)
+    keys = ["inst:a", "inst:b", "inst:c", "ext:x"]
+    assert _values(dst, keys) == {
+        "inst:a": (big, created), "inst:b": (big, created), "inst:c": ([], created), "ext:x": ({"synonyms": ["river"]}, created)
+    }
+    types = dict(dst._connect().execute("SELECT key, typeof(value_json) FROM kv_cache"))
+    assert types == {"inst:a": "blob", "inst:b": "blob", "inst:c": "text", "ext:x": "text"}
+    dst.close()
+
+
+def test_export_skips_expired_entries_and_filters_prefixes(tmp_path):
+    src = _cache(tmp_path / "src.sqlite", ttls={"sparql:": 60})
+    src.set_many({"sparql:old": 1}, created_at=time.time() - 600)
+    src.set_many({"sparql:new": 2, "ext:x": 3})
+    assert src.export_snapshot(str(tmp_path / "all.jsonl.gz")) == (2, 2)
+    assert src.export_snapshot(str(tmp_path / "sparql.jsonl.gz"), prefixes=["sparql:"]) == (1, 1)
+    src.close()
+
+    dst = _cache(tmp_path / "dst.sqlite")
+    assert dst.import_snapshot(str(tmp_path / "all.jsonl.gz")) == (2, 0)
+    assert set(_values(dst, ["sparql:old", "sparql:new", "ext:x"])) == {"sparql:new", "ext:x"}
+    dst.close()
+
+
+def test_import_skips_entries_expired_under_the_target_ttls(tmp_path):
+    src = _cache(tmp_path / "src.sqlite")
+    src.set_many({"sparql:q": 1}, created_at=time.time() - 600)
+    src.export_snapshot(str(tmp_path / "snap.jsonl.gz"))
+    src.close()
+    dst = _cache(tmp_path / "dst.sqlite", ttls={"sparql:": 60})
+    assert dst.import_snapshot(str(tmp_path / "snap.jsonl.gz")) == (0, 1)
+    dst.close()
+
+
+@pytest.mark.parametrize("overwrite", [False, True])
+def test_existing_entries_win_unless_overwrite(tmp_path, overwrite):
+    snapshot_time = time.time() - 300
+    src = _cache(tmp_path / "src.sqlite")
+    src.set_many({"newer": "snapshot", "older": "snapshot", "missing": "snapshot"}, created_at=snapshot_time)
+    src.export_snapshot(str(tmp_path / "snap.jsonl.gz"))
+    src.close()
+
+    dst = _cache(tmp_path / "dst.sqlite")
+    dst.set_many({"newer": "local"}, created_at=snapshot_time + 60)
+    dst.set_many({"older": "local"}, created_at=snapshot_time - 60)
+    dst.flush()
+    imported, skipped = dst.import_snapshot(str(tmp_path / "snap.jsonl.gz"), overwrite=overwrite)
+    got = {k: v for k, (v, _) in _values(dst, ["newer", "older", "missing"]).items()}
+    if overwrite:
+        assert (imported, skipped) == (3, 0)
+        assert got == {"newer": "snapshot", "older": "snapshot", "missing": "snapshot"}
+    else:
+        # only an entry at least as recent as the snapshot's is kept
+        assert (imported, skipped) == (2, 1)
+        assert got == {"newer": "local", "older": "snapshot", "missing": "snapshot"}
+    dst.close()
+
+
+def _write_gz(path, lines):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+HEAD = json.dumps({"format": "geosws-cache-snapshot", "version": 1, "created_at": 0})
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        [json.dumps({"key": "k", "ref": 0, "created_at": 0})],  # no snapshot header
+        [json.dumps({"format": "geosws-cache-snapshot", "version": 2})],
+        [HEAD, json.dumps({"ref": 0, "value": 1}), '{"key": "k", "ref": 0, "created_'],  # truncated line
+        [HEAD, "not json"],
+    ],
+)
+def test_malformed_snapshots_are_rejected(tmp_path, lines):
+    _write_gz(tmp_path / "bad.jsonl.gz", lines)
+    cache = _cache(tmp_path / "cache.sqlite")
+    with pytest.raises(ValueError):
+        cache.import_snapshot(str(tmp_path / "bad.jsonl.gz"))
+    cache.close()
@@ -0,0 +1,78 @@
+import random
+import re
+
+import pytest
+
+from geosws_annotator.ontology.index import OntologyElement, OntologyIndex
+from geosws_annotator.ontology.index_build import OntologyIndexBuilder
+
+
+class _StubClient:
+    """Answers the paged class/property query from fixed rows per language."""
+
+    endpoint_url = "http://localhost/sparql"
+
+    def __init__(self, rows_by_lang):
+        self.rows_by_lang = rows_by_lang
+
+    def query(self, q):
+        lang = re.search(r"langMatches\(lang\(\?label\), '([^']+)'\)", q).group(1)
+        limit = int(re.search(r"LIMIT (\d+)", q).group(1))
+        offset = int(re.search(r"OFFSET (\d+)", q).group(1))
+        bindings = []
+        for uri, label, t in self.rows_by_lang[lang][offset:offset + limit]:
+            row = {"uri": {"value": uri}, "type": {"value": "class" if t == 0 else "property"}}
+            if label:
+                row["label"] = {"value": label}
+            bindings.append(row)
+        return {"results": {"bindings": bindings}}
+
+
+def _rows(rnd):
+    words = ["river", "name", "country", "code", "élan", "area", "x"]
+    shared = []
+    for i in range(rnd.randint(20, 60)):
+        label = " ".join(rnd.choice(words) for _ in range(rnd.randint(0, 3)))
+        uri = f"http://example.org/{'ont/' if i % 3 else 'prop#'}{label.title().replace(' ', '')}{rnd.randint(0, 9)}"
+        shared.append((uri, label, rnd.randint(0, 1)))
+    # languages overlap (unlabelled rows come back for every language), and a page may
+    # repeat a row
+    return {lang: rnd.sample(shared, rnd.randint(1, len(shared))) + rnd.sample(shared, 3) for lang in ("en", "es", "fr")}
+
+
+@pytest.mark.parametrize("out_name", ["index.bin", "index.json"])
+@pytest.mark.parametrize("seed", range(3))
+def test_streamed_build_writes_the_in_memory_index(tmp_path, seed, out_name):
+    rnd = random.Random(seed)
+    rows_by_lang = _rows(rnd)
+    builder = OntologyIndexBuilder(
+        _StubClient(rows_by_lang),
+        work_dir=str(tmp_path / "work"),
+        languages=["en", "es", "fr"],
+        page_size=7,
+        sort_chunk=5,
+    )
+    out = tmp_path / out_name
+    n = builder.build(str(out))
+
+    # reference: the old assemble, deduped in memory in fetch order
+    seen, elements = set(), []
+    for lang in ("en", "es", "fr"):
+        for row in rows_by_lang[lang]:
+            if row not in seen:
+                seen.add(row)
+                elements.append(OntologyElement(uri=row[0], label=row[1], type=row[2]))
+    expected = tmp_path / ("expected" + out.suffix)
+    OntologyIndex(elements).save(str(expected))
+
+    assert n == len(elements)
+    assert out.read_bytes() == expected.read_bytes()
+    builder.cleanup()
+
+
+def test_streamed_build_of_an_empty_ontology(tmp_path):
+    builder = OntologyIndexBuilder(_StubClient({"en": []}), work_dir=str(tmp_path / "work"), page_size=5)
+    for name in ("index.bin", "index.json"):
+        assert builder.build(str(tmp_path / name)) == 0
+        OntologyIndex([]).save(str(tmp_path / ("expected_" + name)))
+        assert (tmp_path / name).read_bytes() == (tmp_path / ("expected_" + name)).read_bytes()
@@ -0,0 +1,30 @@
+import random
+
+import pytest
+
+from geosws_annotator.external.providers import LexiconProvider
+from geosws_annotator.utils.similarity import levenshtein_distance
+
+
+def _word(rnd: random.Random) -> str:
+    # short words over a tiny alphabet: 1-character keys and keys whose bigrams repeat
+    # ("aaaa") are where the bigram filter cannot prune
+    return "".join(rnd.choice("aabcd") for _ in range(rnd.randint(1, 9)))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fuzzy_matches_brute_force_edit_distance(tmp_path, seed):
+    rnd = random.Random(seed)
+    path = tmp_path / "lexicon.tsv"
+    path.write_text("\n".join("\t".join(_word(rnd) for _ in range(rnd.randint(1, 3))) for _ in range(150)), encoding="utf-8")
+    lexicon = LexiconProvider(str(path))
+    keys = list(lexicon._keys)
+    for _ in range(60):
+        key = _word(rnd)
+        max_dist = max(1, round(len(key) * 0.3))
+        hits = []
+        for j, cand in enumerate(keys):
+            d = levenshtein_distance(key, cand)
+            if d <= max_dist:
+                hits.append((d, lexicon._key_ids[j]))
+        assert lexicon._fuzzy(key, len(keys)) == [i for _, i in sorted(hits)], key
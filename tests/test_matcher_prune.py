@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from geosws_annotator.ontology.index import OntologyElement, OntologyIndex
+from geosws_annotator.ontology.matcher import OntologyMatcher
+
+
+WORDS = ["river", "name", "country", "code", "population", "total", "area", "city", "élan", "naïve"]
+THRESHOLDS = [0.0, 0.3, 0.5, 0.7, 0.75, 0.8, 0.85, 0.92, 0.97, 1.0]
+
+
+def _text(rnd: random.Random) -> str:
+    r = rnd.random()
+    if r < 0.05:
+        return ""
+    if r < 0.5:
+        return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 3)))
+    return "".join(rnd.choice("abcdefghijklmnopé -_") for _ in range(rnd.randint(1, 24)))
+
+
+def _variant(rnd: random.Random, text: str) -> str:
+    # a few random edits, so the term lands near the thresholds of that label; inserted
+    # letters are not in _text's alphabet, so each edit removes the bigrams around it
+    chars = list(text)
+    for _ in range(rnd.randint(1, 3)):
+        op, pos = rnd.random(), rnd.randint(0, len(chars))
+        if op < 0.4 or not chars:
+            chars.insert(pos, rnd.choice("qrstuvwxyz"))
+        elif op < 0.7:
+            del chars[min(pos, len(chars) - 1)]
+        else:
+            chars[min(pos, len(chars) - 1)] = rnd.choice("qrstuvwxyz")
+    return "".join(chars)
+
+
+def _index(rnd: random.Random, kind: str, tmp_path) -> OntologyIndex:
+    elements = []
+    for i in range(rnd.randint(1, 80)):
+        label = _text(rnd) if rnd.random() < 0.85 else ""
+        local = label.title().replace(" ", "") or f"Element{i}"
+        elements.append(OntologyElement(uri=f"http://example.org/ontology/{local}", label=label, type=i % 2))
+    index = OntologyIndex(elements)
+    if kind == "compact":
+        return index.compact()
+    if kind == "binary":
+        path = str(tmp_path / "index.bin")
+        index.save(path)
+        return OntologyIndex.load(path)
+    return index
+
+
+@pytest.mark.parametrize("kind", ["plain", "compact", "binary"])
+@pytest.mark.parametrize("seed", range(4))
+def test_pruned_match_equals_brute_force(tmp_path, kind, seed):
+    rnd = random.Random(seed)
+    for _ in range(3):
+        index = _index(rnd, kind, tmp_path)
+        pruned = OntologyMatcher(index, prune=True, cache_size=0)
+        brute = OntologyMatcher(index, prune=False, cache_size=0)
+        for _ in range(25):
+            term = _text(rnd) if rnd.random() < 0.3 else _variant(rnd, rnd.choice(index.elements).label)
+            if rnd.random() < 0.4:
+                # strict Jaro thresholds leave the Levenshtein bigram filter to decide
+                jaro = jaro_winkler = 1.0
+            else:
+                jaro, jaro_winkler = rnd.choice(THRESHOLDS), rnd.choice(THRESHOLDS)
+            settings = dict(
+                jaro_threshold=jaro,
+                jaro_winkler_threshold=jaro_winkler,
+                levenshtein_ratio_threshold=rnd.choice(THRESHOLDS),
+                top_k=len(index.elements),
+            )
+            expected = [(r.element.uri, r.score, r.metric) for r in brute.match(term, **settings)]
+            got = [(r.element.uri, r.score, r.metric) for r in pruned.match(term, **settings)]
+            assert got == expected, (term, settings)
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from geosws_annotator.annotate.pipeline import AnnotationPipeline
+from geosws_annotator.config import ExternalResourcesConfig, OntologyIndexConfig, PipelineConfig, SparqlEndpointConfig
+from geosws_annotator.models import Parameter
+
+
+def _pipeline(tmp_path, max_concurrency: int) -> AnnotationPipeline:
+    index_path = tmp_path / "index.json"
+    index_path.write_text(json.dumps({"elements": [{"uri": "http://example.org/River", "label": "river", "type": 0}]}), encoding="utf-8")
+    cfg = PipelineConfig(
+        sparql_endpoints=[SparqlEndpointConfig("local", "http://localhost/sparql")],
+        ontology_index=OntologyIndexConfig(index_path=str(index_path)),
+        external_resources=ExternalResourcesConfig(enable_suggestions=False, enable_synonyms=False),
+        cache_sqlite_path=str(tmp_path / "cache.sqlite"),
+        max_concurrency=max_concurrency,
+        memo_parameters=False,
+    )
+    pipeline = AnnotationPipeline(cfg)
+    # no SPARQL endpoint in tests: every candidate gets an empty instance list
+    pipeline._retrieve_instances_many = lambda items, limit: {it: [] for it in items}
+    return pipeline
+
+
+class _Counter:
+    """A stand-in for a blocking step that records how many run at once."""
+
+    def __init__(self, delay_s: float):
+        self.delay_s = delay_s
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, terms):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay_s)
+        with self._lock:
+            self.active -= 1
+        return []
+
+
+def test_concurrent_callers_share_one_limit(tmp_path):
+    pipeline = _pipeline(tmp_path, max_concurrency=2)
+    pipeline._candidates = counter = _Counter(0.05)
+    callers = [
+        threading.Thread(target=pipeline.annotate_parameters, args=([Parameter(f"p{i}_{j}", "in") for j in range(3)],))
+        for i in range(4)
+    ]
+    for t in callers:
+        t.start()
+    for t in callers:
+        t.join()
+    pipeline.close()
+    # 4 callers with 3 parameters each: without a shared limit up to 12 would run
+    assert counter.max_active == 2
+
+
+def test_per_call_limit_lowers_the_pipeline_limit(tmp_path):
+    pipeline = _pipeline(tmp_path, max_concurrency=4)
+    pipeline._candidates = counter = _Counter(0.02)
+    asyncio.run(pipeline.annotate_parameters_async([Parameter(f"p{j}", "in") for j in range(8)], max_concurrency=1))
+    pipeline.close()
+    assert counter.max_active == 1
+
+
+def test_close_stops_the_worker_threads(tmp_path):
+    pipeline = _pipeline(tmp_path, max_concurrency=2)
+    pipeline.annotate_parameters([Parameter("river", "in")])
+    pipeline.close()
+    with pytest.raises(RuntimeError):
+        pipeline.annotate_parameters([Parameter("river", "out")])
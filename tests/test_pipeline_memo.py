@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from geosws_annotator.annotate.pipeline import AnnotationPipeline
+from geosws_annotator.config import ExternalResourcesConfig, MatchingConfig, OntologyIndexConfig, PipelineConfig, SparqlEndpointConfig
+from geosws_annotator.models import Parameter
+
+
+ELEMENTS = [
+    {"uri": "http://dbpedia.org/ontology/countryName", "label": "country name", "type": 1},
+    {"uri": "http://dbpedia.org/ontology/populationTotal", "label": "population total", "type": 1},
+    {"uri": "http://dbpedia.org/ontology/River", "label": "river", "type": 0},
+]
+
+
+def _pipeline(tmp_path, memo_parameters: bool) -> AnnotationPipeline:
+    index_path = tmp_path / "index.json"
+    index_path.write_text(json.dumps({"elements": ELEMENTS}), encoding="utf-8")
+    cfg = PipelineConfig(
+        sparql_endpoints=[SparqlEndpointConfig("local", "http://localhost/sparql")],
+        ontology_index=OntologyIndexConfig(index_path=str(index_path)),
+        external_resources=ExternalResourcesConfig(enable_suggestions=False, enable_synonyms=False),
+        matching=MatchingConfig(retrieval="tokens"),
+        cache_sqlite_path=str(tmp_path / "cache.sqlite"),
+        memo_parameters=memo_parameters,
+    )
+    pipeline = AnnotationPipeline(cfg)
+    # no SPARQL endpoint in tests: every candidate gets an empty instance list
+    pipeline._retrieve_instances_many = lambda items, limit: {it: [] for it in items}
+    return pipeline
+
+
+@pytest.mark.parametrize("memo_parameters", [True, False])
+def test_token_retrieval_memo_keeps_spellings_apart(tmp_path, memo_parameters):
+    # "countryname" and "countryName" normalize the same but only the camelCase one
+    # splits into the tokens of the countryName property
+    pipeline = _pipeline(tmp_path, memo_parameters)
+    lower, camel = Parameter("countryname", "in"), Parameter("countryName", "in")
+    pipeline.annotate_parameters([lower])
+    pipeline.annotate_parameters([camel])
+    assert lower.ontology_candidates == []
+    assert [c.uri for c in camel.ontology_candidates] == ["http://dbpedia.org/ontology/countryName"]
+    pipeline.close()
+
+
+def test_token_retrieval_memo_shares_same_spelling(tmp_path):
+    pipeline = _pipeline(tmp_path, memo_parameters=True)
+    params = [Parameter("CountryName", "in"), Parameter("countryName", "out")]
+    pipeline.annotate_parameters(params)
+    assert pipeline._memo_key(params[0].name) == pipeline._memo_key(params[1].name)
+    assert [c.uri for c in params[0].ontology_candidates] == [c.uri for c in params[1].ontology_candidates]
+    pipeline.close()
@@ -0,0 +1,68 @@
+import threading
+
+from geosws_annotator.annotate.validation import RestProber
+from geosws_annotator.utils.cache import SqliteCache
+from stub_server import StubServer, sleep_then
+
+
+def _service(good):
+    """A REST stand-in: 200 with a body when any query value is in good, else 404."""
+
+    def handler(req):
+        if any(v in good for v in req.params.values()):
+            return 200, {"Content-Type": "application/json"}, b'{"ok": true}'
+        return 404, {}, b""
+
+    return handler
+
+
+def test_probes_per_host_are_capped():
+    candidates = {f"p{i}": [f"v{j}" for j in range(4)] for i in range(3)}
+    with StubServer(sleep_then(0.05, (404, {}, b""))) as a, StubServer(sleep_then(0.05, (404, {}, b""))) as b:
+        prober = RestProber(per_host=2, max_workers=8)
+        runs = [threading.Thread(target=prober.validate, args=(server.url, candidates)) for server in (a, b)]
+        for t in runs:
+            t.start()
+        for t in runs:
+            t.join()
+    # every probe fails, so all 12 per host are sent, at most 2 at a time on each host
+    assert (a.requests, b.requests) == (12, 12)
+    assert (a.max_active, b.max_active) == (2, 2)
+
+
+def test_remaining_probes_are_dropped_once_one_passes():
+    candidates = {"city": ["Paris", "x1", "x2", "x3"], "code": ["y1", "y2", "y3"]}
+    with StubServer(_service(good={"Paris"})) as server:
+        outcome = RestProber(per_host=1, max_workers=1).validate(server.url, candidates)
+    assert outcome == {"city": True, "code": False}
+    # city stops after its first value, code tries all of its values
+    assert server.requests == 1 + 3
+
+
+def test_probe_outcomes_are_reused_from_the_cache(tmp_path):
+    candidates = {"city": ["x1", "Paris"], "code": ["y1", "y2"]}
+    cache = SqliteCache(str(tmp_path / "cache.sqlite"))
+    with StubServer(_service(good={"Paris"})) as server:
+        first = RestProber(cache=cache, per_host=1, max_workers=1).validate(server.url, candidates)
+        sent = server.requests
+        again = RestProber(cache=cache).validate(server.url, candidates)
+        assert server.requests == sent
+        # a new value is probed, the cached ones are not
+        more = RestProber(cache=cache).validate(server.url, {"code": ["y1", "y2", "y3"]})
+        assert server.requests == sent + 1
+    assert first == again == {"city": True, "code": False}
+    assert more == {"code": False}
+    cache.flush()
+    keys = [k for (k,) in cache._connect().execute("SELECT key FROM kv_cache")]
+    assert len(keys) == 5 and all(k.startswith("probe:") for k in keys)
+    cache.close()
+
+
+def test_failed_requests_are_not_cached(tmp_path):
+    cache = SqliteCache(str(tmp_path / "cache.sqlite"))
+    with StubServer(_service(good={"Paris"})) as server:
+        url = server.url
+    # the server is gone: the probe fails and nothing is remembered
+    assert RestProber(cache=cache, timeout_s=2).validate(url, {"city": ["Paris"]}) == {"city": False}
+    assert cache.get(RestProber._cache_key(url, "city", "Paris")) is None
+    cache.close()
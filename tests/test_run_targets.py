@@ -0,0 +1,45 @@
+import json
+import threading
+import time
+
+from geosws_annotator.cli import _run_targets
+
+
+def _summary(out_root):
+    with open(out_root / "summary.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_hung_targets_do_not_hold_back_the_queue(tmp_path):
+    release = threading.Event()
+    ran = []
+
+    def annotate_one(target, out_dir, cancel):
+        ran.append(target["name"])
+        if target["hang"]:
+            # a stuck HTTP call: ignores cancel until the test ends
+            release.wait(10)
+
+    targets = [{"name": "a", "hang": True}, {"name": "b", "hang": True}, {"name": "c", "hang": False}]
+    try:
+        started = time.monotonic()
+        rc = _run_targets("rest", targets, annotate_one, str(tmp_path), workers=1, timeout_s=0.3)
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+
+    assert rc == 1
+    assert [t["status"] for t in _summary(tmp_path)["targets"]] == ["timeout", "timeout", "ok"]
+    assert ran == ["a", "b", "c"]
+    # two timeouts in a row, then the quick target
+    assert elapsed < 2.0
+
+
+def test_queued_targets_get_their_full_timeout(tmp_path):
+    def annotate_one(target, out_dir, cancel):
+        time.sleep(0.2)
+
+    rc = _run_targets("wfs", [{}, {}, {}], annotate_one, str(tmp_path), workers=1, timeout_s=0.35)
+
+    assert rc == 0
+    assert [t["status"] for t in _summary(tmp_path)["targets"]] == ["ok", "ok", "ok"]
@@ -0,0 +1,90 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from geosws_annotator.annotate.pipeline import AnnotationPipeline
+from geosws_annotator.config import ExternalResourcesConfig, OntologyIndexConfig, PipelineConfig, SparqlEndpointConfig
+from geosws_annotator.server import AnnotationRequestHandler, AnnotationService, make_server
+
+
+@pytest.fixture
+def server(tmp_path):
+    index_path = tmp_path / "index.json"
+    elements = [{"uri": "http://dbpedia.org/ontology/River", "label": "river", "type": 0}]
+    index_path.write_text(json.dumps({"elements": elements}), encoding="utf-8")
+    cfg = PipelineConfig(
+        sparql_endpoints=[SparqlEndpointConfig("local", "http://localhost/sparql")],
+        ontology_index=OntologyIndexConfig(index_path=str(index_path)),
+        external_resources=ExternalResourcesConfig(enable_suggestions=False, enable_synonyms=False),
+        cache_sqlite_path=str(tmp_path / "cache.sqlite"),
+    )
+    pipeline = AnnotationPipeline(cfg)
+    # no SPARQL endpoint in tests: every candidate gets an empty instance list
+    pipeline._retrieve_instances_many = lambda items, limit: {it: [] for it in items}
+    service = AnnotationService(pipeline)
+    srv = make_server(service, port=0)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    service.close()
+
+
+def _post(srv, path, body, headers=None):
+    con = http.client.HTTPConnection("127.0.0.1", srv.server_address[1], timeout=10)
+    con.putrequest("POST", path)
+    for k, v in {"Content-Type": "application/json", "Content-Length": str(len(body)), **(headers or {})}.items():
+        con.putheader(k, v)
+    con.endheaders()
+    con.send(body)
+    resp = con.getresponse()
+    payload = json.loads(resp.read())
+    con.close()
+    return resp, payload
+
+
+def test_annotate_parameters(server):
+    resp, payload = _post(server, "/annotate/parameters", json.dumps({"parameters": ["river", {"name": "bbox", "io": "out"}]}).encode())
+    assert resp.status == 200
+    river, bbox = payload["parameters"]
+    assert [c["uri"] for c in river["ontology_candidates"]] == ["http://dbpedia.org/ontology/River"]
+    assert bbox["io"] == "out"
+
+
+def test_bad_content_length(server):
+    resp, payload = _post(server, "/annotate/parameters", b"[]", headers={"Content-Length": "two"})
+    assert resp.status == 400
+    assert "Content-Length" in payload["error"]
+    assert resp.getheader("Connection") == "close"
+
+
+@pytest.mark.parametrize("body", [b"{not json", b'{"parameters": ['])
+def test_invalid_json(server, body):
+    resp, payload = _post(server, "/annotate/parameters", body)
+    assert resp.status == 400
+    assert payload["error"].startswith("invalid JSON")
+
+
+def test_oversize_body(server, monkeypatch):
+    monkeypatch.setattr(AnnotationRequestHandler, "max_body_bytes", 64)
+    resp, _ = _post(server, "/annotate/parameters", json.dumps(["river"] * 20).encode())
+    assert resp.status == 413
+    assert resp.getheader("Connection") == "close"
+
+
+@pytest.mark.parametrize("body", [{"parameters": 5}, {"parameters": [{"io": "in"}]}])
+def test_invalid_parameters(server, body):
+    resp, _ = _post(server, "/annotate/parameters", json.dumps(body).encode())
+    assert resp.status == 400
+
+
+def test_errors_while_annotating_are_server_errors(server, monkeypatch):
+    def fail(params):
+        raise ValueError("broken index")
+
+    monkeypatch.setattr(server.service.pipeline, "annotate_parameters", fail)
+    resp, payload = _post(server, "/annotate/parameters", b'["river"]')
+    assert resp.status == 500
+    assert payload["error"] == "ValueError: broken index"
@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from geosws_annotator.sparql.client import SparqlClient
+from stub_server import StubServer, sleep_then
+
+
+def _results(value: str) -> bytes:
+    return json.dumps({"results": {"bindings": [{"val": {"type": "literal", "value": value}}]}}).encode("utf-8")
+
+
+def _echo(req):
+    # one binding with the query text, so callers can tell answers apart
+    return 200, {"Content-Type": "application/sparql-results+json"}, _results(req.params["query"])
+
+
+def _client(server: StubServer, **kwargs) -> SparqlClient:
+    kwargs.setdefault("backoff_s", 0.001)
+    return SparqlClient(server.url, **kwargs)
+
+
+def test_429_waits_for_retry_after():
+    answers = [(429, {"Retry-After": "0.4"}, b""), (200, {}, _results("ok"))]
+    with StubServer(lambda req: answers.pop(0)) as server:
+        started = time.monotonic()
+        data = _client(server).query("SELECT 1")
+        elapsed = time.monotonic() - started
+    assert SparqlClient.bindings_to_values(data, "val") == ["ok"]
+    assert server.requests == 2
+    # backoff alone would have slept about a millisecond
+    assert elapsed >= 0.4
+
+
+def test_503_is_retried_max_retries_times_then_raised():
+    with StubServer(lambda req: (503, {}, b"busy")) as server:
+        with pytest.raises(requests.HTTPError):
+            _client(server, max_retries=2).query("SELECT 1")
+    assert server.requests == 3
+
+
+def test_concurrent_identical_queries_share_one_request():
+    with StubServer(sleep_then(0.3, (200, {}, _results("shared")))) as server:
+        client = _client(server)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.query("SELECT ?same"))) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert server.requests == 1
+    assert len(results) == 6 and all(SparqlClient.bindings_to_values(r, "val") == ["shared"] for r in results)
+
+
+def test_query_many_keeps_input_order():
+    queries = [f"SELECT {i}" for i in (5, 3, 9, 3, 1, 5, 7)]
+    with StubServer(_echo) as server:
+        results = _client(server).query_many(queries, max_concurrency=4)
+    assert [SparqlClient.bindings_to_values(r, "val") for r in results] == [[q] for q in queries]
+    # duplicates are sent once
+    assert server.requests == len(set(queries))
+
+
+def test_rate_limit_caps_request_rate():
+    with StubServer(_echo) as server:
+        client = _client(server, rate_limit_per_s=20, burst=1)
+        started = time.monotonic()
+        client.query_many([f"SELECT {i}" for i in range(6)], max_concurrency=6)
+        elapsed = time.monotonic() - started
+    assert server.requests == 6
+    # one token up front, then one every 50 ms
+    assert elapsed >= 5 / 20 * 0.95
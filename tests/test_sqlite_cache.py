@@ -0,0 +1,95 @@
+import gc
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from geosws_annotator.utils.cache import SqliteCache
+
+
+def _cache(tmp_path, **kwargs) -> SqliteCache:
+    kwargs.setdefault("flush_interval_s", 3600)
+    return SqliteCache(str(tmp_path / "cache.sqlite"), **kwargs)
+
+
+def _stored_types(cache: SqliteCache):
+    return dict(cache._connect().execute("SELECT key, typeof(value_json) FROM kv_cache"))
+
+
+@pytest.mark.parametrize("flushed", [False, True])
+def test_ttl_longest_prefix_wins(tmp_path, flushed):
+    cache = _cache(tmp_path, ttls={"sparql:": 60, "sparql:inst:": 3600})
+    old = time.time() - 600
+    cache.set_many({"sparql:q": 1, "sparql:inst:c": 2, "ext:x": 3}, created_at=old)
+    cache.set("sparql:fresh", 4)
+    if flushed:
+        cache.flush()  # read back from the table instead of the write buffer
+    got = cache.get_many(["sparql:q", "sparql:inst:c", "ext:x", "sparql:fresh"])
+    # sparql: entries live 60 s, but sparql:inst: ones an hour; no TTL for ext:
+    assert {k: item.value for k, item in got.items()} == {"sparql:inst:c": 2, "ext:x": 3, "sparql:fresh": 4}
+    cache.close()
+
+
+def test_purge_expired_keeps_longer_prefixes_with_their_own_ttl(tmp_path):
+    cache = _cache(tmp_path, ttls={"sparql:": 60, "sparql:inst:": 3600})
+    cache.set_many({"sparql:q": 1, "sparql:inst:c": 2}, created_at=time.time() - 600)
+    cache.set_many({"sparql:inst:old": 3}, created_at=time.time() - 7200)
+    assert cache.purge_expired() == 2
+    assert set(_stored_types(cache)) == {"sparql:inst:c"}
+    cache.close()
+
+
+def test_max_entries_evicts_least_recently_used_on_flush(tmp_path):
+    cache = _cache(tmp_path, max_entries=3)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+        cache.flush()
+        time.sleep(0.01)
+    assert cache.get("a").value == "a"  # now the most recently used
+    cache.flush()
+    time.sleep(0.01)
+    cache.set("d", "d")
+    # buffered writes are not counted until they are committed
+    assert set(_stored_types(cache)) == {"a", "b", "c"}
+    cache.flush()
+    assert set(_stored_types(cache)) == {"a", "c", "d"}
+    cache.close()
+
+
+def test_compressed_cache_reads_plain_entries(tmp_path):
+    big = {"instances": [f"http://example.org/resource/{i}" for i in range(50)]}
+    with _cache(tmp_path) as plain:
+        plain.set_many({"plain:big": big, "plain:small": [1]})
+    cache = _cache(tmp_path, compress=True, compress_min_bytes=64)
+    cache.set("zip:big", big)
+    cache.flush()
+    assert _stored_types(cache) == {"plain:big": "text", "plain:small": "text", "zip:big": "blob"}
+    got = cache.get_many(["plain:big", "plain:small", "zip:big"])
+    assert {k: item.value for k, item in got.items()} == {"plain:big": big, "plain:small": [1], "zip:big": big}
+    cache.close()
+
+
+def test_thread_connections_are_released_when_the_thread_exits(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("k", "v")
+    cache.flush()
+    seen = []
+
+    def read():
+        seen.append((cache.get("k").value, cache._connect()))
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    gc.collect()
+
+    assert [value for value, _ in seen] == ["v"] * 4
+    # only the connection of this thread is left open
+    assert len(cache._connections) == 1
+    for _, con in seen:
+        with pytest.raises(sqlite3.ProgrammingError):
+            con.execute("SELECT 1")
+    cache.close()
@@ -0,0 +1,24 @@
+import json
+
+from geosws_annotator.cli import _vocabulary
+
+
+def test_vocabulary_reads_every_format_and_skips_malformed_lines(tmp_path, capsys):
+    service = {"operations": [{"inputs": [{"name": "bbox", "io": "in"}], "outputs": [{"name": "countryName", "io": "out"}]}]}
+    (tmp_path / "service.json").write_text(json.dumps(service), encoding="utf-8")
+    records = [
+        json.dumps({"id": 1, "parameters": ["river", {"name": "bbox", "io": "in"}]}),
+        '{"parameters": ["lake"',  # cut off
+        json.dumps({"line": 2, "status": "ok", "parameters": [{"name": "lake", "io": "in"}]}),
+    ]
+    (tmp_path / "records.jsonl").write_text("\n".join(records) + "\n", encoding="utf-8")
+    (tmp_path / "names.txt").write_text("# one name per line\n\nelevation\n[\"depth\", \n river\n", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("ignored\n", encoding="utf-8")
+
+    names = _vocabulary([str(tmp_path)])
+
+    # files in name order, first occurrence of a name wins
+    assert names == ["elevation", "river", "bbox", "lake", "countryName"]
+    err = capsys.readouterr().err
+    assert f"{tmp_path / 'names.txt'}:4: skipped, invalid JSON" in err
+    assert f"{tmp_path / 'records.jsonl'}:2: skipped, invalid JSON" in err
@@ -0,0 +1,95 @@
+import re
+import socket
+
+import pytest
+import requests
+
+from geosws_annotator.annotate.validation import WfsProber
+from stub_server import StubServer
+
+EXCEPTION_REPORT = b'<ows:ExceptionReport xmlns:ows="http://www.opengis.net/ows"><ows:Exception exceptionCode="InvalidParameterValue"/></ows:ExceptionReport>'
+
+
+class _Wfs:
+    """A WFS GetFeature stand-in over a set of matching property values.
+
+    Filters with more than max_literals values are refused (an ExceptionReport, or
+    refuse_status). With unknown_total, hits answers carry numberMatched="unknown".
+    """
+
+    def __init__(self, matching, max_literals=100, refuse_status=200, unknown_total=False):
+        self.matching = set(matching)
+        self.max_literals = max_literals
+        self.refuse_status = refuse_status
+        self.unknown_total = unknown_total
+        self.seen = []
+
+    def __call__(self, req):
+        literals = re.findall(r"<Literal>(.*?)</Literal>", req.params["FILTER"])
+        result_type = req.params.get("resultType", "results")
+        self.seen.append((result_type, literals))
+        if len(literals) > self.max_literals:
+            return self.refuse_status, {"Content-Type": "text/xml"}, EXCEPTION_REPORT
+        n = sum(1 for v in literals if v in self.matching)
+        if result_type == "hits":
+            total = "unknown" if self.unknown_total else str(n)
+            body = f'<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0" numberMatched="{total}" numberReturned="0"/>'
+        else:
+            members = '<wfs:member><f id="1"/></wfs:member>' if n else ""
+            body = f'<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0">{members}</wfs:FeatureCollection>'
+        return 200, {"Content-Type": "text/xml"}, body.encode("utf-8")
+
+
+VALUES = [f"v{i}" for i in range(8)]
+
+
+def test_hits_answers_a_batch_with_one_request():
+    wfs = _Wfs(matching={"v5"})
+    with StubServer(wfs) as server:
+        prober = WfsProber(timeout_s=5)
+        assert prober.any_match(server.url, "name", VALUES, version="2.0.0")
+        assert prober.count(server.url, "name", ["v1", "v2"], version="2.0.0") == 0
+    assert wfs.seen == [("hits", VALUES), ("hits", ["v1", "v2"])]
+
+
+def test_unknown_total_falls_back_to_the_first_feature():
+    wfs = _Wfs(matching={"v2"}, unknown_total=True)
+    with StubServer(wfs) as server:
+        prober = WfsProber(timeout_s=5)
+        assert prober.count(server.url, "name", ["v1", "v2"], version="2.0.0") == 1
+        assert prober.count(server.url, "name", ["v3"], version="2.0.0") == 0
+    assert [rt for rt, _ in wfs.seen] == ["hits", "results", "hits", "results"]
+
+
+def test_first_match_bisects_to_the_matching_value():
+    wfs = _Wfs(matching={"v5", "v6"})
+    with StubServer(wfs) as server:
+        assert WfsProber(timeout_s=5).first_match(server.url, "name", VALUES, version="1.1.0") == "v5"
+    # whole batch, then halves down to the first hit: v0-v7, v0-v3, v4-v7, v4-v5, v4, v5
+    assert len(wfs.seen) == 6
+
+
+@pytest.mark.parametrize("refuse_status", [200, 400])
+def test_refused_batches_are_split(refuse_status):
+    wfs = _Wfs(matching={"v6"}, max_literals=2, refuse_status=refuse_status)
+    with StubServer(wfs) as server:
+        prober = WfsProber(timeout_s=5)
+        assert prober.any_match(server.url, "name", VALUES, version="1.1.0")
+        assert prober.first_match(server.url, "name", VALUES, version="1.1.0") == "v6"
+    # any_match: the batch and both its halves are refused, the pairs are answered
+    assert [len(literals) for _, literals in wfs.seen[:7]] == [8, 4, 2, 2, 4, 2, 2]
+
+
+def test_server_errors_are_raised_not_bisected():
+    with StubServer(lambda req: (503, {}, b"overloaded")) as server:
+        with pytest.raises(requests.HTTPError):
+            WfsProber(timeout_s=5).any_match(server.url, "name", VALUES, version="1.1.0")
+    assert server.requests == 1
+
+
+def test_network_errors_are_raised():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]  # nothing listens here once the socket is closed
+    with pytest.raises(requests.ConnectionError):
+        WfsProber(timeout_s=5).any_match(f"http://127.0.0.1:{port}/", "name", VALUES, version="1.1.0")
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import sys
+import threading
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 
 @dataclass
@@ -15,12 +17,55 @@ class OntologyResource:
     label: str
     # 0 = class, 1 = property (kept close to thesis wording)
     type: int
-    instances: List[OntologyInstance] = field(default_factory=list)
+    # a list of its own, or a tuple shared through an InstanceStore
+    instances: Sequence[OntologyInstance] = field(default_factory=list)
 
     def add_instance(self, v: str) -> None:
+        if not isinstance(self.instances, list):
+            self.instances = list(self.instances)  # copy a shared tuple before changing it
         self.instances.append(OntologyInstance(value=v))
 
 
+InstanceKey = Tuple[str, int, int]  # (uri, type, limit)
+
+
+class InstanceStore:
+    """Instance lists of a run, held once per (uri, type, limit).
+
+    put() returns one immutable tuple of OntologyInstance (values interned) per key, so
+    every OntologyResource of the same concept shares it instead of owning a copy. At
+    most max_entries keys are kept (least recently used dropped first; None = unbounded);
+    resources keep their tuple when its key is dropped.
+    """
+
+    def __init__(self, max_entries: Optional[int] = 8192):
+        self.max_entries = max_entries
+        self._sets: Dict[InstanceKey, Tuple[OntologyInstance, ...]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+    def get_many(self, keys: Iterable[InstanceKey]) -> Dict[InstanceKey, Tuple[OntologyInstance, ...]]:
+        out = {}
+        with self._lock:
+            for key in keys:
+                shared = self._sets.pop(key, None)
+                if shared is not None:
+                    out[key] = self._sets[key] = shared  # re-insert: most recently used last
+        return out
+
+    def put(self, key: InstanceKey, values: Iterable[str]) -> Tuple[OntologyInstance, ...]:
+        """The shared tuple for key, created from values unless the key is already held."""
+        with self._lock:
+            shared = self._sets.get(key)
+            if shared is None:
+                shared = self._sets[key] = tuple(OntologyInstance(value=sys.intern(v)) for v in values)
+                while self.max_entries is not None and len(self._sets) > self.max_entries:
+                    del self._sets[next(iter(self._sets))]
+            return shared
+
+
 @dataclass
 class Parameter:
     name: str
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape
+
+import requests
+from lxml import etree
+from requests.adapters import HTTPAdapter
+
+from ..utils.cache import SqliteCache
+
+
+class RestProber:
+    """Concurrent validation probes against REST services.
+
+    A probe is a GET with one parameter set to a candidate value; it passes when the
+    service answers < 400 with a non-empty body. Bodies are streamed and the connection is
+    released after the first non-empty chunk. Requests to one host are capped at per_host
+    at a time, a parameter's remaining probes are dropped once one passes, and outcomes are
+    cached under "probe:" keys (give that namespace a TTL in the cache).
+    """
+
+    def __init__(self, cache: SqliteCache | None = None, timeout_s: float = 25.0, per_host: int = 4, max_workers: int = 16, session: Optional[requests.Session] = None):
+        self.cache = cache
+        self.timeout_s = timeout_s
+        self.per_host = max(1, per_host)
+        self.max_workers = max(1, max_workers)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host_slots(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._hosts_lock:
+            slots = self._hosts.get(host)
+            if slots is None:
+                slots = self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return slots
+
+    @staticmethod
+    def _cache_key(url: str, name: str, value: str) -> str:
+        h = hashlib.sha256(f"{url}\n{name}\n{value}".encode("utf-8")).hexdigest()
+        return f"probe:{h}"
+
+    def probe(self, url: str, name: str, value: str) -> Optional[bool]:
+        """One uncached probe; None when the request itself failed (not cached)."""
+        with self._host_slots(url):
+            try:
+                with self.session.get(url, params={name: value}, timeout=self.timeout_s, stream=True) as resp:
+                    if resp.status_code >= 400:
+                        return False
+                    for chunk in resp.iter_content(chunk_size=1024):
+                        if chunk:
+                            return True
+                    return False
+            except requests.RequestException:
+                return None
+
+    def validate(self, url: str, candidates: Dict[str, List[str]]) -> Dict[str, bool]:
+        """For each parameter name, whether any of its candidate values passes a probe."""
+        outcome: Dict[str, bool] = {name: False for name in candidates}
+        keys = {(name, v): self._cache_key(url, name, v) for name, values in candidates.items() for v in values}
+        hits = self.cache.get_many(keys.values()) if self.cache else {}
+        todo: Dict[str, List[str]] = {}
+        for name, values in candidates.items():
+            if any(keys[(name, v)] in hits and hits[keys[(name, v)]].value for v in values):
+                outcome[name] = True
+            else:
+                todo[name] = [v for v in values if keys[(name, v)] not in hits]
+
+        n_probes = sum(len(vs) for vs in todo.values())
+        if not n_probes:
+            return outcome
+
+        passed = {name: threading.Event() for name in todo}
+        fresh: Dict[str, bool] = {}
+        fresh_lock = threading.Lock()
+
+        def run(name: str, value: str) -> None:
+            if passed[name].is_set():
+                return
+            ok = self.probe(url, name, value)
+            if ok is not None:
+                with fresh_lock:
+                    fresh[keys[(name, value)]] = ok
+            if ok:
+                passed[name].set()
+                for fut in futures[name]:
+                    fut.cancel()
+
+        futures: Dict[str, List[Future]] = {name: [] for name in todo}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, n_probes)) as ex:
+            # round-robin over parameters so each one gets an early probe
+            for value_idx in range(max(len(vs) for vs in todo.values())):
+                for name, values in todo.items():
+                    if value_idx < len(values):
+                        futures[name].append(ex.submit(run, name, values[value_idx]))
+
+        for name in todo:
+            outcome[name] = passed[name].is_set()
+        if self.cache and fresh:
+            self.cache.set_many(fresh)
+        return outcome
+
+
+def _or_filter(property_name: str, values: List[str]) -> str:
+    clauses = "".join(
+        f"<PropertyIsEqualTo><PropertyName>{escape(property_name)}</PropertyName><Literal>{escape(v)}</Literal></PropertyIsEqualTo>"
+        for v in values
+    )
+    return f"<Filter><Or>{clauses}</Or></Filter>" if len(values) > 1 else f"<Filter>{clauses}</Filter>"
+
+
+_MEMBER_TAGS = {"featureMember", "featureMembers", "member"}
+
+# _parse_count result for a hits response that gives no numeric total
+_UNKNOWN_COUNT = -1
+
+
+class WfsProber:
+    """Cheap GetFeature checks: does any feature have property == one of the values?
+
+    Several values go into one <Or> filter; the request asks for resultType=hits (WFS
+    1.1/2.0) and at most one feature, and the response is parsed incrementally, stopping at
+    the root's numberOfFeatures/numberMatched or the first feature member. Bisection is only
+    used to tell which value matched, or to split a batch the server refused (a 4xx or an
+    OGC ExceptionReport). Network errors, 5xx answers and responses that are not WFS XML
+    are raised, not taken as a refusal.
+    """
+
+    def __init__(self, timeout_s: float = 25.0, batch_size: int = 20, session: Optional[requests.Session] = None):
+        self.timeout_s = timeout_s
+        self.batch_size = max(1, batch_size)
+        self.session = session or requests.Session()
+
+    def count(self, getfeature_url: str, property_name: str, values: List[str], version: str = "1.1.0") -> Optional[int]:
+        """Features matching any of values (1 means "at least one" when the server gives no total).
+
+        None when the server refused the filter; raises requests.RequestException on network
+        errors and 5xx answers, lxml's XMLSyntaxError or ValueError on other responses.
+        """
+        params = {"FILTER": _or_filter(property_name, values)}
+        if version.startswith("2."):
+            params.update({"resultType": "hits", "count": "1"})
+        elif version.startswith("1.1"):
+            params.update({"resultType": "hits", "maxFeatures": "1"})
+        else:
+            params["maxFeatures"] = "1"
+        n = self._get_count(getfeature_url, params)
+        if n == _UNKNOWN_COUNT:
+            # hits without a numeric total (WFS 2.0 allows numberMatched="unknown"):
+            # ask for the first matching feature instead
+            params["resultType"] = "results"
+            n = self._get_count(getfeature_url, params)
+        return n
+
+    def _get_count(self, getfeature_url: str, params: Dict[str, str]) -> Optional[int]:
+        with self.session.get(getfeature_url, params=params, timeout=self.timeout_s, stream=True) as resp:
+            if 400 <= resp.status_code < 500:
+                return None
+            resp.raise_for_status()
+            resp.raw.decode_content = True
+            return self._parse_count(resp.raw, hits=params.get("resultType") == "hits")
+
+    @staticmethod
+    def _parse_count(stream: Any, hits: bool = False) -> Optional[int]:
+        # None for an OGC ExceptionReport; a hits answer without a numeric total and
+        # without members is _UNKNOWN_COUNT, not 0
+        root = True
+        for _, el in etree.iterparse(stream, events=("start",)):
+            name = etree.QName(el).localname
+            if root:
+                root = False
+                if "Exception" in name:
+                    return None
+                if name != "FeatureCollection":
+                    raise ValueError(f"not a WFS response: <{name}>")
+                for attr in ("numberMatched", "numberOfFeatures"):
+                    n = el.get(attr)
+                    if n is not None and n.isdigit():
+                        return int(n)
+            elif name in _MEMBER_TAGS:
+                return 1
+        return _UNKNOWN_COUNT if hits else 0
+
+    def any_match(self, getfeature_url: str, property_name: str, values: List[str], version: str = "1.1.0") -> bool:
+        for i in range(0, len(values), self.batch_size):
+            if self._match_in(getfeature_url, property_name, values[i:i + self.batch_size], version, find=False) is not None:
+                return True
+        return False
+
+    def first_match(self, getfeature_url: str, property_name: str, values: List[str], version: str = "1.1.0") -> Optional[str]:
+        """First value (in order) with a matching feature, found by bisecting OR batches."""
+        for i in range(0, len(values), self.batch_size):
+            hit = self._match_in(getfeature_url, property_name, values[i:i + self.batch_size], version, find=True)
+            if hit is not None:
+                return hit
+        return None
+
+    def _match_in(self, url: str, prop: str, values: List[str], version: str, find: bool) -> Optional[str]:
+        # a matching value (with find=False just some value of a matching batch), or None
+        n = self.count(url, prop, values, version)
+        if n is None:
+            if len(values) == 1:
+                return None
+            # batch refused (filter too long, no <Or> support...): split it
+        elif n == 0:
+            return None
+        elif not find or len(values) == 1:
+            return values[0]
+        mid = len(values) // 2
+        hit = self._match_in(url, prop, values[:mid], version, find)
+        return hit if hit is not None else self._match_in(url, prop, values[mid:], version, find)